@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -19,6 +20,12 @@ class Config:
     COLLECTION_PRODUCTS = os.getenv('COLLECTION_PRODUCTS', 'products')
     COLLECTION_KEYWORDS = os.getenv('COLLECTION_KEYWORDS', 'keywords')
     COLLECTION_STORES = os.getenv('COLLECTION_STORES', 'stores')
+    COLLECTION_NICHE_RANKINGS = os.getenv('COLLECTION_NICHE_RANKINGS', 'niche_rankings')
+    COLLECTION_KEYWORD_HISTORY = os.getenv('COLLECTION_KEYWORD_HISTORY', 'keyword_history')
+    COLLECTION_NICHE_STATS = os.getenv('COLLECTION_NICHE_STATS', 'niche_stats')
+    COLLECTION_REVIEWS = os.getenv('COLLECTION_REVIEWS', 'reviews')
+    COLLECTION_REVIEW_STATS = os.getenv('COLLECTION_REVIEW_STATS', 'review_stats')
+    COLLECTION_TOMBSTONES = os.getenv('COLLECTION_TOMBSTONES', 'tombstones')
     
     # Azure AI Services
     AZURE_COMPUTER_VISION_ENDPOINT = os.getenv('AZURE_COMPUTER_VISION_ENDPOINT')
@@ -30,10 +37,65 @@ class Config:
     
     # External APIs
     ETSY_API_KEY = os.getenv('ETSY_API_KEY')
+    ETSY_API_BASE_URL = os.getenv('ETSY_API_BASE_URL', 'https://openapi.etsy.com/v3/application')
+    
+    # Sentiment: 'local', 'azure' or 'local_first' (Azure only for low-confidence local scores)
+    SENTIMENT_POLICY = os.getenv('SENTIMENT_POLICY', 'local_first')
+    SENTIMENT_MIN_CONFIDENCE = float(os.getenv('SENTIMENT_MIN_CONFIDENCE', 0.35))
+    SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 500))
+    TOP_NEGATIVE_TERMS = int(os.getenv('TOP_NEGATIVE_TERMS', 10))
+    
+    # Outbound HTTP
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', 4))
+    HTTP_RATE_PER_HOST = float(os.getenv('HTTP_RATE_PER_HOST', 5))
+    HTTP_BURST_PER_HOST = int(os.getenv('HTTP_BURST_PER_HOST', 10))
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+    HTTP_BACKOFF_SECONDS = float(os.getenv('HTTP_BACKOFF_SECONDS', 0.5))
+    HTTP_MAX_RETRY_DELAY_SECONDS = float(os.getenv('HTTP_MAX_RETRY_DELAY_SECONDS', 30))
+    HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', 10))
+    HTTP_CACHE_ENTRIES = int(os.getenv('HTTP_CACHE_ENTRIES', 1000))
+    
+    # Azure AI calls kept in flight at once by each worker process
+    AZURE_MAX_CONCURRENCY = int(os.getenv('AZURE_MAX_CONCURRENCY', 200))
+    AZURE_TIMEOUT_SECONDS = float(os.getenv('AZURE_TIMEOUT_SECONDS', 30))
+    AZURE_CALL_TIMEOUT_SECONDS = float(os.getenv('AZURE_CALL_TIMEOUT_SECONDS', 60))
+    
+    # Production server (src/server.py); SERVER_WORKERS=0 sizes workers from the CPU count
+    SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 0))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 4))
+    SERVER_TIMEOUT_SECONDS = int(os.getenv('SERVER_TIMEOUT_SECONDS', 60))
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('SERVER_GRACEFUL_TIMEOUT_SECONDS', 30))
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', 0))
+    
+    # Cross-worker cache invalidation
+    INVALIDATION_BUS_PATH = os.getenv('INVALIDATION_BUS_PATH', os.path.join(tempfile.gettempdir(), 'niche_compass_invalidations.db'))
+    INVALIDATION_POLL_SECONDS = float(os.getenv('INVALIDATION_POLL_SECONDS', 0.1))
+    INVALIDATION_MAX_KEYS = int(os.getenv('INVALIDATION_MAX_KEYS', 1000))
+    INVALIDATION_RETENTION_SECONDS = float(os.getenv('INVALIDATION_RETENTION_SECONDS', 300))
     
     # Application Settings
+    USER_CACHE_ENTRIES = int(os.getenv('USER_CACHE_ENTRIES', 10000))
+    USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', 30))
     MAX_REQUESTS_PER_MINUTE = int(os.getenv('MAX_REQUESTS_PER_MINUTE', 100))
+    BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', 100))
+    KEYWORD_BATCH_MAX = int(os.getenv('KEYWORD_BATCH_MAX', 500))
+    KEYWORD_ANALYSIS_WORKERS = int(os.getenv('KEYWORD_ANALYSIS_WORKERS', 16))
+    REFRESH_BATCH_SIZE = int(os.getenv('REFRESH_BATCH_SIZE', 500))
     CACHE_TIMEOUT_SECONDS = int(os.getenv('CACHE_TIMEOUT_SECONDS', 3600))
+    RANKINGS_TOP_K = int(os.getenv('RANKINGS_TOP_K', 50))
+    NICHE_TOP_PRODUCTS = int(os.getenv('NICHE_TOP_PRODUCTS', 20))
+    HISTORY_BUCKET_SIZE = int(os.getenv('HISTORY_BUCKET_SIZE', 500))
+    HISTORY_RAW_RETENTION_DAYS = int(os.getenv('HISTORY_RAW_RETENTION_DAYS', 90))
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 1000))
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', 8))
+    DASHBOARD_SECTION_TIMEOUT_SECONDS = float(os.getenv('DASHBOARD_SECTION_TIMEOUT_SECONDS', 2))
+    
+    # Incremental sync (/api/sync); writes newer than SYNC_SETTLE_SECONDS wait for the next page
+    SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', 500))
+    SYNC_MAX_PAGE_SIZE = int(os.getenv('SYNC_MAX_PAGE_SIZE', 5000))
+    SYNC_SETTLE_SECONDS = float(os.getenv('SYNC_SETTLE_SECONDS', 5))
+    TOMBSTONE_RETENTION_DAYS = int(os.getenv('TOMBSTONE_RETENTION_DAYS', 30))
     
     @staticmethod
     def validate_config():
@@ -77,12 +77,12 @@ class MockCollection:
         self._data = {}  # Simple in-memory storage
         logger.info(f"Using mock collection: {name}")
     
-    def find_one(self, query):
+    def find_one(self, query, projection=None):
         """Mock find_one operation"""
         logger.debug(f"Mock find_one in {self.name}: {query}")
         return None  # Always return None for now
     
-    def find(self, query=None):
+    def find(self, query=None, projection=None):
         """Mock find operation"""
         logger.debug(f"Mock find in {self.name}: {query}")
         return MockCursor([])  # Return empty cursor
@@ -92,10 +92,60 @@ class MockCollection:
         logger.debug(f"Mock replace_one in {self.name}: {filter_query}")
         return MockResult(upserted_id='mock_id', modified_count=1)
     
+    def find_one_and_update(self, filter_query, update, projection=None, upsert=False, return_document=None):
+        """Mock find_one_and_update operation"""
+        logger.debug(f"Mock find_one_and_update in {self.name}: {filter_query}")
+        return None
+    
+    def find_one_and_replace(self, filter_query, replacement, projection=None, upsert=False, return_document=None):
+        """Mock find_one_and_replace operation"""
+        logger.debug(f"Mock find_one_and_replace in {self.name}: {filter_query}")
+        return None
+    
+    def find_one_and_delete(self, filter_query, projection=None):
+        """Mock find_one_and_delete operation"""
+        logger.debug(f"Mock find_one_and_delete in {self.name}: {filter_query}")
+        return None
+    
+    def insert_many(self, documents, ordered=True):
+        """Mock insert_many operation"""
+        logger.debug(f"Mock insert_many in {self.name}: {len(documents)} documents")
+        return MockResult()
+    
+    def update_one(self, filter_query, update, upsert=False):
+        """Mock update_one operation"""
+        logger.debug(f"Mock update_one in {self.name}: {filter_query}")
+        return MockResult(modified_count=1)
+    
+    def update_many(self, filter_query, update, upsert=False):
+        """Mock update_many operation"""
+        logger.debug(f"Mock update_many in {self.name}: {filter_query}")
+        return MockResult(modified_count=0)
+    
+    def bulk_write(self, requests, ordered=True):
+        """Mock bulk_write operation"""
+        logger.debug(f"Mock bulk_write in {self.name}: {len(requests)} operations")
+        return MockResult(modified_count=len(requests))
+    
+    def aggregate(self, pipeline):
+        """Mock aggregate operation"""
+        logger.debug(f"Mock aggregate in {self.name}: {len(pipeline)} stages")
+        return MockCursor([])
+    
+    def create_index(self, keys, **kwargs):
+        """Mock create_index operation"""
+        logger.debug(f"Mock create_index in {self.name}: {keys}")
+        return None
+    
     def delete_one(self, query):
         """Mock delete_one operation"""
         logger.debug(f"Mock delete_one in {self.name}: {query}")
         return MockResult(deleted_count=1)
+    
+    def delete_many(self, query):
+        """Mock delete_many operation"""
+        logger.debug(f"Mock delete_many in {self.name}: {query}")
+        return MockResult(deleted_count=0)
 
 class MockCursor:
     """Mock cursor for development"""
@@ -113,16 +163,20 @@ class MockCursor:
     def sort(self, key, direction=1):
         return self
     
+    def batch_size(self, size):
+        return self
+    
     def __iter__(self):
         return iter(self.data)
 
 class MockResult:
     """Mock result for database operations"""
     
-    def __init__(self, upserted_id=None, modified_count=0, deleted_count=0):
+    def __init__(self, upserted_id=None, modified_count=0, deleted_count=0, upserted_count=0):
         self.upserted_id = upserted_id
         self.modified_count = modified_count
         self.deleted_count = deleted_count
+        self.upserted_count = upserted_count
 
 # Global database instance
 db_instance = Database()
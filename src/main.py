@@ -10,12 +10,23 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 # Import configuration and database
 from src.config import Config
 from src.database import db_instance
+from src.services.autocomplete import autocomplete_index
+from src.services.search_index import search_index
+from src.services.invalidation_bus import invalidation_bus
+from src.models.keyword import Keyword
+from src.models.keyword_history import KeywordHistory
+from src.models.niche import Niche
+from src.models.product import Product
+from src.models.review import Review
+from src.models.tombstone import Tombstone
 
 # Import all route blueprints
 from src.routes.user import user_bp
 from src.routes.keywords import keywords_bp
 from src.routes.niches import niches_bp
 from src.routes.products import products_bp
+from src.routes.sync import sync_bp
+from src.routes.search import search_bp
 
 # Configure logging
 logging.basicConfig(
@@ -39,6 +50,8 @@ def create_app():
     app.register_blueprint(keywords_bp, url_prefix='/api')
     app.register_blueprint(niches_bp, url_prefix='/api')
     app.register_blueprint(products_bp, url_prefix='/api')
+    app.register_blueprint(sync_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -73,6 +86,8 @@ def create_app():
                 'niches': '/api/niches/*',
                 'products': '/api/products/*',
                 'users': '/api/users/*',
+                'search': '/api/search?q=',
+                'sync': '/api/sync/<collection>?since=',
                 'health': '/api/health'
             }
         }
@@ -99,7 +114,8 @@ def create_app():
 # Create the Flask app
 app = create_app()
 
-if __name__ == '__main__':
+def initialize():
+    """Connect the database and build indexes before serving traffic"""
     try:
         # Validate configuration
         Config.validate_config()
@@ -116,5 +132,22 @@ if __name__ == '__main__':
         logger.error(f"Failed to initialize database: {e}")
         logger.info("Running in development mode without database")
     
+    # Build in-memory indexes before serving traffic
+    try:
+        Keyword.ensure_indexes()
+        KeywordHistory.ensure_indexes()
+        Niche.ensure_indexes()
+        Product.ensure_indexes()
+        Review.ensure_indexes()
+        Tombstone.ensure_indexes()
+        autocomplete_index.build()
+        search_index.build()
+    except Exception as e:
+        logger.warning(f"Failed to build indexes: {e}")
+
+if __name__ == '__main__':
+    # Development server; run src/server.py in production
+    initialize()
+    invalidation_bus.start()
     logger.info("Starting Niche Compass API server...")
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,9 +1,32 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from src.database import get_collection
 from src.config import Config
+from src.models.keyword_history import KeywordHistory
+from src.models.timestamps import parse_datetime
+from src.models.tombstone import Tombstone
+from src.services.keyword_graph import keyword_graph
+from src.services.autocomplete import autocomplete_index
+from src.services.invalidation_bus import invalidation_bus
+from src.services.raw_json import DocumentShape, find_documents, or_default, timestamp_or_now, normalized_name
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Keyword:
+    # How from_dict() and the constructor fill in to_dict() fields, for serializing stored documents directly
+    JSON_SHAPE = DocumentShape({
+        '_id': None, 'keyword': None, 'search_volume': None, 'competition_level': None, 'trend_direction': None,
+        'related_keywords': [], 'niche': None, 'price_range': {}, 'seasonal_data': {}, 'last_updated': None,
+        'created_at': None
+    }, {
+        'keyword': normalized_name, 'related_keywords': or_default([]), 'niche': normalized_name,
+        'price_range': or_default({}), 'seasonal_data': or_default({}),
+        'last_updated': timestamp_or_now, 'created_at': timestamp_or_now
+    })
+    
     def __init__(self, keyword, search_volume=None, competition_level=None,
                  trend_direction=None, related_keywords=None, niche=None,
                  price_range=None, seasonal_data=None, last_updated=None,
@@ -14,7 +37,7 @@ class Keyword:
         self.competition_level = competition_level  # 'low', 'medium', 'high'
         self.trend_direction = trend_direction  # 'rising', 'stable', 'declining'
         self.related_keywords = related_keywords or []
-        self.niche = niche
+        self.niche = niche.lower().strip() if niche else niche
         self.price_range = price_range or {}  # {'min': 0, 'max': 100, 'avg': 50}
         self.seasonal_data = seasonal_data or {}
         self.last_updated = last_updated or datetime.utcnow()
@@ -36,6 +59,12 @@ class Keyword:
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
+    def to_document(self):
+        """Convert to a database document, keeping the ID and timestamps native so they can be indexed"""
+        data = self.to_dict()
+        data.update(_id=self._id, last_updated=self.last_updated, created_at=self.created_at)
+        return data
+    
     @classmethod
     def from_dict(cls, data):
         """Create Keyword instance from dictionary"""
@@ -49,8 +78,8 @@ class Keyword:
             niche=data.get('niche'),
             price_range=data.get('price_range', {}),
             seasonal_data=data.get('seasonal_data', {}),
-            last_updated=data.get('last_updated'),
-            created_at=data.get('created_at')
+            last_updated=parse_datetime(data.get('last_updated')),
+            created_at=parse_datetime(data.get('created_at'))
         )
     
     def save(self):
@@ -60,16 +89,110 @@ class Keyword:
             return None
             
         self.last_updated = datetime.utcnow()
-        data = self.to_dict()
-        data['_id'] = self._id
+        data = self.to_document()
         
         result = collection.replace_one(
             {'_id': self._id},
             data,
             upsert=True
         )
+        invalidation_bus.publish(Config.COLLECTION_KEYWORDS, [self.keyword])
         return result
     
+    def upsert(self):
+        """Insert keyword unless it already exists and return the stored version"""
+        collection = get_collection(Config.COLLECTION_KEYWORDS)
+        if collection is None:
+            return self
+            
+        self.last_updated = datetime.utcnow()
+        data = self.to_document()
+        
+        try:
+            stored = collection.find_one_and_update(
+                {'keyword': self.keyword},
+                {'$setOnInsert': data},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent upsert from another worker inserted it first
+            stored = collection.find_one({'keyword': self.keyword})
+        if stored and stored['_id'] != self._id:
+            return Keyword.from_dict(stored)
+        invalidation_bus.publish(Config.COLLECTION_KEYWORDS, [self.keyword])
+        keyword_graph.add_keyword(self.keyword, self.search_volume, self.competition_level, self.related_keywords)
+        autocomplete_index.insert(self.keyword, self.search_volume)
+        KeywordHistory.record(self.keyword, self.search_volume)
+        return self
+    
+    @classmethod
+    def bulk_upsert(cls, keywords):
+        """Insert many new keywords in one bulk write and return the stored versions, in order"""
+        collection = get_collection(Config.COLLECTION_KEYWORDS)
+        if collection is None or not keywords:
+            return keywords
+            
+        now = datetime.utcnow()
+        operations = []
+        for keyword in keywords:
+            keyword.last_updated = now
+            data = keyword.to_document()
+            operations.append(UpdateOne({'keyword': keyword.keyword}, {'$setOnInsert': data}, upsert=True))
+        
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            upserted = getattr(result, 'upserted_ids', None) or {}
+        except BulkWriteError as e:
+            # Keywords a concurrent upsert inserted first fail on the unique index; the rest were applied
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+            upserted = {item['index']: item['_id'] for item in e.details.get('upserted', [])}
+        inserted = [keywords[i] for i in sorted(upserted)]
+        stored = {keyword.keyword: keyword for keyword in inserted}
+        
+        # Another process inserted these since our lookup; theirs is the stored version
+        lost = [keyword.keyword for keyword in keywords if keyword.keyword not in stored]
+        if lost:
+            stored.update((keyword.keyword, keyword) for keyword in cls.find_many(lost) if keyword)
+        
+        if inserted:
+            invalidation_bus.publish(Config.COLLECTION_KEYWORDS, [keyword.keyword for keyword in inserted])
+            for keyword in inserted:
+                keyword_graph.add_keyword(keyword.keyword, keyword.search_volume, keyword.competition_level, keyword.related_keywords)
+                autocomplete_index.insert(keyword.keyword, keyword.search_volume)
+            KeywordHistory.record_many([(keyword.keyword, keyword.search_volume) for keyword in inserted])
+        return [stored.get(keyword.keyword, keyword) for keyword in keywords]
+    
+    @classmethod
+    def bulk_set(cls, updates):
+        """Set refreshed fields on many stored keywords in one bulk write, keyed by keyword"""
+        collection = get_collection(Config.COLLECTION_KEYWORDS)
+        if collection is None or not updates:
+            return None
+            
+        now = datetime.utcnow()
+        result = collection.bulk_write([
+            UpdateOne({'keyword': keyword}, {'$set': dict(fields, last_updated=now)})
+            for keyword, fields in updates.items()
+        ], ordered=False)
+        invalidation_bus.publish(Config.COLLECTION_KEYWORDS, list(updates))
+        for keyword, fields in updates.items():
+            keyword_graph.add_keyword(keyword, fields.get('search_volume'), fields.get('competition_level'))
+        return result
+    
+    @classmethod
+    def ensure_indexes(cls):
+        """Create the unique keyword index upserts rely on and the index used by incremental sync"""
+        collection = get_collection(Config.COLLECTION_KEYWORDS)
+        if collection is None:
+            return None
+        collection.create_index([('last_updated', ASCENDING), ('_id', ASCENDING)])
+        try:
+            collection.create_index('keyword', unique=True)
+        except OperationFailure as e:
+            logger.warning(f"Could not create unique keyword index; merge duplicate keywords first: {str(e)}")
+    
     @classmethod
     def find_by_keyword(cls, keyword):
         """Find keyword by exact match"""
@@ -83,60 +206,58 @@ class Keyword:
         return None
     
     @classmethod
-    def search_keywords(cls, query, limit=20):
-        """Search keywords by partial match"""
+    def find_many(cls, keywords):
+        """Find keywords by exact match with one query; returns a list aligned with keywords, None where missing"""
         collection = get_collection(Config.COLLECTION_KEYWORDS)
         if collection is None:
-            return []
+            return [None] * len(keywords)
             
-        cursor = collection.find({
-            'keyword': {'$regex': query.lower(), '$options': 'i'}
-        }).limit(limit).sort('search_volume', -1)
-        return [cls.from_dict(data) for data in cursor]
+        normalized = [keyword.lower().strip() for keyword in keywords]
+        found = {data['keyword']: cls.from_dict(data) for data in collection.find({'keyword': {'$in': normalized}})}
+        return [found.get(keyword) for keyword in normalized]
     
     @classmethod
-    def get_trending_keywords(cls, limit=50):
-        """Get trending keywords (rising trend direction)"""
+    def _by_volume(cls, query, limit, as_json):
+        """Keywords matching a query, highest search volume first"""
         collection = get_collection(Config.COLLECTION_KEYWORDS)
         if collection is None:
             return []
+        if as_json:
+            return find_documents(collection, cls.JSON_SHAPE, query, [('search_volume', -1)], limit=limit)
             
-        cursor = collection.find({
-            'trend_direction': 'rising'
-        }).limit(limit).sort('search_volume', -1)
+        cursor = collection.find(query).limit(limit).sort('search_volume', -1)
         return [cls.from_dict(data) for data in cursor]
     
     @classmethod
-    def get_by_niche(cls, niche, limit=30):
+    def search_keywords(cls, query, limit=20, as_json=False):
+        """Search keywords by partial match; as_json returns to_dict()-shaped documents without building models"""
+        return cls._by_volume({'keyword': {'$regex': query.lower(), '$options': 'i'}}, limit, as_json)
+    
+    @classmethod
+    def get_trending_keywords(cls, limit=50, as_json=False):
+        """Get trending keywords (rising trend direction)"""
+        return cls._by_volume({'trend_direction': 'rising'}, limit, as_json)
+    
+    @classmethod
+    def get_by_niche(cls, niche, limit=30, as_json=False):
         """Get keywords by niche"""
-        collection = get_collection(Config.COLLECTION_KEYWORDS)
-        if collection is None:
-            return []
-            
-        cursor = collection.find({'niche': niche}).limit(limit).sort('search_volume', -1)
-        return [cls.from_dict(data) for data in cursor]
+        return cls._by_volume({'niche': niche.lower().strip()}, limit, as_json)
     
     @classmethod
-    def get_low_competition(cls, max_competition='medium', limit=30):
+    def get_low_competition(cls, max_competition='medium', limit=30, as_json=False):
         """Get keywords with low to medium competition"""
-        collection = get_collection(Config.COLLECTION_KEYWORDS)
-        if collection is None:
-            return []
-            
         competition_order = ['low', 'medium', 'high']
         max_index = competition_order.index(max_competition)
         allowed_levels = competition_order[:max_index + 1]
         
-        cursor = collection.find({
-            'competition_level': {'$in': allowed_levels}
-        }).limit(limit).sort('search_volume', -1)
-        return [cls.from_dict(data) for data in cursor]
+        return cls._by_volume({'competition_level': {'$in': allowed_levels}}, limit, as_json)
     
     def add_related_keyword(self, related_keyword):
         """Add a related keyword"""
         if related_keyword not in self.related_keywords:
             self.related_keywords.append(related_keyword)
             self.save()
+            keyword_graph.add_related(self.keyword, related_keyword)
     
     def update_trend_data(self, search_volume=None, competition_level=None, trend_direction=None):
         """Update trend data for the keyword"""
@@ -149,6 +270,10 @@ class Keyword:
         
         self.last_updated = datetime.utcnow()
         self.save()
+        keyword_graph.add_keyword(self.keyword, search_volume, competition_level)
+        if search_volume is not None:
+            autocomplete_index.insert(self.keyword, search_volume)
+            KeywordHistory.record(self.keyword, search_volume)
     
     def delete(self):
         """Delete keyword from database"""
@@ -157,5 +282,28 @@ class Keyword:
             return None
             
         result = collection.delete_one({'_id': self._id})
+        invalidation_bus.publish(Config.COLLECTION_KEYWORDS, [self.keyword])
+        keyword_graph.remove_keyword(self.keyword)
+        try:
+            Tombstone.record(Config.COLLECTION_KEYWORDS, [self._id])
+        except Exception as e:
+            logger.warning(f"Failed to record deletion of keyword {self.keyword}: {str(e)}")
         return result
 
+def _refresh_keyword_indexes(keywords):
+    """Apply other workers' keyword writes and deletes to this process's autocomplete index and keyword graph"""
+    if keywords is None:
+        autocomplete_index.build()
+        keyword_graph.build()
+        return
+    keywords = list(keywords)
+    for name, keyword in zip(keywords, Keyword.find_many(keywords)):
+        if keyword:
+            keyword_graph.add_keyword(keyword.keyword, keyword.search_volume, keyword.competition_level, keyword.related_keywords)
+            autocomplete_index.insert(keyword.keyword, keyword.search_volume)
+        else:
+            # Deleted by another worker
+            keyword_graph.remove_keyword(name)
+
+invalidation_bus.subscribe(Config.COLLECTION_KEYWORDS, _refresh_keyword_indexes, local=False)
+
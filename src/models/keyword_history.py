@@ -0,0 +1,238 @@
+import calendar
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
+from src.database import get_collection
+from src.config import Config
+
+RESOLUTION_RAW = 'raw'
+RESOLUTION_DAILY = 'daily'
+RESOLUTION_MONTHLY = 'monthly'
+RESOLUTIONS = (RESOLUTION_RAW, RESOLUTION_DAILY, RESOLUTION_MONTHLY)
+
+# Ranges up to this long are served from raw buckets when resolution is automatic
+RAW_MAX_RANGE = timedelta(days=31)
+DAILY_MAX_RANGE = timedelta(days=400)
+
+def _epoch(timestamp):
+    """Seconds since the epoch for a naive UTC datetime"""
+    return calendar.timegm(timestamp.timetuple())
+
+def _calendar_months(points):
+    """Values for every calendar month from the first (year, month) point to the last, NaN where a month has none"""
+    first_year, first_month = min(points)
+    last_year, last_month = max(points)
+    values = [float('nan')] * ((last_year - first_year) * 12 + last_month - first_month + 1)
+    for (year, month), value in points.items():
+        values[(year - first_year) * 12 + month - first_month] = value
+    return values
+
+class KeywordHistory:
+    """Bucketed search-volume history for keywords.
+
+    Raw samples are appended to fixed-size bucket documents, one or more per
+    keyword and month. Every sample is also folded into a per-keyword, per-year
+    rollup document holding daily and monthly sums and counts, so long ranges
+    are read from one or two rollups. Raw buckets past the retention window are
+    dropped by `downsample`, leaving only the rollups.
+    """
+
+    @staticmethod
+    def _collection():
+        return get_collection(Config.COLLECTION_KEYWORD_HISTORY)
+
+    @classmethod
+    def ensure_indexes(cls):
+        """Create the indexes used by bucket upserts and range reads"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+        collection.create_index([('keyword', ASCENDING), ('resolution', ASCENDING), ('period', ASCENDING)])
+        collection.create_index([('resolution', ASCENDING), ('last', ASCENDING)])
+
+    @staticmethod
+    def _sample_operations(keyword, search_volume, timestamp):
+        """Raw bucket append and rollup increments for one sample"""
+        day = timestamp.strftime('%m%d')
+        month = timestamp.strftime('%m')
+        return [
+            # Fills the current bucket; once it holds HISTORY_BUCKET_SIZE samples
+            # the filter stops matching and the upsert opens a new bucket
+            UpdateOne(
+                {
+                    'keyword': keyword,
+                    'resolution': RESOLUTION_RAW,
+                    'period': timestamp.strftime('%Y-%m'),
+                    'count': {'$lt': Config.HISTORY_BUCKET_SIZE}
+                },
+                {
+                    '$push': {'timestamps': timestamp, 'volumes': search_volume},
+                    '$inc': {'count': 1, 'sum': search_volume},
+                    '$min': {'min': search_volume, 'first': timestamp},
+                    '$max': {'max': search_volume, 'last': timestamp}
+                },
+                upsert=True
+            ),
+            UpdateOne(
+                {'keyword': keyword, 'resolution': RESOLUTION_DAILY, 'period': timestamp.strftime('%Y')},
+                {
+                    '$inc': {
+                        f'days.{day}.sum': search_volume,
+                        f'days.{day}.count': 1,
+                        f'months.{month}.sum': search_volume,
+                        f'months.{month}.count': 1
+                    },
+                    '$max': {'last': timestamp}
+                },
+                upsert=True
+            )
+        ]
+
+    @classmethod
+    def record(cls, keyword, search_volume, timestamp=None):
+        """Append a search volume sample to the keyword's history"""
+        return cls.record_many([(keyword, search_volume)], timestamp)
+
+    @classmethod
+    def record_many(cls, samples, timestamp=None):
+        """Append (keyword, search_volume) samples to their keywords' histories in one bulk write"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+
+        timestamp = timestamp or datetime.utcnow()
+        operations = []
+        for keyword, search_volume in samples:
+            if search_volume is not None:
+                operations.extend(cls._sample_operations(keyword.lower().strip(), search_volume, timestamp))
+        if not operations:
+            return None
+        return collection.bulk_write(operations)
+
+    @classmethod
+    def get_range(cls, keyword, start, end, resolution=None):
+        """Return history between start and end as parallel timestamp/volume arrays"""
+        if resolution is None:
+            span = end - start
+            if span <= RAW_MAX_RANGE:
+                resolution = RESOLUTION_RAW
+            elif span <= DAILY_MAX_RANGE:
+                resolution = RESOLUTION_DAILY
+            else:
+                resolution = RESOLUTION_MONTHLY
+
+        keyword = keyword.lower().strip()
+        if resolution == RESOLUTION_RAW:
+            timestamps, volumes = cls._raw_range(keyword, start, end)
+        else:
+            timestamps, volumes = cls._rollup_range(keyword, start, end, resolution)
+
+        return {
+            'keyword': keyword,
+            'resolution': resolution,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'timestamps': timestamps,
+            'volumes': volumes
+        }
+
+    @classmethod
+    def _raw_range(cls, keyword, start, end):
+        collection = cls._collection()
+        if collection is None:
+            return [], []
+
+        periods = []
+        month = datetime(start.year, start.month, 1)
+        while month <= end:
+            periods.append(month.strftime('%Y-%m'))
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        cursor = collection.find(
+            {'keyword': keyword, 'resolution': RESOLUTION_RAW, 'period': {'$in': periods}},
+            {'timestamps': 1, 'volumes': 1}
+        ).sort('first', 1)
+
+        timestamps = []
+        volumes = []
+        for bucket in cursor:
+            for timestamp, volume in zip(bucket.get('timestamps', []), bucket.get('volumes', [])):
+                if start <= timestamp <= end:
+                    timestamps.append(_epoch(timestamp))
+                    volumes.append(volume)
+        return timestamps, volumes
+
+    @classmethod
+    def _rollup_range(cls, keyword, start, end, resolution):
+        collection = cls._collection()
+        if collection is None:
+            return [], []
+
+        field = 'days' if resolution == RESOLUTION_DAILY else 'months'
+        periods = [str(year) for year in range(start.year, end.year + 1)]
+        cursor = collection.find(
+            {'keyword': keyword, 'resolution': RESOLUTION_DAILY, 'period': {'$in': periods}},
+            {'period': 1, field: 1}
+        ).sort('period', 1)
+
+        # Rollup points are compared by their period start
+        range_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        if resolution == RESOLUTION_MONTHLY:
+            range_start = range_start.replace(day=1)
+
+        timestamps = []
+        volumes = []
+        for rollup in cursor:
+            year = int(rollup['period'])
+            for key, totals in sorted((rollup.get(field) or {}).items()):
+                if resolution == RESOLUTION_DAILY:
+                    point = datetime(year, int(key[:2]), int(key[2:]))
+                else:
+                    point = datetime(year, int(key), 1)
+                if range_start <= point <= end and totals.get('count'):
+                    timestamps.append(_epoch(point))
+                    volumes.append(round(totals['sum'] / totals['count'], 2))
+        return timestamps, volumes
+
+    @classmethod
+    def downsample(cls, retention_days=None):
+        """Drop raw buckets older than the retention window; rollups keep their data"""
+        collection = cls._collection()
+        if collection is None:
+            return 0
+
+        retention_days = retention_days or Config.HISTORY_RAW_RETENTION_DAYS
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        result = collection.delete_many({'resolution': RESOLUTION_RAW, 'last': {'$lt': cutoff}})
+        return result.deleted_count
+
+    @classmethod
+    def monthly_series(cls):
+        """Yield (keyword, monthly mean volumes) for every keyword with history.
+
+        Every calendar month between a keyword's first and last sample gets a
+        value, NaN where nothing was recorded, so lags stay a fixed number of
+        months apart.
+        """
+        collection = cls._collection()
+        if collection is None:
+            return
+
+        cursor = collection.find(
+            {'resolution': RESOLUTION_DAILY},
+            {'keyword': 1, 'period': 1, 'months': 1}
+        ).sort([('keyword', 1), ('period', 1)])
+
+        keyword = None
+        points = {}
+        for rollup in cursor:
+            if rollup['keyword'] != keyword:
+                if points:
+                    yield keyword, _calendar_months(points)
+                keyword = rollup['keyword']
+                points = {}
+            year = int(rollup['period'])
+            for month, totals in (rollup.get('months') or {}).items():
+                if totals.get('count'):
+                    points[(year, int(month))] = totals['sum'] / totals['count']
+        if points:
+            yield keyword, _calendar_months(points)
@@ -1,14 +1,41 @@
+import re
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from src.database import get_collection
 from src.config import Config
+from src.models.niche_stats import NicheStats
+from src.models.niche_top_products import NicheTopProducts
+from src.models.review_stats import ReviewStats, SCOPE_NICHE, stats_id
+from src.models.timestamps import parse_datetime
+from src.models.tombstone import Tombstone
+from src.services.niche_rankings import update_rankings_for_niche, remove_niche_from_rankings
+from src.services.invalidation_bus import invalidation_bus
+from src.services.search_index import search_index, KIND_NICHE
+from src.services.raw_json import DocumentShape, find_documents, or_default, timestamp_or_now, normalized_name
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Niche:
+    # How from_dict() and the constructor fill in to_dict() fields, for serializing stored documents directly
+    JSON_SHAPE = DocumentShape({
+        '_id': None, 'name': None, 'category': None, 'description': None, 'trend_data': {},
+        'competition_score': None, 'demand_score': None, 'visual_analysis': {}, 'top_products': [],
+        'price_analysis': {}, 'sales_analysis': {}, 'created_at': None, 'updated_at': None
+    }, {
+        'name': normalized_name, 'trend_data': or_default({}), 'visual_analysis': or_default({}),
+        'top_products': or_default([]), 'price_analysis': or_default({}), 'sales_analysis': or_default({}),
+        'created_at': timestamp_or_now, 'updated_at': timestamp_or_now
+    })
+    
     def __init__(self, name, category=None, description=None, trend_data=None, 
                  competition_score=None, demand_score=None, visual_analysis=None,
-                 top_products=None, price_analysis=None, created_at=None, updated_at=None, _id=None):
+                 top_products=None, price_analysis=None, sales_analysis=None,
+                 created_at=None, updated_at=None, _id=None):
         self._id = _id or ObjectId()
-        self.name = name
+        self.name = name.lower().strip() if name else name  # Normalize name; upserts match it exactly
         self.category = category
         self.description = description
         self.trend_data = trend_data or {}
@@ -17,6 +44,7 @@ class Niche:
         self.visual_analysis = visual_analysis or {}
         self.top_products = top_products or []
         self.price_analysis = price_analysis or {}
+        self.sales_analysis = sales_analysis or {}
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
     
@@ -33,10 +61,17 @@ class Niche:
             'visual_analysis': self.visual_analysis,
             'top_products': self.top_products,
             'price_analysis': self.price_analysis,
+            'sales_analysis': self.sales_analysis,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def to_document(self):
+        """Convert to a database document, keeping the ID and timestamps native so they can be indexed"""
+        data = self.to_dict()
+        data.update(_id=self._id, created_at=self.created_at, updated_at=self.updated_at)
+        return data
+    
     @classmethod
     def from_dict(cls, data):
         """Create Niche instance from dictionary"""
@@ -51,8 +86,9 @@ class Niche:
             visual_analysis=data.get('visual_analysis', {}),
             top_products=data.get('top_products', []),
             price_analysis=data.get('price_analysis', {}),
-            created_at=data.get('created_at'),
-            updated_at=data.get('updated_at')
+            sales_analysis=data.get('sales_analysis', {}),
+            created_at=parse_datetime(data.get('created_at')),
+            updated_at=parse_datetime(data.get('updated_at'))
         )
     
     def save(self):
@@ -62,16 +98,107 @@ class Niche:
             return None
             
         self.updated_at = datetime.utcnow()
-        data = self.to_dict()
-        data['_id'] = self._id
+        data = self.to_document()
         
-        result = collection.replace_one(
+        # Product writes maintain top_products in place, so a save only seeds it
+        fields = {field: value for field, value in data.items() if field not in ('_id', 'top_products')}
+        result = collection.update_one(
             {'_id': self._id},
-            data,
+            {'$set': fields, '$setOnInsert': {'top_products': data['top_products']}},
             upsert=True
         )
+        invalidation_bus.publish(Config.COLLECTION_NICHES, [self._id])
+        search_index.index_documents(KIND_NICHE, [data])
+        self._refresh_rankings(data)
         return result
     
+    def _refresh_rankings(self, data):
+        """Keep the materialized trending/opportunity rankings in step with this niche"""
+        try:
+            update_rankings_for_niche(data)
+        except Exception as e:
+            logger.warning(f"Failed to refresh rankings for niche {self._id}: {str(e)}")
+    
+    def apply_stats(self, stats):
+        """Set price and sales analysis from the niche's running stats"""
+        analysis = NicheStats.analysis(stats)
+        self.price_analysis = analysis['price_analysis']
+        self.sales_analysis = analysis['sales_analysis']
+    
+    def compute_market_stats(self):
+        """Fill price and sales analysis, aggregating the niche's products if no running stats exist yet"""
+        stats = NicheStats.get(self.name) or NicheStats.rebuild(self.name)
+        if stats is None:
+            return False
+        self.apply_stats(stats)
+        return True
+    
+    def compute_top_products(self):
+        """Fill top products from the niche's best-selling products; product writes keep them current"""
+        self.top_products = NicheTopProducts.compute(self.name)
+    
+    @classmethod
+    def _with_stats(cls, niches):
+        """Attach current running stats to loaded niches with a single read"""
+        stats = NicheStats.get_many([niche.name for niche in niches if niche])
+        for niche in niches:
+            if niche and niche.name in stats:
+                niche.apply_stats(stats[niche.name])
+        return niches
+    
+    def upsert(self):
+        """Insert niche unless one with the same name exists and return the stored version"""
+        collection = get_collection(Config.COLLECTION_NICHES)
+        if collection is None:
+            return self
+            
+        self.updated_at = datetime.utcnow()
+        data = self.to_document()
+        
+        try:
+            stored = collection.find_one_and_update(
+                {'name': self.name},
+                {'$setOnInsert': data},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent upsert from another worker inserted it first
+            stored = collection.find_one({'name': self.name})
+        if stored and stored['_id'] != self._id:
+            return Niche.from_dict(stored)
+        search_index.index_documents(KIND_NICHE, [data])
+        self._refresh_rankings(data)
+        return self
+    
+    @classmethod
+    def ensure_indexes(cls):
+        """Create the unique name index upserts rely on and the index used by listings and incremental sync"""
+        collection = get_collection(Config.COLLECTION_NICHES)
+        if collection is None:
+            return None
+        collection.create_index([('updated_at', ASCENDING), ('_id', ASCENDING)])
+        try:
+            collection.create_index('name', unique=True)
+        except OperationFailure as e:
+            logger.warning(f"Could not create unique niche name index; merge duplicate niches first: {str(e)}")
+    
+    @classmethod
+    def with_stats_json(cls, documents):
+        """Set current running stats on to_dict()-shaped niche documents with a single read"""
+        stats = NicheStats.get_many([data['name'] for data in documents if data['name']])
+        for data in documents:
+            if data['name'] in stats:
+                analysis = NicheStats.analysis(stats[data['name']])
+                data['price_analysis'] = analysis['price_analysis']
+                data['sales_analysis'] = analysis['sales_analysis']
+        return documents
+    
+    @classmethod
+    def from_documents(cls, documents):
+        """Niches from stored documents with their current running stats attached"""
+        return cls._with_stats([cls.from_dict(data) for data in documents])
+    
     @classmethod
     def find_by_id(cls, niche_id):
         """Find niche by ID"""
@@ -81,40 +208,91 @@ class Niche:
             
         data = collection.find_one({'_id': ObjectId(niche_id)})
         if data:
-            return cls.from_dict(data)
+            return cls._with_stats([cls.from_dict(data)])[0]
         return None
     
+    @classmethod
+    def find_detail(cls, niche_id):
+        """Niche with its running stats, and its review sentiment summary, read with one aggregation"""
+        collection = get_collection(Config.COLLECTION_NICHES)
+        if collection is None:
+            return None, None
+            
+        # Both aggregates are keyed by niche name, so they are joined on the server
+        results = list(collection.aggregate([
+            {'$match': {'_id': ObjectId(niche_id)}},
+            {'$lookup': {'from': Config.COLLECTION_NICHE_STATS, 'localField': 'name', 'foreignField': '_id', 'as': 'market_stats'}},
+            {'$addFields': {'review_stats_id': {'$concat': [stats_id(SCOPE_NICHE, ''), '$name']}}},
+            {'$lookup': {'from': Config.COLLECTION_REVIEW_STATS, 'localField': 'review_stats_id', 'foreignField': '_id', 'as': 'review_stats'}}
+        ]))
+        if not results:
+            return None, None
+        data = results[0]
+        niche = cls.from_dict(data)
+        if data['market_stats']:
+            niche.apply_stats(data['market_stats'][0])
+        return niche, ReviewStats.summary(data['review_stats'][0] if data['review_stats'] else None)
+    
+    @classmethod
+    def find_many(cls, niche_ids):
+        """Find niches by ID with one query; returns a list aligned with niche_ids, None where missing"""
+        collection = get_collection(Config.COLLECTION_NICHES)
+        if collection is None:
+            return [None] * len(niche_ids)
+            
+        object_ids = [ObjectId(niche_id) for niche_id in niche_ids if ObjectId.is_valid(niche_id)]
+        found = {str(data['_id']): cls.from_dict(data) for data in collection.find({'_id': {'$in': object_ids}})}
+        return cls._with_stats([found.get(str(niche_id)) for niche_id in niche_ids])
+    
     @classmethod
     def find_by_name(cls, name):
-        """Find niche by name"""
+        """Find niche by its exact name, normalized like the stored one"""
         collection = get_collection(Config.COLLECTION_NICHES)
         if collection is None:
             return None
             
-        data = collection.find_one({'name': {'$regex': name, '$options': 'i'}})
+        data = collection.find_one({'name': name.lower().strip()})
         if data:
-            return cls.from_dict(data)
+            return cls._with_stats([cls.from_dict(data)])[0]
         return None
     
     @classmethod
-    def find_all(cls, limit=50, skip=0):
-        """Find all niches with pagination"""
+    def search_by_name(cls, query, limit=20, as_json=False):
+        """Search niches whose name contains the query; as_json returns to_dict()-shaped documents"""
+        collection = get_collection(Config.COLLECTION_NICHES)
+        if collection is None:
+            return []
+        query = {'name': {'$regex': re.escape(query), '$options': 'i'}}
+        if as_json:
+            return cls.with_stats_json(find_documents(collection, cls.JSON_SHAPE, query, limit=limit))
+            
+        cursor = collection.find(query).limit(limit)
+        return cls.from_documents(cursor)
+    
+    @classmethod
+    def find_all(cls, limit=50, skip=0, as_json=False):
+        """Find all niches with pagination; as_json returns to_dict()-shaped documents without building models"""
         collection = get_collection(Config.COLLECTION_NICHES)
         if collection is None:
             return []
+        if as_json:
+            return cls.with_stats_json(find_documents(collection, cls.JSON_SHAPE, {}, [('updated_at', -1)], skip, limit))
             
         cursor = collection.find().skip(skip).limit(limit).sort('updated_at', -1)
-        return [cls.from_dict(data) for data in cursor]
+        return cls.from_documents(cursor)
     
     @classmethod
-    def search_by_category(cls, category, limit=20):
-        """Search niches by category"""
+    def search_by_category(cls, category, limit=20, as_json=False):
+        """Search niches by category; as_json returns to_dict()-shaped documents without building models"""
         collection = get_collection(Config.COLLECTION_NICHES)
         if collection is None:
             return []
+        query = {'category': {'$regex': re.escape(category), '$options': 'i'}}
+        if as_json:
+            return cls.with_stats_json(find_documents(collection, cls.JSON_SHAPE, query, limit=limit))
             
-        cursor = collection.find({'category': {'$regex': category, '$options': 'i'}}).limit(limit)
-        return [cls.from_dict(data) for data in cursor]
+        cursor = collection.find(query).limit(limit)
+        return cls.from_documents(cursor)
     
     def delete(self):
         """Delete niche from database"""
@@ -123,5 +301,15 @@ class Niche:
             return None
             
         result = collection.delete_one({'_id': self._id})
+        invalidation_bus.publish(Config.COLLECTION_NICHES, [self._id])
+        search_index.remove([self._id])
+        try:
+            remove_niche_from_rankings(self._id)
+        except Exception as e:
+            logger.warning(f"Failed to remove niche {self._id} from rankings: {str(e)}")
+        try:
+            Tombstone.record(Config.COLLECTION_NICHES, [self._id])
+        except Exception as e:
+            logger.warning(f"Failed to record deletion of niche {self._id}: {str(e)}")
         return result
 
@@ -0,0 +1,258 @@
+import bisect
+import math
+from datetime import datetime
+from pymongo import UpdateOne
+from src.database import get_collection
+from src.config import Config
+
+# Numeric product fields with a running count, sum and sum of squares per niche
+STAT_FIELDS = ('price', 'rating', 'sales_estimate')
+
+# Product fields needed to work out how a write changes its niche's stats
+PRODUCT_STATS_PROJECTION = {'niche': 1, 'price': 1, 'rating': 1, 'sales_estimate': 1}
+
+# Lower bounds of the price distribution buckets; prices from the last bound up are 'over_100'
+PRICE_BUCKET_BOUNDARIES = [0, 25, 50, 100]
+PRICE_BUCKET_LABELS = {0: 'under_25', 25: '25_50', 50: '50_100', 'over_100': 'over_100'}
+
+def price_bucket(price):
+    """Histogram bucket of a price, matching the $bucket stage of the market pipeline"""
+    i = bisect.bisect_right(PRICE_BUCKET_BOUNDARIES, price) - 1
+    if 0 <= i < len(PRICE_BUCKET_BOUNDARIES) - 1:
+        return PRICE_BUCKET_LABELS[PRICE_BUCKET_BOUNDARIES[i]]
+    return PRICE_BUCKET_LABELS['over_100']
+
+def market_pipeline(niche=None, stats=True, top_limit=0):
+    """Aggregation over a niche's products: running-stat totals and/or its top sellers"""
+    facets = {}
+    if stats:
+        summary = {
+            '_id': None,
+            'product_count': {'$sum': 1},
+            'price_min': {'$min': '$price'},
+            'price_max': {'$max': '$price'},
+            'revenue': {'$sum': {'$multiply': ['$price', '$sales_estimate']}}
+        }
+        for field in STAT_FIELDS:
+            summary[f'{field}_count'] = {'$sum': {'$cond': [{'$gt': [f'${field}', None]}, 1, 0]}}
+            summary[f'{field}_sum'] = {'$sum': f'${field}'}
+            summary[f'{field}_sumsq'] = {'$sum': {'$multiply': [f'${field}', f'${field}']}}
+        facets['summary'] = [{'$group': summary}]
+        facets['distribution'] = [
+            {'$match': {'price': {'$type': 'number'}}},
+            {'$bucket': {
+                'groupBy': '$price',
+                'boundaries': PRICE_BUCKET_BOUNDARIES,
+                'default': 'over_100',
+                'output': {'count': {'$sum': 1}}
+            }}
+        ]
+    if top_limit:
+        facets['top_selling'] = [{'$sort': {'sales_estimate': -1}}, {'$limit': top_limit}]
+
+    pipeline = [{'$match': {'niche': niche}}] if niche else []
+    pipeline.append({'$facet': facets})
+    return pipeline
+
+def stats_from_facets(facets):
+    """Running-stats document built from the summary and distribution facets"""
+    summary = (facets.get('summary') or [{}])[0]
+    stats = {
+        'product_count': summary.get('product_count', 0),
+        'revenue': summary.get('revenue') or 0,
+        'price_histogram': {
+            PRICE_BUCKET_LABELS[bucket['_id']]: bucket['count'] for bucket in facets.get('distribution', [])
+        }
+    }
+    for field in STAT_FIELDS:
+        stats[field] = {
+            'count': summary.get(f'{field}_count', 0),
+            'sum': summary.get(f'{field}_sum') or 0,
+            'sumsq': summary.get(f'{field}_sumsq') or 0
+        }
+    stats['price']['min'] = summary.get('price_min')
+    stats['price']['max'] = summary.get('price_max')
+    return stats
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+def _moments(totals):
+    """Mean and standard deviation from a count/sum/sumsq triple"""
+    count = (totals or {}).get('count', 0)
+    if not count:
+        return None, None
+    mean = totals['sum'] / count
+    # Clamped: float cancellation can leave a tiny negative variance
+    variance = max(totals['sumsq'] / count - mean * mean, 0)
+    return mean, math.sqrt(variance)
+
+class NicheStats:
+    """Running product aggregates per niche.
+
+    Each niche has one document, keyed by niche name, holding the product
+    count, count/sum/sum-of-squares of price, rating and sales estimate, the
+    total estimated revenue and a fixed-bucket price histogram. Product writes
+    apply the difference between the old and new document with a single
+    atomic $inc, so price and sales analysis are read in O(1) instead of
+    rescanning the niche. The price range only widens on writes; `rebuild`
+    recomputes everything, including the range, from the products. Niches
+    serve their analysis from these stats, so every change also bumps the
+    niche's `updated_at` for incremental sync.
+    """
+
+    @staticmethod
+    def _collection():
+        return get_collection(Config.COLLECTION_NICHE_STATS)
+
+    @staticmethod
+    def _touch_niches(niches, now):
+        """Bump updated_at on the niche documents whose stats changed"""
+        collection = get_collection(Config.COLLECTION_NICHES)
+        if collection is not None and niches:
+            collection.update_many({'name': {'$in': list(niches)}}, {'$set': {'updated_at': now}})
+
+    @staticmethod
+    def contribution(product, sign=1):
+        """$inc amounts a product document adds to (sign=1) or removes from (sign=-1) its niche"""
+        inc = {'product_count': sign}
+        for field in STAT_FIELDS:
+            value = _number(product.get(field))
+            if value is not None:
+                inc[f'{field}.count'] = sign
+                inc[f'{field}.sum'] = sign * value
+                inc[f'{field}.sumsq'] = sign * value * value
+
+        price = _number(product.get('price'))
+        if price is not None:
+            inc[f'price_histogram.{price_bucket(price)}'] = sign
+            sales = _number(product.get('sales_estimate'))
+            if sales is not None:
+                inc['revenue'] = sign * price * sales
+        return inc
+
+    @classmethod
+    def updates(cls, changes):
+        """Merge (old, new) product documents into one update per touched niche"""
+        updates = {}
+        for old, new in changes:
+            for product, sign in ((old, -1), (new, 1)):
+                if not product or not product.get('niche'):
+                    continue
+                update = updates.setdefault(product['niche'], {'$inc': {}, '$min': {}, '$max': {}})
+                inc = update['$inc']
+                for path, amount in cls.contribution(product, sign).items():
+                    inc[path] = inc.get(path, 0) + amount
+
+                price = _number(product.get('price'))
+                if sign > 0 and price is not None:
+                    update['$min']['price.min'] = min(price, update['$min'].get('price.min', price))
+                    update['$max']['price.max'] = max(price, update['$max'].get('price.max', price))
+
+        # Rewriting a product with unchanged figures leaves nothing to apply;
+        # its price is already inside the stored range
+        merged = {}
+        for niche, update in updates.items():
+            update['$inc'] = {path: amount for path, amount in update['$inc'].items() if amount}
+            if update['$inc']:
+                merged[niche] = {operator: fields for operator, fields in update.items() if fields}
+        return merged
+
+    @classmethod
+    def apply(cls, changes):
+        """Fold (old, new) product documents into the stats of every niche they touch"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+
+        updates = cls.updates(changes)
+        if not updates:
+            return None
+
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({'_id': niche}, dict(update, **{'$set': {'updated_at': now}}), upsert=True)
+            for niche, update in updates.items()
+        ]
+        result = collection.bulk_write(operations, ordered=False)
+        cls._touch_niches(updates, now)
+        return result
+
+    @classmethod
+    def get(cls, niche):
+        """Running stats for one niche, or None if none have been recorded"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+        return collection.find_one({'_id': niche})
+
+    @classmethod
+    def get_many(cls, niches):
+        """Running stats for several niches, keyed by niche name"""
+        collection = cls._collection()
+        if collection is None or not niches:
+            return {}
+        return {stats['_id']: stats for stats in collection.find({'_id': {'$in': list(niches)}})}
+
+    @classmethod
+    def rebuild(cls, niche):
+        """Recompute a niche's stats from its products with one aggregation"""
+        products = get_collection(Config.COLLECTION_PRODUCTS)
+        collection = cls._collection()
+        if products is None or collection is None:
+            return None
+
+        results = list(products.aggregate(market_pipeline(niche)))
+        stats = stats_from_facets(results[0] if results else {})
+        stats['_id'] = niche
+        stats['updated_at'] = datetime.utcnow()
+        collection.replace_one({'_id': niche}, stats, upsert=True)
+        cls._touch_niches([niche], stats['updated_at'])
+        return stats
+
+    @classmethod
+    def rebuild_all(cls):
+        """Recompute the stats of every niche that has products"""
+        products = get_collection(Config.COLLECTION_PRODUCTS)
+        if products is None:
+            return 0
+
+        niches = [row['_id'] for row in products.aggregate([{'$group': {'_id': '$niche'}}]) if row['_id']]
+        for niche in niches:
+            cls.rebuild(niche)
+        return len(niches)
+
+    @staticmethod
+    def analysis(stats):
+        """Price and sales analysis derived from a running-stats document"""
+        stats = stats or {}
+        price = stats.get('price') or {}
+        average_price, price_stddev = _moments(price)
+        average_rating, _ = _moments(stats.get('rating'))
+        average_sales, sales_stddev = _moments(stats.get('sales_estimate'))
+        histogram = stats.get('price_histogram') or {}
+        priced = price.get('count', 0)
+
+        price_analysis = {
+            'product_count': stats.get('product_count', 0),
+            'average_price': _round(average_price),
+            'price_stddev': _round(price_stddev),
+            'price_range': {'min': price.get('min'), 'max': price.get('max')},
+            'price_distribution': {
+                label: round(100 * histogram.get(label, 0) / priced, 1) if priced else 0
+                for label in PRICE_BUCKET_LABELS.values()
+            }
+        }
+        sales_analysis = {
+            'total_sales_estimate': (stats.get('sales_estimate') or {}).get('sum', 0),
+            'average_sales_estimate': _round(average_sales),
+            'sales_stddev': _round(sales_stddev),
+            'estimated_revenue': _round(stats.get('revenue')),
+            'average_rating': _round(average_rating)
+        }
+        return {'price_analysis': price_analysis, 'sales_analysis': sales_analysis}
@@ -0,0 +1,126 @@
+from datetime import datetime
+from pymongo import ReturnDocument
+from src.database import get_collection
+from src.config import Config
+from src.models.niche_stats import market_pipeline
+
+# Product fields kept in a niche's top products list
+SUMMARY_FIELDS = ('title', 'url', 'store_name', 'price', 'currency', 'rating', 'reviews_count', 'sales_estimate')
+
+def _rank(sales_estimate):
+    """Sort value of a sales estimate; missing estimates rank below every number"""
+    if isinstance(sales_estimate, (int, float)) and not isinstance(sales_estimate, bool):
+        return sales_estimate
+    return float('-inf')
+
+def product_summary(product):
+    """Compact entry for a niche's top products list"""
+    summary = {'product_id': str(product['_id'])}
+    for field in SUMMARY_FIELDS:
+        summary[field] = product.get(field)
+    images = product.get('images') or []
+    summary['image'] = images[0] if images else None
+    return summary
+
+class NicheTopProducts:
+    """Bounded top-K products by sales estimate, kept on each niche document.
+
+    The list behaves like a min-heap of size K: a product write pushes its
+    summary with $sort/$slice, so anything below the K-th entry falls off
+    without a read. Products outside the list never outrank its last entry,
+    so the list only has to be rebuilt from the products collection when an
+    entry leaves a full list, or drops below its floor, and an outside
+    product might now belong in it. Every write bumps the niche's
+    `updated_at`, so incremental sync picks up the new list.
+    """
+
+    @staticmethod
+    def _collection():
+        return get_collection(Config.COLLECTION_NICHES)
+
+    @staticmethod
+    def compute(niche, k=None):
+        """Top-K product summaries for a niche, aggregated from the products collection"""
+        products = get_collection(Config.COLLECTION_PRODUCTS)
+        if products is None:
+            return []
+        results = list(products.aggregate(market_pipeline(niche, stats=False, top_limit=k or Config.NICHE_TOP_PRODUCTS)))
+        return [product_summary(product) for product in (results[0] if results else {}).get('top_selling', [])]
+
+    @classmethod
+    def rebuild(cls, niche):
+        """Recompute a niche's top products from scratch"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+        top_products = cls.compute(niche)
+        collection.update_one({'name': niche}, {'$set': {'top_products': top_products, 'updated_at': datetime.utcnow()}})
+        return top_products
+
+    @staticmethod
+    def _needs_rebuild(entries, change, k):
+        """Whether a listed product left a full list or fell below its floor"""
+        if len(entries) < k:
+            return False
+        floor = min(_rank(entry.get('sales_estimate')) for entry in entries)
+        for entry in entries:
+            if entry['product_id'] not in change['previous']:
+                continue
+            product = change['current'].get(entry['product_id'])
+            # An unlisted product may now belong in its place
+            if product is None or _rank(product.get('sales_estimate')) < floor:
+                return True
+        return False
+    
+    @classmethod
+    def apply(cls, changes):
+        """Fold (old, new) product documents into the top products of every niche they touch"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+
+        k = Config.NICHE_TOP_PRODUCTS
+        niches = {}
+        for old, new in changes:
+            if old and old.get('niche'):
+                # Previously in this niche, so possibly in its list
+                niches.setdefault(old['niche'], {'previous': set(), 'current': {}})['previous'].add(str(old['_id']))
+            if new and new.get('niche'):
+                niches.setdefault(new['niche'], {'previous': set(), 'current': {}})['current'][str(new['_id'])] = new
+
+        rebuilt = []
+        for niche, change in niches.items():
+            previous = list(change['previous'])
+            current = change['current']
+
+            before = None
+            if previous:
+                # Only writes when one of the products is actually listed
+                before = collection.find_one_and_update(
+                    {'name': niche, 'top_products.product_id': {'$in': previous}},
+                    {
+                        '$pull': {'top_products': {'product_id': {'$in': previous}}},
+                        '$set': {'updated_at': datetime.utcnow()}
+                    },
+                    projection={'top_products': 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+
+            if cls._needs_rebuild((before or {}).get('top_products') or [], change, k):
+                cls.rebuild(niche)
+                rebuilt.append(niche)
+                continue
+
+            if current:
+                collection.update_one(
+                    {'name': niche},
+                    {
+                        '$push': {'top_products': {
+                            '$each': [product_summary(product) for product in current.values()],
+                            '$sort': {'sales_estimate': -1},
+                            '$slice': k
+                        }},
+                        '$set': {'updated_at': datetime.utcnow()}
+                    }
+                )
+        return rebuilt
@@ -1,9 +1,94 @@
+import re
+import hashlib
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
 from bson import ObjectId
+from pymongo import UpdateOne, ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, UpdateResult
 from src.database import get_collection
 from src.config import Config
+from src.models.niche_stats import NicheStats, market_pipeline, stats_from_facets, PRODUCT_STATS_PROJECTION
+from src.models.niche_top_products import NicheTopProducts
+from src.models.timestamps import parse_datetime
+from src.models.tombstone import Tombstone
+from src.services.invalidation_bus import invalidation_bus
+from src.services.search_index import search_index, KIND_PRODUCT
+from src.services.raw_json import DocumentShape, find_documents, or_default, timestamp_or_now, normalized_name
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Etsy serves listings under an optional locale prefix, e.g. /uk/listing/<id> or /en-gb/listing/<id>
+_LISTING_PATH = re.compile(r'^(?:/[a-z]{2}(?:-[a-z]{2})?)?(/listing/\d+)')
+
+# Hosts whose listing pages the server may fetch, after normalization
+LISTING_HOSTS = ('etsy.com',)
+
+def _split_url(url):
+    """Scheme, lower-cased host without www, path with any listing locale and slug dropped, and query"""
+    url = url.strip()
+    if '://' not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    # Etsy listing slugs and locales are decorative: /uk/listing/<id>/<slug> is the same listing
+    match = _LISTING_PATH.match(path)
+    if match and host.endswith('etsy.com'):
+        path = match.group(1)
+    return parts.scheme.lower(), host, path, parts.query
+
+def normalize_url(url):
+    """Canonical product URL: lower-cased host, no www, fragment, listing locale or slug.
+
+    Listing hosts only use the query for tracking, so it is dropped there;
+    other sites can identify the product by it, so it is kept.
+    """
+    _, host, path, query = _split_url(url)
+    return urlunsplit(('https', host, path, '' if host in LISTING_HOSTS else query, ''))
+
+def listing_url(url):
+    """Canonical URL of an Etsy listing page, or None for any other URL.
+
+    The host must be exactly a listing host, so credentials, ports and
+    look-alike domains are rejected before anything is fetched.
+    """
+    scheme, host, path, _ = _split_url(url)
+    if scheme not in ('http', 'https') or host not in LISTING_HOSTS or not _LISTING_PATH.fullmatch(path):
+        return None
+    return urlunsplit(('https', host, path, '', ''))
+
+def url_hash(url):
+    """Stable key for a listing URL, shared by every variant of the same URL"""
+    return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+def _update_niche_aggregates(changes):
+    """Apply (old, new) product documents to the running niche stats and top products"""
+    try:
+        NicheStats.apply(changes)
+    except Exception as e:
+        logger.warning(f"Failed to update niche stats: {str(e)}")
+    try:
+        NicheTopProducts.apply(changes)
+    except Exception as e:
+        logger.warning(f"Failed to update niche top products: {str(e)}")
 
 class Product:
+    # How from_dict() and the constructor fill in to_dict() fields, for serializing stored documents directly
+    JSON_SHAPE = DocumentShape({
+        '_id': None, 'title': None, 'url': None, 'store_name': None, 'price': None, 'currency': 'USD',
+        'description': None, 'images': [], 'tags': [], 'category': None, 'sales_estimate': None,
+        'reviews_count': 0, 'rating': None, 'listing_date': None, 'niche': None, 'sentiment_analysis': {},
+        'created_at': None, 'updated_at': None
+    }, {
+        'images': or_default([]), 'tags': or_default([]), 'reviews_count': or_default(0),
+        'sentiment_analysis': or_default({}), 'listing_date': parse_datetime, 'niche': normalized_name,
+        'created_at': timestamp_or_now, 'updated_at': timestamp_or_now
+    })
+    
     def __init__(self, title, url, store_name, price=None, currency='USD', 
                  description=None, images=None, tags=None, category=None,
                  sales_estimate=None, reviews_count=None, rating=None,
@@ -23,7 +108,7 @@ class Product:
         self.reviews_count = reviews_count or 0
         self.rating = rating
         self.listing_date = listing_date
-        self.niche = niche
+        self.niche = niche.lower().strip() if niche else niche  # Same form as Niche.name
         self.sentiment_analysis = sentiment_analysis or {}
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
@@ -51,6 +136,12 @@ class Product:
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def to_document(self):
+        """Convert to a database document, keeping the ID and dates native so they can be indexed"""
+        data = self.to_dict()
+        data.update(_id=self._id, listing_date=self.listing_date, created_at=self.created_at, updated_at=self.updated_at)
+        return data
+    
     @classmethod
     def from_dict(cls, data):
         """Create Product instance from dictionary"""
@@ -68,30 +159,144 @@ class Product:
             sales_estimate=data.get('sales_estimate'),
             reviews_count=data.get('reviews_count', 0),
             rating=data.get('rating'),
-            listing_date=data.get('listing_date'),
+            listing_date=parse_datetime(data.get('listing_date')),
             niche=data.get('niche'),
             sentiment_analysis=data.get('sentiment_analysis', {}),
-            created_at=data.get('created_at'),
-            updated_at=data.get('updated_at')
+            created_at=parse_datetime(data.get('created_at')),
+            updated_at=parse_datetime(data.get('updated_at'))
         )
     
     def save(self):
         """Save product to database"""
+        return self.save_with_previous()[0]
+    
+    def save_with_previous(self):
+        """Save product and return (result, previous version's stats fields or None if it was new)"""
         collection = get_collection(Config.COLLECTION_PRODUCTS)
         if collection is None:
-            return None
+            return None, None
             
         self.updated_at = datetime.utcnow()
-        data = self.to_dict()
-        data['_id'] = self._id
+        data = self.to_document()
+        if self.url:
+            data['url_hash'] = url_hash(self.url)
         
-        result = collection.replace_one(
+        # The previous version gives the delta to apply to the niche stats
+        previous = collection.find_one_and_replace(
             {'_id': self._id},
             data,
-            upsert=True
+            projection=PRODUCT_STATS_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
         )
+        invalidation_bus.publish(Config.COLLECTION_PRODUCTS, [self._id])
+        search_index.index_documents(KIND_PRODUCT, [data])
+        _update_niche_aggregates([(previous, data)])
+        # What replace_one would have returned for the same write
+        if previous is None:
+            result = UpdateResult({'n': 1, 'nModified': 0, 'upserted': self._id, 'updatedExisting': False}, True)
+        else:
+            result = UpdateResult({'n': 1, 'nModified': 1, 'updatedExisting': True}, True)
+        return result, previous
+    
+    @classmethod
+    def bulk_upsert_by_url(cls, products):
+        """Upsert many products in one bulk write, keyed by normalized URL.
+
+        Each write is pinned to the version read for the niche stats deltas:
+        an existing product by its updated_at, a new one by its _id. If another
+        worker writes the same URL in between, the pinned upsert collides on
+        the unique url_hash index and that product is redone with an atomic
+        read of its previous version, so no delta is applied twice.
+        """
+        collection = get_collection(Config.COLLECTION_PRODUCTS)
+        if collection is None or not products:
+            return None
+            
+        now = datetime.utcnow()
+        batch = {}
+        for product in products:
+            product.url = normalize_url(product.url)
+            product.updated_at = now
+            data = product.to_document()
+            data.pop('_id')
+            created_at = data.pop('created_at')
+            data['url_hash'] = url_hash(product.url)
+            # A URL repeated within the batch: its last version wins
+            batch.pop(data['url_hash'], None)
+            batch[data['url_hash']] = (product, data, created_at)
+        batch = list(batch.values())
+        
+        projection = dict(PRODUCT_STATS_PROJECTION, url_hash=1, updated_at=1)
+        previous = {
+            data['url_hash']: data for data in collection.find(
+                {'url_hash': {'$in': [data['url_hash'] for _, data, _ in batch]}}, projection
+            )
+        }
+        operations = []
+        for product, data, created_at in batch:
+            existing = previous.get(data['url_hash'])
+            if existing:
+                pinned = {'url_hash': data['url_hash'], 'updated_at': existing.get('updated_at')}
+                on_insert = {'_id': product._id, 'created_at': created_at}
+            else:
+                pinned = {'url_hash': data['url_hash'], '_id': product._id}
+                on_insert = {'created_at': created_at}
+            operations.append(UpdateOne(pinned, {'$set': data, '$setOnInsert': on_insert}, upsert=True))
+        
+        conflicts = set()
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            upserted = getattr(result, 'upserted_ids', None) or {}
+        except BulkWriteError as e:
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+            result = BulkWriteResult(e.details, True)
+            upserted = {item['index']: item['_id'] for item in e.details.get('upserted', [])}
+            conflicts = {error['index'] for error in e.details['writeErrors']}
+        
+        changes = []
+        for i, (product, data, created_at) in enumerate(batch):
+            if i in conflicts:
+                existing = cls._upsert_returning_previous(
+                    collection, data, {'_id': product._id, 'created_at': created_at}, projection
+                )
+            elif i in upserted:
+                # Inserted by this write, even if a version read above was deleted meanwhile
+                existing = None
+            else:
+                existing = previous.get(data['url_hash'])
+            changes.append((existing, dict(data, _id=existing['_id'] if existing else product._id)))
+        invalidation_bus.publish(Config.COLLECTION_PRODUCTS, [current['_id'] for _, current in changes])
+        search_index.index_documents(KIND_PRODUCT, [current for _, current in changes])
+        _update_niche_aggregates(changes)
         return result
     
+    @staticmethod
+    def _upsert_returning_previous(collection, data, on_insert, projection):
+        """Upsert one product by URL with an atomic read of its previous version"""
+        update = {'$set': data, '$setOnInsert': on_insert}
+        try:
+            return collection.find_one_and_update(
+                {'url_hash': data['url_hash']}, update,
+                projection=projection, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # A concurrent insert of the same URL won; the retry updates its document
+            return collection.find_one_and_update(
+                {'url_hash': data['url_hash']}, update,
+                projection=projection, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+    
+    @classmethod
+    def ensure_indexes(cls):
+        """Create the unique URL index used by upserts and the index used by incremental sync"""
+        collection = get_collection(Config.COLLECTION_PRODUCTS)
+        if collection is None:
+            return None
+        collection.create_index([('url_hash', ASCENDING)], unique=True, sparse=True)
+        collection.create_index([('updated_at', ASCENDING), ('_id', ASCENDING)])
+    
     @classmethod
     def find_by_id(cls, product_id):
         """Find product by ID"""
@@ -104,6 +309,17 @@ class Product:
             return cls.from_dict(data)
         return None
     
+    @classmethod
+    def find_many(cls, product_ids):
+        """Find products by ID with one query; returns a list aligned with product_ids, None where missing"""
+        collection = get_collection(Config.COLLECTION_PRODUCTS)
+        if collection is None:
+            return [None] * len(product_ids)
+            
+        object_ids = [ObjectId(product_id) for product_id in product_ids if ObjectId.is_valid(product_id)]
+        found = {str(data['_id']): cls.from_dict(data) for data in collection.find({'_id': {'$in': object_ids}})}
+        return [found.get(str(product_id)) for product_id in product_ids]
+    
     @classmethod
     def find_by_url(cls, url):
         """Find product by URL"""
@@ -111,17 +327,21 @@ class Product:
         if collection is None:
             return None
             
-        data = collection.find_one({'url': url})
+        # Older documents were stored before URLs were hashed
+        data = collection.find_one({'$or': [{'url_hash': url_hash(url)}, {'url': url}]})
         if data:
             return cls.from_dict(data)
         return None
     
     @classmethod
-    def find_by_niche(cls, niche, limit=50, skip=0):
-        """Find products by niche"""
+    def find_by_niche(cls, niche, limit=50, skip=0, as_json=False):
+        """Find products by niche; as_json returns to_dict()-shaped documents without building models"""
         collection = get_collection(Config.COLLECTION_PRODUCTS)
         if collection is None:
             return []
+        niche = niche.lower().strip()
+        if as_json:
+            return find_documents(collection, cls.JSON_SHAPE, {'niche': niche}, [('sales_estimate', -1)], skip, limit)
             
         cursor = collection.find({'niche': niche}).skip(skip).limit(limit).sort('sales_estimate', -1)
         return [cls.from_dict(data) for data in cursor]
@@ -137,25 +357,44 @@ class Product:
         return [cls.from_dict(data) for data in cursor]
     
     @classmethod
-    def get_top_selling(cls, niche=None, limit=20):
-        """Get top selling products, optionally filtered by niche"""
+    def aggregate_market(cls, niche=None, stats=True, top_limit=0):
+        """Price/sales analysis and top sellers computed in the database"""
         collection = get_collection(Config.COLLECTION_PRODUCTS)
         if collection is None:
-            return []
-            
-        query = {}
-        if niche:
-            query['niche'] = niche
+            return None
             
-        cursor = collection.find(query).limit(limit).sort('sales_estimate', -1)
-        return [cls.from_dict(data) for data in cursor]
+        results = list(collection.aggregate(market_pipeline(niche, stats, top_limit)))
+        facets = results[0] if results else {}
+        market = NicheStats.analysis(stats_from_facets(facets)) if stats else {}
+        if top_limit:
+            market['top_selling'] = [cls.from_dict(data) for data in facets.get('top_selling', [])]
+        return market
+    
+    @classmethod
+    def get_top_selling(cls, niche=None, limit=20):
+        """Get top selling products, optionally filtered by niche"""
+        market = cls.aggregate_market(niche, stats=False, top_limit=limit)
+        if market is None:
+            return []
+        return market['top_selling']
     
     def delete(self):
         """Delete product from database"""
+        return self.delete_with_previous()[0]
+    
+    def delete_with_previous(self):
+        """Delete product and return (result, deleted version's stats fields or None if it was missing)"""
         collection = get_collection(Config.COLLECTION_PRODUCTS)
         if collection is None:
-            return None
+            return None, None
             
-        result = collection.delete_one({'_id': self._id})
-        return result
+        previous = collection.find_one_and_delete({'_id': self._id}, projection=PRODUCT_STATS_PROJECTION)
+        invalidation_bus.publish(Config.COLLECTION_PRODUCTS, [self._id])
+        search_index.remove([self._id])
+        _update_niche_aggregates([(previous, None)])
+        try:
+            Tombstone.record(Config.COLLECTION_PRODUCTS, [self._id])
+        except Exception as e:
+            logger.warning(f"Failed to record deletion of product {self._id}: {str(e)}")
+        return DeleteResult({'n': 1 if previous else 0}, True), previous
 
@@ -0,0 +1,108 @@
+import hashlib
+from datetime import datetime
+from pymongo import UpdateOne, ASCENDING
+from src.database import get_collection
+from src.config import Config
+from src.models.timestamps import parse_datetime
+
+def review_id(product_id, text):
+    """Content-derived ID, so the same review imported twice is stored once"""
+    return hashlib.sha1(f"{product_id}\n{text.strip()}".encode('utf-8')).hexdigest()
+
+class Review:
+    def __init__(self, product_id, text, niche=None, rating=None, sentiment=None,
+                 created_at=None, _id=None):
+        self.product_id = str(product_id)
+        self.text = text
+        self.niche = niche
+        self.rating = rating
+        self.sentiment = sentiment
+        self.created_at = created_at or datetime.utcnow()
+        self._id = _id or review_id(self.product_id, text)
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            '_id': self._id,
+            'product_id': self.product_id,
+            'text': self.text,
+            'niche': self.niche,
+            'rating': self.rating,
+            'sentiment': self.sentiment,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create Review instance from dictionary"""
+        return cls(
+            _id=data.get('_id'),
+            product_id=data.get('product_id'),
+            text=data.get('text', ''),
+            niche=data.get('niche'),
+            rating=data.get('rating'),
+            sentiment=data.get('sentiment'),
+            created_at=parse_datetime(data.get('created_at'))
+        )
+
+    @classmethod
+    def ensure_indexes(cls):
+        """Create the indexes used by product lookups and the scoring backlog"""
+        collection = get_collection(Config.COLLECTION_REVIEWS)
+        if collection is None:
+            return None
+        collection.create_index([('product_id', ASCENDING)])
+        collection.create_index([('scored_at', ASCENDING)])
+
+    @classmethod
+    def add_many(cls, reviews):
+        """Insert reviews that are not stored yet and return the newly inserted ones"""
+        collection = get_collection(Config.COLLECTION_REVIEWS)
+        if collection is None or not reviews:
+            return []
+
+        now = datetime.utcnow()
+        operations = []
+        for review in reviews:
+            data = review.to_dict()
+            data['created_at'] = review.created_at
+            data['scored_at'] = now if review.sentiment else None
+            operations.append(UpdateOne({'_id': review._id}, {'$setOnInsert': data}, upsert=True))
+
+        result = collection.bulk_write(operations, ordered=False)
+        inserted = getattr(result, 'upserted_ids', None) or {}
+        return [reviews[i] for i in sorted(inserted)]
+
+    @classmethod
+    def set_sentiments(cls, reviews):
+        """Store the sentiment of scored reviews"""
+        collection = get_collection(Config.COLLECTION_REVIEWS)
+        if collection is None or not reviews:
+            return None
+
+        now = datetime.utcnow()
+        return collection.bulk_write([
+            UpdateOne({'_id': review._id}, {'$set': {'sentiment': review.sentiment, 'scored_at': now}})
+            for review in reviews
+        ], ordered=False)
+
+    @classmethod
+    def unscored(cls, batch_size=500):
+        """Stream reviews that have not been scored yet"""
+        collection = get_collection(Config.COLLECTION_REVIEWS)
+        if collection is None:
+            return
+
+        cursor = collection.find({'scored_at': None}).batch_size(batch_size)
+        for data in cursor:
+            yield cls.from_dict(data)
+
+    @classmethod
+    def find_by_product(cls, product_id, limit=50):
+        """Find reviews of a product"""
+        collection = get_collection(Config.COLLECTION_REVIEWS)
+        if collection is None:
+            return []
+
+        cursor = collection.find({'product_id': str(product_id)}).limit(limit).sort('created_at', -1)
+        return [cls.from_dict(data) for data in cursor]
@@ -0,0 +1,116 @@
+from datetime import datetime
+from pymongo import UpdateOne
+from src.database import get_collection
+from src.config import Config
+
+SCOPE_PRODUCT = 'product'
+SCOPE_NICHE = 'niche'
+
+SENTIMENT_LABELS = ('positive', 'neutral', 'negative', 'mixed')
+SCORE_FIELDS = ('positive_score', 'neutral_score', 'negative_score')
+
+def stats_id(scope, key):
+    return f"{scope}:{key}"
+
+def _term_key(term):
+    # Field names cannot contain dots or start with $
+    return term.replace('.', '_').replace('$', '_').replace(' ', '_')
+
+class ReviewStats:
+    """Running review sentiment aggregates per product and per niche.
+
+    One document per product and per niche holds the scored review count,
+    the count per sentiment label, sums of the positive/neutral/negative
+    scores and a count per negative term. Newly scored reviews are folded in
+    with $inc, so endpoints read a summary without rescoring any review.
+    """
+
+    @staticmethod
+    def _collection():
+        return get_collection(Config.COLLECTION_REVIEW_STATS)
+
+    @staticmethod
+    def contribution(sentiment, terms):
+        """$inc amounts one scored review adds to its product and niche"""
+        inc = {'review_count': 1}
+        label = sentiment.get('sentiment')
+        if label in SENTIMENT_LABELS:
+            inc[f'labels.{label}'] = 1
+        for field in SCORE_FIELDS:
+            if sentiment.get(field) is not None:
+                inc[f'scores.{field}'] = sentiment[field]
+        for term in terms:
+            path = f'negative_terms.{_term_key(term)}'
+            inc[path] = inc.get(path, 0) + 1
+        return inc
+
+    @classmethod
+    def apply(cls, scored):
+        """Fold (review, negative terms) pairs into their product and niche aggregates"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+
+        updates = {}
+        for review, terms in scored:
+            if not review.sentiment or 'error' in review.sentiment:
+                continue
+            targets = [stats_id(SCOPE_PRODUCT, review.product_id)]
+            if review.niche:
+                targets.append(stats_id(SCOPE_NICHE, review.niche))
+            for target in targets:
+                inc = updates.setdefault(target, {})
+                for path, amount in cls.contribution(review.sentiment, terms).items():
+                    inc[path] = inc.get(path, 0) + amount
+
+        if not updates:
+            return None
+        now = datetime.utcnow()
+        return collection.bulk_write([
+            UpdateOne({'_id': target}, {'$inc': inc, '$set': {'updated_at': now}}, upsert=True)
+            for target, inc in updates.items()
+        ], ordered=False)
+
+    @classmethod
+    def get(cls, scope, key):
+        """Sentiment summary for one product or niche"""
+        collection = cls._collection()
+        if collection is None:
+            return cls.summary(None)
+        return cls.summary(collection.find_one({'_id': stats_id(scope, key)}))
+
+    @classmethod
+    def get_many(cls, scope, keys):
+        """Sentiment summaries for several products or niches, keyed by product ID or niche name"""
+        collection = cls._collection()
+        if collection is None or not keys:
+            return {}
+        prefix = stats_id(scope, '')
+        cursor = collection.find({'_id': {'$in': [stats_id(scope, key) for key in keys]}})
+        return {data['_id'][len(prefix):]: cls.summary(data) for data in cursor}
+
+    @staticmethod
+    def summary(stats, top_terms=None):
+        """Sentiment distribution, mean scores and most frequent negative terms"""
+        stats = stats or {}
+        count = stats.get('review_count', 0)
+        labels = stats.get('labels') or {}
+        scores = stats.get('scores') or {}
+        terms = stats.get('negative_terms') or {}
+        top_terms = top_terms or Config.TOP_NEGATIVE_TERMS
+
+        return {
+            'review_count': count,
+            'distribution': {
+                label: round(100 * labels.get(label, 0) / count, 1) if count else 0
+                for label in SENTIMENT_LABELS
+            },
+            'mean_scores': {
+                field: round(scores.get(field, 0) / count, 3) if count else None
+                for field in SCORE_FIELDS
+            },
+            'top_negative_terms': [
+                {'term': term.replace('_', ' '), 'count': n}
+                for term, n in sorted(terms.items(), key=lambda item: item[1], reverse=True)[:top_terms]
+            ]
+        }
@@ -0,0 +1,13 @@
+from datetime import datetime, timezone
+
+def parse_datetime(value):
+    """Naive UTC datetime from a stored datetime or an ISO 8601 string, as older documents stored them"""
+    if not value or isinstance(value, datetime):
+        return value or None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from src.database import get_collection
+from src.config import Config
+
+class Tombstone:
+    """Record of a deleted document, so incremental sync clients learn about deletions.
+
+    Tombstones are kept for TOMBSTONE_RETENTION_DAYS; a client whose last
+    sync is older than that has to download everything again.
+    """
+
+    @staticmethod
+    def _collection():
+        return get_collection(Config.COLLECTION_TOMBSTONES)
+
+    @classmethod
+    def ensure_indexes(cls):
+        """Create the index used by sync reads"""
+        collection = cls._collection()
+        if collection is None:
+            return None
+        collection.create_index([('collection', ASCENDING), ('deleted_at', ASCENDING), ('key', ASCENDING)])
+
+    @classmethod
+    def record(cls, collection_name, keys):
+        """Remember that documents of a collection were deleted"""
+        collection = cls._collection()
+        keys = list(keys)
+        if collection is None or not keys:
+            return None
+        now = datetime.utcnow()
+        return collection.insert_many([
+            {'collection': collection_name, 'key': key, 'deleted_at': now} for key in keys
+        ])
+
+    @classmethod
+    def prune(cls, retention_days=None):
+        """Drop tombstones older than the retention window"""
+        collection = cls._collection()
+        if collection is None:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=retention_days or Config.TOMBSTONE_RETENTION_DAYS)
+        result = collection.delete_many({'deleted_at': {'$lt': cutoff}})
+        return result.deleted_count
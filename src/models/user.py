@@ -1,11 +1,30 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import UpdateMany
 from src.database import get_collection
 from src.config import Config
+from src.models.timestamps import parse_datetime
+from src.services.user_cache import user_cache, request_identity_map
+from src.services.invalidation_bus import invalidation_bus
+
+# Where the refresh job stores results for each followed list
+UPDATE_FIELDS = {
+    'tracked_keywords': 'tracked_keyword_updates',
+    'favorite_niches': 'favorite_niche_updates'
+}
+
+def update_key(name):
+    """Field name for a tracked keyword or niche; field names cannot contain dots or start with $.
+
+    Percent-escaping those characters (and % itself) keeps distinct names
+    from sharing a field.
+    """
+    return name.replace('%', '%25').replace('.', '%2E').replace('$', '%24')
 
 class User:
     def __init__(self, username, email, password_hash=None, subscription_tier='free',
                  tracked_keywords=None, favorite_niches=None, api_usage=None,
+                 tracked_keyword_updates=None, favorite_niche_updates=None,
                  created_at=None, updated_at=None, _id=None):
         self._id = _id or ObjectId()
         self.username = username
@@ -14,6 +33,9 @@ class User:
         self.subscription_tier = subscription_tier  # 'free', 'basic', 'premium'
         self.tracked_keywords = tracked_keywords or []
         self.favorite_niches = favorite_niches or []
+        # Latest refresh results per tracked keyword and favorite niche, written by the refresh job
+        self.tracked_keyword_updates = tracked_keyword_updates or {}
+        self.favorite_niche_updates = favorite_niche_updates or {}
         self.api_usage = api_usage or {'requests_today': 0, 'last_reset': datetime.utcnow()}
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
@@ -27,11 +49,19 @@ class User:
             'subscription_tier': self.subscription_tier,
             'tracked_keywords': self.tracked_keywords,
             'favorite_niches': self.favorite_niches,
+            'tracked_keyword_updates': self.tracked_keyword_updates,
+            'favorite_niche_updates': self.favorite_niche_updates,
             'api_usage': self.api_usage,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def to_document(self):
+        """Convert to a database document, keeping the ID and timestamps native so they can be indexed"""
+        data = self.to_dict()
+        data.update(_id=self._id, created_at=self.created_at, updated_at=self.updated_at)
+        return data
+    
     @classmethod
     def from_dict(cls, data):
         """Create User instance from dictionary"""
@@ -43,9 +73,11 @@ class User:
             subscription_tier=data.get('subscription_tier', 'free'),
             tracked_keywords=data.get('tracked_keywords', []),
             favorite_niches=data.get('favorite_niches', []),
+            tracked_keyword_updates=data.get('tracked_keyword_updates', {}),
+            favorite_niche_updates=data.get('favorite_niche_updates', {}),
             api_usage=data.get('api_usage', {'requests_today': 0, 'last_reset': datetime.utcnow()}),
-            created_at=data.get('created_at'),
-            updated_at=data.get('updated_at')
+            created_at=parse_datetime(data.get('created_at')),
+            updated_at=parse_datetime(data.get('updated_at'))
         )
     
     def save(self):
@@ -55,8 +87,7 @@ class User:
             return None
             
         self.updated_at = datetime.utcnow()
-        data = self.to_dict()
-        data['_id'] = self._id
+        data = self.to_document()
         # Don't include password_hash in the saved data for security
         if self.password_hash:
             data['password_hash'] = self.password_hash
@@ -66,43 +97,138 @@ class User:
             data,
             upsert=True
         )
+        invalidation_bus.publish(Config.COLLECTION_USERS, [self._id])
+        self._forget()
+        self._remember()
         return result
     
+    def _remember(self):
+        """Register this instance in the current request's identity map"""
+        identity_map = request_identity_map()
+        if identity_map is not None:
+            identity_map[('_id', str(self._id))] = self
+            identity_map[('email', self.email)] = self
+            identity_map[('username', self.username)] = self
+    
+    def _forget(self):
+        """Drop this instance's identity map entries, e.g. after its email or username changed"""
+        identity_map = request_identity_map()
+        if identity_map is not None:
+            for key in [key for key, user in identity_map.items() if user is self]:
+                del identity_map[key]
+    
+    @classmethod
+    def _loaded(cls, data):
+        user = cls.from_dict(data)
+        user._remember()
+        return user
+    
+    @classmethod
+    def _cached(cls, field, value):
+        """User from the request's identity map or the user cache, without a database read"""
+        identity_map = request_identity_map()
+        if identity_map is not None and (field, value) in identity_map:
+            return identity_map[(field, value)]
+        data = user_cache.get(field, value)
+        return cls._loaded(data) if data else None
+    
+    @classmethod
+    def _load(cls, field, value):
+        """Find a user by one lookup field through the identity map, the user cache, then the database"""
+        value = str(value) if field == '_id' else value
+        user = cls._cached(field, value)
+        if user:
+            return user
+        
+        collection = get_collection(Config.COLLECTION_USERS)
+        if collection is None:
+            return None
+        data = collection.find_one({field: ObjectId(value) if field == '_id' else value})
+        if not data:
+            return None
+        user_cache.put(data)
+        return cls._loaded(data)
+    
     @classmethod
     def find_by_id(cls, user_id):
         """Find user by ID"""
+        return cls._load('_id', user_id)
+    
+    @classmethod
+    def find_many(cls, user_ids):
+        """Find users by ID, reading only uncached ones with one query; returns a list aligned with user_ids, None where missing"""
         collection = get_collection(Config.COLLECTION_USERS)
         if collection is None:
-            return None
+            return [None] * len(user_ids)
             
-        data = collection.find_one({'_id': ObjectId(user_id)})
-        if data:
-            return cls.from_dict(data)
-        return None
+        found = {}
+        for user_id in user_ids:
+            user = cls._cached('_id', str(user_id))
+            if user:
+                found[str(user_id)] = user
+        
+        missing = [ObjectId(user_id) for user_id in user_ids if str(user_id) not in found and ObjectId.is_valid(user_id)]
+        if missing:
+            for data in collection.find({'_id': {'$in': missing}}):
+                user_cache.put(data)
+                found[str(data['_id'])] = cls._loaded(data)
+        return [found.get(str(user_id)) for user_id in user_ids]
     
     @classmethod
     def find_by_email(cls, email):
         """Find user by email"""
-        collection = get_collection(Config.COLLECTION_USERS)
-        if collection is None:
-            return None
-            
-        data = collection.find_one({'email': email.lower()})
-        if data:
-            return cls.from_dict(data)
-        return None
+        return cls._load('email', email.lower())
     
     @classmethod
     def find_by_username(cls, username):
         """Find user by username"""
+        return cls._load('username', username)
+    
+    @classmethod
+    def tracked_groups(cls, field):
+        """Map each tracked keyword or favorite niche, lower-cased and trimmed, to its followers.
+
+        Values are {'users': count, 'variants': [names as users stored them]},
+        so "Boho" and "boho " are refreshed once and reported back to both.
+        """
         collection = get_collection(Config.COLLECTION_USERS)
         if collection is None:
-            return None
+            return {}
+            
+        cursor = collection.aggregate([
+            {'$project': {field: 1}},
+            {'$unwind': f'${field}'},
+            {'$group': {'_id': f'${field}', 'users': {'$sum': 1}}}
+        ])
+        groups = {}
+        for data in cursor:
+            if not isinstance(data['_id'], str) or not data['_id'].strip():
+                continue
+            group = groups.setdefault(data['_id'].lower().strip(), {'users': 0, 'variants': []})
+            group['users'] += data['users']
+            group['variants'].append(data['_id'])
+        return groups
+    
+    @classmethod
+    def fan_out_updates(cls, field, updates, variants=None):
+        """Store refresh results on every user following each keyword or niche.
+
+        `variants` maps a name in `updates` to the spellings users stored it
+        under; each spelling gets one UpdateMany keyed by that spelling.
+        """
+        collection = get_collection(Config.COLLECTION_USERS)
+        if collection is None or not updates:
+            return 0
             
-        data = collection.find_one({'username': username})
-        if data:
-            return cls.from_dict(data)
-        return None
+        variants = variants or {}
+        result = collection.bulk_write([
+            UpdateMany({field: stored}, {'$set': {f'{UPDATE_FIELDS[field]}.{update_key(stored)}': update}})
+            for name, update in updates.items()
+            for stored in variants.get(name, [name])
+        ], ordered=False)
+        # Which users changed isn't known here, so every cached user goes
+        invalidation_bus.publish_all(Config.COLLECTION_USERS)
+        return getattr(result, 'modified_count', 0)
     
     def add_tracked_keyword(self, keyword):
         """Add a keyword to user's tracking list"""
@@ -162,4 +288,6 @@ class User:
             return None
             
         result = collection.delete_one({'_id': self._id})
+        invalidation_bus.publish(Config.COLLECTION_USERS, [self._id])
+        self._forget()
         return result
@@ -0,0 +1,22 @@
+from flask import request
+from src.config import Config
+
+def requested_ids(param):
+    """IDs from a comma-separated and/or repeated query parameter, de-duplicated in request order"""
+    ids = []
+    for value in request.args.getlist(param):
+        for item in value.split(','):
+            item = item.strip()
+            if item and item not in ids:
+                ids.append(item)
+    if len(ids) > Config.BATCH_MAX_IDS:
+        raise ValueError(f"At most {Config.BATCH_MAX_IDS} {param} values per request")
+    return ids
+
+def batch_response(key, ids, items):
+    """Found items in request order plus the IDs that matched nothing"""
+    return {
+        key: [item.to_dict() for item in items if item is not None],
+        'missing': [item_id for item_id, item in zip(ids, items) if item is None],
+        'count': sum(1 for item in items if item is not None)
+    }
@@ -1,11 +1,99 @@
-from flask import Blueprint, jsonify, request
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, Response, jsonify, request
 from src.models.keyword import Keyword
 from src.models.user import User
+from src.models.keyword_history import KeywordHistory, RESOLUTIONS
+from src.models.timestamps import parse_datetime
+from datetime import datetime, timedelta
+from src.routes.batch import requested_ids, batch_response
+from src.services.raw_json import json_response
+from src.services.single_flight import SingleFlight
+from src.services.keyword_graph import keyword_graph
+from src.services.autocomplete import autocomplete_index
+from src.services.keyword_analysis import analyze_new_keyword
+from src.config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 keywords_bp = Blueprint('keywords', __name__)
 
+_analysis_flight = SingleFlight()
+
+# Market lookups for new keywords in batch analyses
+_batch_executor = ThreadPoolExecutor(max_workers=Config.KEYWORD_ANALYSIS_WORKERS, thread_name_prefix='keyword-analysis')
+
+def _run_keyword_analysis(keyword_text):
+    """Return stored keyword data, or analyze and upsert a new keyword"""
+    # Check if keyword already exists in database
+    existing_keyword = Keyword.find_by_keyword(keyword_text)
+    if existing_keyword:
+        return existing_keyword, 'database'
+    
+    mock_keyword = analyze_new_keyword(keyword_text)
+    stored_keyword = mock_keyword.upsert()
+    
+    # Another process may have inserted the keyword since our lookup
+    if stored_keyword is not mock_keyword:
+        return stored_keyword, 'database'
+    return mock_keyword, 'analysis'
+
+def _ndjson(data):
+    return json.dumps(data, default=str) + '\n'
+
+def _stream_batch_analysis(keywords):
+    """Yield NDJSON lines: stored keywords first, then new analyses as they complete, then a summary"""
+    existing = dict(zip(keywords, Keyword.find_many(keywords)))
+    for keyword_text, keyword in existing.items():
+        if keyword:
+            # Headers are already sent, so one bad document must not end the stream
+            try:
+                yield _ndjson({'keyword_analysis': dict(keyword.to_dict(), source='database')})
+            except Exception as e:
+                logger.error(f"Error serializing keyword {keyword_text}: {str(e)}")
+                yield _ndjson({'keyword': keyword_text, 'error': 'Internal server error'})
+    
+    missing = [keyword_text for keyword_text, keyword in existing.items() if keyword is None]
+    analyzed = []
+    failed = 0
+    stored = 0
+    store_failed = False
+    futures = {_batch_executor.submit(analyze_new_keyword, keyword_text): keyword_text for keyword_text in missing}
+    try:
+        for future in as_completed(futures):
+            try:
+                keyword = future.result()
+            except Exception as e:
+                logger.error(f"Error analyzing keyword {futures[future]}: {str(e)}")
+                failed += 1
+                yield _ndjson({'keyword': futures[future], 'error': 'Analysis failed'})
+                continue
+            analyzed.append(keyword)
+            yield _ndjson({'keyword_analysis': dict(keyword.to_dict(), source='analysis')})
+    finally:
+        # A client that disconnects raises GeneratorExit at a yield: drop the
+        # queued lookups, but still store what has been analyzed
+        for future in futures:
+            future.cancel()
+        # New analyses are stored together once they have all been streamed
+        try:
+            stored_keywords = Keyword.bulk_upsert(analyzed) if analyzed else []
+            stored = sum(1 for keyword, stored_keyword in zip(analyzed, stored_keywords) if stored_keyword is keyword)
+        except Exception as e:
+            logger.error(f"Error storing keyword batch: {str(e)}")
+            store_failed = True
+    
+    summary = {
+        'requested': len(keywords),
+        'from_database': len(keywords) - len(missing),
+        'analyzed': len(analyzed),
+        'stored': stored,
+        'failed': failed
+    }
+    if store_failed:
+        summary['error'] = 'Failed to store analyzed keywords'
+    yield _ndjson({'summary': summary})
+
 @keywords_bp.route('/keywords/search', methods=['GET'])
 def search_keywords():
     """Search keywords by query"""
@@ -19,13 +107,10 @@ def search_keywords():
         if len(query) < 2:
             return jsonify({'error': 'Query must be at least 2 characters long'}), 400
         
-        # Search keywords
-        keywords = Keyword.search_keywords(query, limit)
+        # Read-only list: stored documents go straight to JSON
+        results = Keyword.search_keywords(query, limit, as_json=True)
         
-        # Convert to dict format
-        results = [keyword.to_dict() for keyword in keywords]
-        
-        return jsonify({
+        return json_response({
             'query': query,
             'results': results,
             'count': len(results)
@@ -35,16 +120,52 @@ def search_keywords():
         logger.error(f"Error searching keywords: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@keywords_bp.route('/keywords/batch', methods=['GET'])
+def get_keywords_batch():
+    """Get several keywords by exact match with ?k=a,b,c or repeated k parameters"""
+    try:
+        try:
+            keywords = requested_ids('k')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(batch_response('keywords', keywords, Keyword.find_many(keywords)))
+        
+    except Exception as e:
+        logger.error(f"Error getting keywords batch: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@keywords_bp.route('/keywords/autocomplete', methods=['GET'])
+def autocomplete_keywords():
+    """Type-ahead keyword completions ranked by search volume"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(int(request.args.get('limit', 10)), 20)
+        
+        if not query.strip():
+            return jsonify({'error': 'Query parameter "q" is required'}), 400
+        
+        # Served from the in-memory prefix index, not a regex scan
+        suggestions = autocomplete_index.complete(query, limit)
+        
+        return jsonify({
+            'query': query,
+            'suggestions': suggestions,
+            'count': len(suggestions)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error autocompleting keywords: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @keywords_bp.route('/keywords/trending', methods=['GET'])
 def get_trending_keywords():
     """Get trending keywords"""
     try:
         limit = min(int(request.args.get('limit', 20)), 50)
         
-        keywords = Keyword.get_trending_keywords(limit)
-        results = [keyword.to_dict() for keyword in keywords]
+        results = Keyword.get_trending_keywords(limit, as_json=True)
         
-        return jsonify({
+        return json_response({
             'trending_keywords': results,
             'count': len(results)
         })
@@ -63,10 +184,9 @@ def get_low_competition_keywords():
         if max_competition not in ['low', 'medium', 'high']:
             return jsonify({'error': 'max_competition must be low, medium, or high'}), 400
         
-        keywords = Keyword.get_low_competition(max_competition, limit)
-        results = [keyword.to_dict() for keyword in keywords]
+        results = Keyword.get_low_competition(max_competition, limit, as_json=True)
         
-        return jsonify({
+        return json_response({
             'low_competition_keywords': results,
             'max_competition': max_competition,
             'count': len(results)
@@ -88,28 +208,12 @@ def analyze_keyword():
         if not keyword_text:
             return jsonify({'error': 'Keyword cannot be empty'}), 400
         
-        # Check if keyword already exists in database
-        existing_keyword = Keyword.find_by_keyword(keyword_text)
-        
-        if existing_keyword:
-            # Return existing data
-            result = existing_keyword.to_dict()
-            result['source'] = 'database'
-        else:
-            # For MVP, we'll create a mock analysis
-            # In production, this would integrate with real APIs
-            mock_keyword = Keyword(
-                keyword=keyword_text,
-                search_volume=1000,  # Mock data
-                competition_level='medium',
-                trend_direction='stable',
-                related_keywords=[f"{keyword_text} ideas", f"best {keyword_text}", f"{keyword_text} design"],
-                price_range={'min': 10, 'max': 100, 'avg': 35}
-            )
-            mock_keyword.save()
-            
-            result = mock_keyword.to_dict()
-            result['source'] = 'analysis'
+        # Concurrent requests for the same keyword share a single analysis
+        keyword, source = _analysis_flight.do(
+            keyword_text.lower(), _run_keyword_analysis, keyword_text
+        )
+        result = keyword.to_dict()
+        result['source'] = source
         
         return jsonify({
             'keyword_analysis': result
@@ -119,16 +223,39 @@ def analyze_keyword():
         logger.error(f"Error analyzing keyword: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@keywords_bp.route('/keywords/analyze/batch', methods=['POST'])
+def analyze_keywords_batch():
+    """Analyze many keywords, streaming one NDJSON line per keyword as it is ready"""
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('keywords'), list):
+            return jsonify({'error': 'keywords must be a list'}), 400
+        
+        keywords = []
+        for keyword_text in data['keywords']:
+            keyword_text = str(keyword_text).lower().strip()
+            if keyword_text and keyword_text not in keywords:
+                keywords.append(keyword_text)
+        if not keywords:
+            return jsonify({'error': 'At least one keyword is required'}), 400
+        if len(keywords) > Config.KEYWORD_BATCH_MAX:
+            return jsonify({'error': f'At most {Config.KEYWORD_BATCH_MAX} keywords per request'}), 400
+        
+        return Response(_stream_batch_analysis(keywords), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"Error analyzing keyword batch: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @keywords_bp.route('/keywords/by-niche/<niche>', methods=['GET'])
 def get_keywords_by_niche(niche):
     """Get keywords for a specific niche"""
     try:
         limit = min(int(request.args.get('limit', 20)), 50)
         
-        keywords = Keyword.get_by_niche(niche, limit)
-        results = [keyword.to_dict() for keyword in keywords]
+        results = Keyword.get_by_niche(niche, limit, as_json=True)
         
-        return jsonify({
+        return json_response({
             'niche': niche,
             'keywords': results,
             'count': len(results)
@@ -138,6 +265,36 @@ def get_keywords_by_niche(niche):
         logger.error(f"Error getting keywords by niche: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@keywords_bp.route('/keywords/<keyword>/history', methods=['GET'])
+def get_keyword_history(keyword):
+    """Get search volume history for a keyword over a date range"""
+    try:
+        end = request.args.get('end')
+        start = request.args.get('start')
+        resolution = request.args.get('resolution') or None
+        
+        # Naive UTC, so offsets in either bound compare with the utcnow() default
+        end = parse_datetime(end) if end else datetime.utcnow()
+        start = parse_datetime(start) if start else None
+        if end is None or (request.args.get('start') and start is None):
+            return jsonify({'error': 'start and end must be ISO 8601 dates'}), 400
+        start = start or end - timedelta(days=365)
+        
+        if start > end:
+            return jsonify({'error': 'start must be before end'}), 400
+        
+        if resolution and resolution not in RESOLUTIONS:
+            return jsonify({'error': f"resolution must be one of {', '.join(RESOLUTIONS)}"}), 400
+        
+        history = KeywordHistory.get_range(keyword, start, end, resolution)
+        history['count'] = len(history['timestamps'])
+        
+        return jsonify({'history': history})
+        
+    except Exception as e:
+        logger.error(f"Error getting keyword history: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @keywords_bp.route('/keywords/suggestions', methods=['POST'])
 def get_keyword_suggestions():
     """Get keyword suggestions based on a seed keyword"""
@@ -152,26 +309,8 @@ def get_keyword_suggestions():
         if not seed_keyword:
             return jsonify({'error': 'seed_keyword cannot be empty'}), 400
         
-        # For MVP, generate simple keyword variations
-        # In production, this would use more sophisticated keyword research APIs
-        suggestions = []
-        
-        # Common keyword modifiers
-        modifiers = [
-            'best', 'cheap', 'affordable', 'unique', 'custom', 'handmade',
-            'vintage', 'modern', 'minimalist', 'luxury', 'eco friendly',
-            'personalized', 'gift', 'ideas', 'design', 'diy'
-        ]
-        
-        # Generate suggestions
-        for modifier in modifiers[:limit]:
-            suggestion = f"{modifier} {seed_keyword}"
-            suggestions.append({
-                'keyword': suggestion,
-                'search_volume': 500,  # Mock data
-                'competition_level': 'low',
-                'relevance_score': 0.8
-            })
+        # Ranked from the related-keyword graph built over stored keywords
+        suggestions = keyword_graph.suggestions(seed_keyword, limit)
         
         return jsonify({
             'seed_keyword': seed_keyword,
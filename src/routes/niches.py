@@ -1,24 +1,85 @@
+from bson import ObjectId
 from flask import Blueprint, jsonify, request
 from src.models.niche import Niche
 from src.models.product import Product
 from src.models.keyword import Keyword
+from src.models.review_stats import ReviewStats, SCOPE_NICHE
+from src.config import Config
+from src.routes.batch import requested_ids, batch_response
+from src.services.raw_json import json_response
+from src.services.single_flight import SingleFlight
+from src.services.fan_out import fan_out
+from src.services.trend_analytics import analyze_series
+from src.services.niche_rankings import get_ranking, RANKING_TRENDING, RANKING_OPPORTUNITIES
 import logging
 
 logger = logging.getLogger(__name__)
 niches_bp = Blueprint('niches', __name__)
 
+_analysis_flight = SingleFlight()
+
+def _run_niche_analysis(niche_name, category):
+    """Return stored niche data, or analyze and upsert a new niche"""
+    # Check if niche already exists
+    existing_niche = Niche.find_by_name(niche_name)
+    if existing_niche:
+        return existing_niche, 'database'
+    
+    # Create new niche analysis (mock data for MVP)
+    # In production, this would integrate with real data sources
+    
+    # Mock trend data
+    trend_data = {
+        'search_volume_trend': [100, 120, 150, 180, 200, 190, 210],
+        'months': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul']
+    }
+    trend_data.update(analyze_series(trend_data['search_volume_trend']))
+    
+    # Mock visual analysis
+    visual_analysis = {
+        'dominant_colors': ['#F5F5DC', '#8B4513', '#228B22'],
+        'popular_styles': ['minimalist', 'rustic', 'modern'],
+        'image_types': ['lifestyle', 'product_only', 'flat_lay']
+    }
+    
+    new_niche = Niche(
+        name=niche_name,
+        category=category,
+        description=f"Analysis for {niche_name} niche",
+        trend_data=trend_data,
+        competition_score=65,  # Mock score
+        demand_score=75,       # Mock score
+        visual_analysis=visual_analysis
+    )
+    # Price and sales figures come from the niche's running product stats
+    new_niche.compute_market_stats()
+    new_niche.compute_top_products()
+    stored_niche = new_niche.upsert()
+    
+    # Another process may have inserted the niche since our lookup
+    if stored_niche is not new_niche:
+        return stored_niche, 'database'
+    return new_niche, 'analysis'
+
 @niches_bp.route('/niches', methods=['GET'])
 def get_niches():
-    """Get all niches with pagination"""
+    """Get all niches with pagination, or specific niches with ?ids=a,b,c"""
     try:
+        if 'ids' in request.args:
+            try:
+                niche_ids = requested_ids('ids')
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(batch_response('niches', niche_ids, Niche.find_many(niche_ids)))
+        
         page = int(request.args.get('page', 1))
         limit = min(int(request.args.get('limit', 20)), 50)
         skip = (page - 1) * limit
         
-        niches = Niche.find_all(limit, skip)
-        results = [niche.to_dict() for niche in niches]
+        # Read-only list: stored documents go straight to JSON
+        results = Niche.find_all(limit, skip, as_json=True)
         
-        return jsonify({
+        return json_response({
             'niches': results,
             'page': page,
             'limit': limit,
@@ -33,19 +94,52 @@ def get_niches():
 def get_niche_by_id(niche_id):
     """Get detailed information about a specific niche"""
     try:
-        niche = Niche.find_by_id(niche_id)
+        # Top products, running stats and review sentiment are maintained by writes and read in one query
+        niche, sentiment_analysis = Niche.find_detail(niche_id)
         
         if not niche:
             return jsonify({'error': 'Niche not found'}), 404
         
         return jsonify({
-            'niche': niche.to_dict()
+            'niche': niche.to_dict(),
+            'sentiment_analysis': sentiment_analysis
         })
         
     except Exception as e:
         logger.error(f"Error getting niche by ID: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@niches_bp.route('/niches/<niche_id>/dashboard', methods=['GET'])
+def get_niche_dashboard(niche_id):
+    """Niche details, products, keywords and review sentiment in one response"""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 50)
+        
+        # The other sections are keyed by name, so the niche is read first
+        niche = Niche.find_by_id(niche_id) if ObjectId.is_valid(niche_id) else None
+        if not niche:
+            return jsonify({'error': 'Niche not found'}), 404
+        
+        sections, timed_out, failed = fan_out.run({
+            'products': lambda: [product.to_dict() for product in Product.find_by_niche(niche.name, limit)],
+            'keywords': lambda: [keyword.to_dict() for keyword in Keyword.get_by_niche(niche.name, limit)],
+            'sentiment_analysis': lambda: ReviewStats.get(SCOPE_NICHE, niche.name)
+        }, Config.DASHBOARD_SECTION_TIMEOUT_SECONDS)
+        
+        return jsonify({
+            'niche': niche.to_dict(),
+            'products': sections.get('products'),
+            'keywords': sections.get('keywords'),
+            'sentiment_analysis': sections.get('sentiment_analysis'),
+            'partial': bool(timed_out or failed),
+            'timed_out': timed_out,
+            'failed': failed
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting niche dashboard: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @niches_bp.route('/niches/analyze', methods=['POST'])
 def analyze_niche():
     """Analyze a niche and return comprehensive data"""
@@ -58,58 +152,12 @@ def analyze_niche():
         if not niche_name:
             return jsonify({'error': 'niche_name cannot be empty'}), 400
         
-        # Check if niche already exists
-        existing_niche = Niche.find_by_name(niche_name)
-        
-        if existing_niche:
-            result = existing_niche.to_dict()
-            result['source'] = 'database'
-        else:
-            # Create new niche analysis (mock data for MVP)
-            # In production, this would integrate with real data sources
-            
-            # Mock trend data
-            trend_data = {
-                'search_volume_trend': [100, 120, 150, 180, 200, 190, 210],
-                'months': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul'],
-                'growth_rate': 15.5,
-                'seasonality': 'stable'
-            }
-            
-            # Mock price analysis
-            price_analysis = {
-                'average_price': 45.50,
-                'price_range': {'min': 15, 'max': 150},
-                'price_distribution': {
-                    'under_25': 30,
-                    '25_50': 40,
-                    '50_100': 25,
-                    'over_100': 5
-                }
-            }
-            
-            # Mock visual analysis
-            visual_analysis = {
-                'dominant_colors': ['#F5F5DC', '#8B4513', '#228B22'],
-                'popular_styles': ['minimalist', 'rustic', 'modern'],
-                'image_types': ['lifestyle', 'product_only', 'flat_lay']
-            }
-            
-            new_niche = Niche(
-                name=niche_name,
-                category=data.get('category', 'general'),
-                description=f"Analysis for {niche_name} niche",
-                trend_data=trend_data,
-                competition_score=65,  # Mock score
-                demand_score=75,       # Mock score
-                visual_analysis=visual_analysis,
-                price_analysis=price_analysis,
-                top_products=[]  # Will be populated separately
-            )
-            new_niche.save()
-            
-            result = new_niche.to_dict()
-            result['source'] = 'analysis'
+        # Concurrent requests for the same niche share a single analysis
+        niche, source = _analysis_flight.do(
+            niche_name.lower(), _run_niche_analysis, niche_name, data.get('category', 'general')
+        )
+        result = niche.to_dict()
+        result['source'] = source
         
         return jsonify({
             'niche_analysis': result
@@ -131,14 +179,11 @@ def search_niches():
             return jsonify({'error': 'Either query "q" or "category" parameter is required'}), 400
         
         if category:
-            niches = Niche.search_by_category(category, limit)
+            results = Niche.search_by_category(category, limit, as_json=True)
         else:
-            # For now, we'll search by name (in production, this would be more sophisticated)
-            niches = [Niche.find_by_name(query)] if Niche.find_by_name(query) else []
+            results = Niche.search_by_name(query, limit, as_json=True)
         
-        results = [niche.to_dict() for niche in niches if niche]
-        
-        return jsonify({
+        return json_response({
             'query': query or category,
             'search_type': 'category' if category else 'name',
             'results': results,
@@ -155,10 +200,9 @@ def get_niche_products(niche_name):
     try:
         limit = min(int(request.args.get('limit', 20)), 50)
         
-        products = Product.find_by_niche(niche_name, limit)
-        results = [product.to_dict() for product in products]
+        results = Product.find_by_niche(niche_name, limit, as_json=True)
         
-        return jsonify({
+        return json_response({
             'niche': niche_name,
             'products': results,
             'count': len(results)
@@ -174,10 +218,9 @@ def get_niche_keywords(niche_name):
     try:
         limit = min(int(request.args.get('limit', 20)), 50)
         
-        keywords = Keyword.get_by_niche(niche_name, limit)
-        results = [keyword.to_dict() for keyword in keywords]
+        results = Keyword.get_by_niche(niche_name, limit, as_json=True)
         
-        return jsonify({
+        return json_response({
             'niche': niche_name,
             'keywords': results,
             'count': len(results)
@@ -193,35 +236,14 @@ def get_trending_niches():
     try:
         limit = min(int(request.args.get('limit', 10)), 20)
         
-        # For MVP, return mock trending niches
-        # In production, this would be based on real trend analysis
-        trending_niches = [
-            {
-                'name': 'Sustainable Home Decor',
-                'category': 'home_decor',
-                'growth_rate': 25.5,
-                'competition_score': 45,
-                'demand_score': 80
-            },
-            {
-                'name': 'Minimalist Jewelry',
-                'category': 'jewelry',
-                'growth_rate': 18.2,
-                'competition_score': 70,
-                'demand_score': 75
-            },
-            {
-                'name': 'Pet Accessories',
-                'category': 'pets',
-                'growth_rate': 22.1,
-                'competition_score': 60,
-                'demand_score': 85
-            }
-        ]
+        category = request.args.get('category', '').strip() or None
+        
+        # Rankings are materialized on niche writes, so this is a single read
+        trending_niches = get_ranking(RANKING_TRENDING, category, limit)
         
         return jsonify({
-            'trending_niches': trending_niches[:limit],
-            'count': len(trending_niches[:limit])
+            'trending_niches': trending_niches,
+            'count': len(trending_niches)
         })
         
     except Exception as e:
@@ -234,30 +256,14 @@ def get_niche_opportunities():
     try:
         limit = min(int(request.args.get('limit', 10)), 20)
         
-        # For MVP, return mock opportunities
-        # In production, this would calculate based on real metrics
-        opportunities = [
-            {
-                'name': 'Eco-Friendly Phone Cases',
-                'category': 'electronics',
-                'opportunity_score': 85,
-                'demand_score': 75,
-                'competition_score': 35,
-                'reason': 'High demand for sustainable tech accessories with relatively low competition'
-            },
-            {
-                'name': 'Vintage Map Prints',
-                'category': 'art',
-                'opportunity_score': 78,
-                'demand_score': 70,
-                'competition_score': 40,
-                'reason': 'Growing interest in vintage decor with moderate competition'
-            }
-        ]
+        category = request.args.get('category', '').strip() or None
+        
+        # Rankings are materialized on niche writes, so this is a single read
+        opportunities = get_ranking(RANKING_OPPORTUNITIES, category, limit)
         
         return jsonify({
-            'opportunities': opportunities[:limit],
-            'count': len(opportunities[:limit])
+            'opportunities': opportunities,
+            'count': len(opportunities)
         })
         
     except Exception as e:
@@ -1,23 +1,35 @@
 from flask import Blueprint, request, jsonify
-from src.models.product import Product
-from src.services.azure_cognitive_services import analyze_image_from_url, analyze_sentiment
+from bson import ObjectId
+from src.models.product import Product, listing_url
+from src.models.review_stats import ReviewStats, SCOPE_PRODUCT
+from src.routes.batch import requested_ids, batch_response
+from src.services.azure_cognitive_services import analyze_images
+from src.services.sentiment import analyze_sentiment_batch
+from src.services.http_client import http_client, FetchError
+from src.services.listing_parser import parse_listing_html
+from src.services.listing_ingestion import normalize_listing
+from src.services.review_sentiment import add_reviews
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 products_bp = Blueprint("products", __name__)
 
-@products_bp.route("/analyze", methods=["POST"])
-def analyze_product():
-    data = request.get_json()
-    product_url = data.get("url")
-
-    if not product_url:
-        return jsonify({"error": "Product URL is required"}), 400
+def _fetch_listing(product_url):
+    """Fetch and parse a live listing page, or None if it can't be read"""
+    try:
+        html = http_client.get_text(product_url)
+    except FetchError as e:
+        logger.warning(f"Could not fetch listing {product_url}: {str(e)}")
+        return None
+    fields = parse_listing_html(html, url=product_url)
+    if not fields.get("title"):
+        return None
+    return fields
 
-    # Mock data for product analysis (replace with actual scraping/API calls)
-    # In a real scenario, you would scrape data from Etsy or use an Etsy API
-    mock_product_data = {
+def _mock_product_data(product_url):
+    """Sample analysis used when the listing page can't be fetched"""
+    return {
         "title": "Handmade Ceramic Mug - Coffee Lover Gift",
         "store_name": "ArtisanCeramics",
         "url": product_url,
@@ -53,35 +65,102 @@ def analyze_product():
         ]
     }
 
+@products_bp.route("/analyze", methods=["POST"])
+def analyze_product():
+    data = request.get_json()
+    product_url = data.get("url")
+
+    if not product_url:
+        return jsonify({"error": "Product URL is required"}), 400
+    # Only Etsy listing pages are fetched; any other host could reach internal addresses
+    product_url = listing_url(product_url) if isinstance(product_url, str) else None
+    if product_url is None:
+        return jsonify({"error": "url must be an Etsy listing URL"}), 400
+
+    # Live listing page through the shared fetch client; repeat analyses of an
+    # unchanged listing are revalidated with a conditional request
+    product_data = _fetch_listing(product_url)
+    if product_data is not None:
+        product = normalize_listing(product_data)
+        if product is not None:
+            Product.bulk_upsert_by_url([product])
+        product_data["data_source"] = "listing"
+    else:
+        product_data = _mock_product_data(product_url)
+        product_data["data_source"] = "mock"
+
     # --- Azure Cognitive Services Integration ---
-    # Image Analysis
-    if mock_product_data.get("images"):
-        image_analysis_results = []
-        for img_url in mock_product_data["images"]:
-            analysis = analyze_image_from_url(img_url)
-            image_analysis_results.append(analysis)
-        mock_product_data["image_analysis"] = image_analysis_results
-
-    # Sentiment Analysis for Reviews
-    if mock_product_data.get("reviews"):
-        sentiment_analysis_results = []
-        for review_text in mock_product_data["reviews"]:
-            sentiment = analyze_sentiment(review_text)
-            sentiment_analysis_results.append({"text": review_text, "sentiment": sentiment})
-        mock_product_data["review_sentiments"] = sentiment_analysis_results
+    # Image Analysis, run concurrently on the shared Azure event loop
+    if product_data.get("images"):
+        product_data["image_analysis"] = analyze_images(product_data["images"])
+
     # --- End Azure Cognitive Services Integration ---
 
-    # In a real application, you would save this analysis to Cosmos DB
-    # product = Product(**mock_product_data)
-    # product.save()
+    # Sentiment Analysis for Reviews, scored locally with Azure per SENTIMENT_POLICY
+    if product_data.get("reviews"):
+        sentiments = analyze_sentiment_batch(product_data["reviews"])
+        product_data["review_sentiments"] = [
+            {"text": review_text, "sentiment": sentiment}
+            for review_text, sentiment in zip(product_data["reviews"], sentiments)
+        ]
+
+    return jsonify({"product_analysis": product_data}), 200
+
+@products_bp.route("/products/batch", methods=["GET"])
+def get_products_batch():
+    """Get several products by ID with ?ids=a,b,c"""
+    try:
+        try:
+            product_ids = requested_ids("ids")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(batch_response("products", product_ids, Product.find_many(product_ids))), 200
 
-    return jsonify({"product_analysis": mock_product_data}), 200
+    except Exception as e:
+        logger.error(f"Error getting products batch: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
 
 @products_bp.route("/<product_id>", methods=["GET"])
 def get_product(product_id):
-    # In a real application, you would fetch the product from Cosmos DB
-    # product = Product.find_by_id(product_id)
-    # if not product:
-    #     return jsonify({"error": "Product not found"}), 404
-    # return jsonify(product.to_dict()), 200
-    return jsonify({"message": f"Product {product_id} details (mock data)"}), 200
+    try:
+        if not ObjectId.is_valid(product_id):
+            return jsonify({"error": "Product not found"}), 404
+        product = Product.find_by_id(product_id)
+        if not product:
+            return jsonify({"error": "Product not found"}), 404
+
+        # Review sentiment is aggregated as reviews are scored, never rescored here
+        return jsonify({
+            "product": product.to_dict(),
+            "sentiment_analysis": ReviewStats.get(SCOPE_PRODUCT, product_id)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error getting product: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@products_bp.route("/<product_id>/reviews", methods=["POST"])
+def add_product_reviews(product_id):
+    try:
+        data = request.get_json() or {}
+        reviews = data.get("reviews")
+        if not isinstance(reviews, list) or not all(isinstance(review, str) for review in reviews):
+            return jsonify({"error": "reviews must be a list of strings"}), 400
+
+        if not ObjectId.is_valid(product_id):
+            return jsonify({"error": "Product not found"}), 404
+        product = Product.find_by_id(product_id)
+        if not product:
+            return jsonify({"error": "Product not found"}), 404
+
+        # Reviews already stored for this product are neither re-added nor rescored
+        scored = add_reviews(product_id, reviews, niche=product.niche)
+        return jsonify({
+            "received": len(reviews),
+            "scored": len(scored),
+            "sentiment_analysis": ReviewStats.get(SCOPE_PRODUCT, product_id)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error adding product reviews: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
@@ -0,0 +1,75 @@
+from flask import Blueprint, jsonify, request
+from src.models.niche import Niche
+from src.models.product import Product
+from src.services.search_index import search_index, KIND_NICHE, KIND_PRODUCT
+import logging
+
+logger = logging.getLogger(__name__)
+search_bp = Blueprint('search', __name__)
+
+# ?type= values and the document kinds they search
+SEARCH_TYPES = {
+    'all': None,
+    'niches': [KIND_NICHE],
+    'products': [KIND_PRODUCT]
+}
+
+def _price(name):
+    value = request.args.get(name)
+    return float(value) if value not in (None, '') else None
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """Full-text search over niches and products.
+
+    Filters: type (all, niches or products), niche, category, min_price and
+    max_price (prices only match products).
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        search_type = request.args.get('type', 'all')
+        if search_type not in SEARCH_TYPES:
+            return jsonify({'error': f"type must be one of {', '.join(SEARCH_TYPES)}"}), 400
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            limit = min(max(int(request.args.get('limit', 20)), 1), 50)  # Max 50 results
+            min_price, max_price = _price('min_price'), _price('max_price')
+        except ValueError:
+            return jsonify({'error': 'page, limit and prices must be numbers'}), 400
+
+        found = search_index.search(
+            query,
+            kinds=SEARCH_TYPES[search_type],
+            niche=request.args.get('niche'),
+            category=request.args.get('category'),
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit,
+            offset=(page - 1) * limit
+        )
+
+        # One read per kind for the current versions of the hits
+        hits = found['hits']
+        niches = Niche.find_many([hit['id'] for hit in hits if hit['type'] == KIND_NICHE])
+        products = Product.find_many([hit['id'] for hit in hits if hit['type'] == KIND_PRODUCT])
+        documents = {str(item._id): item for item in niches + products if item is not None}
+
+        results = []
+        for hit in hits:
+            item = documents.get(hit['id'])
+            if item is not None:
+                results.append({'type': hit['type'], 'score': hit['score'], hit['type']: item.to_dict()})
+
+        return jsonify({
+            'query': query,
+            'results': results,
+            'total': found['total'],
+            'page': page,
+            'limit': limit
+        })
+
+    except Exception as e:
+        logger.error(f"Error searching: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,39 @@
+from flask import Blueprint, jsonify, request
+from src.config import Config
+from src.models.timestamps import parse_datetime
+from src.services.sync import SYNC_COLLECTIONS, SyncExpired, changes_since
+from src.services.raw_json import json_response
+import logging
+
+logger = logging.getLogger(__name__)
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/sync/<collection>', methods=['GET'])
+def sync_collection(collection):
+    """Documents changed or deleted since ?since=<ISO time>; omit since for a full download.
+
+    Pages are ordered by change time. While has_more is true, request again
+    with the returned next.since and next.after; once it is false, keep
+    next.since for the following sync.
+    """
+    try:
+        if collection not in SYNC_COLLECTIONS:
+            return jsonify({'error': f"Unknown collection; expected one of {', '.join(SYNC_COLLECTIONS)}"}), 404
+
+        since = None
+        if request.args.get('since'):
+            since = parse_datetime(request.args['since'])
+            if since is None:
+                return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+        limit = max(1, min(int(request.args.get('limit', Config.SYNC_PAGE_SIZE)), Config.SYNC_MAX_PAGE_SIZE))
+
+        page = changes_since(collection, since, request.args.get('after'), limit)
+        return json_response(dict(page, count=len(page['documents'])))
+
+    except SyncExpired as e:
+        return jsonify({'error': str(e), 'resync': True}), 410
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    except Exception as e:
+        logger.error(f"Error syncing {collection}: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User
+from src.routes.batch import requested_ids, batch_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -62,6 +63,20 @@ def create_user():
         logger.error(f"Error creating user: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@user_bp.route('/users/batch', methods=['GET'])
+def get_users_batch():
+    """Get several users by ID with ?ids=a,b,c"""
+    try:
+        try:
+            user_ids = requested_ids('ids')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(batch_response('users', user_ids, User.find_many(user_ids)))
+        
+    except Exception as e:
+        logger.error(f"Error getting users batch: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @user_bp.route('/users/<user_id>', methods=['GET'])
 def get_user(user_id):
     """Get user by ID"""
@@ -0,0 +1,82 @@
+import os
+import sys
+import logging
+from gunicorn.app.base import BaseApplication
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.config import Config
+from src.database import db_instance
+from src.services.http_client import http_client
+from src.services.azure_cognitive_services import azure_runner
+from src.services.autocomplete import autocomplete_index
+from src.services.search_index import search_index
+from src.services.invalidation_bus import invalidation_bus
+from src.main import app, initialize
+
+logger = logging.getLogger(__name__)
+
+def worker_count():
+    """Configured worker processes, or 2 x CPUs + 1"""
+    return Config.SERVER_WORKERS or (os.cpu_count() or 1) * 2 + 1
+
+def post_fork(server, worker):
+    """Give each worker its own connections; sockets and threads don't survive fork"""
+    db_instance.connect()
+    http_client.close()
+    azure_runner.close()
+    # Start the Azure event loop and warm in-memory caches before the first request
+    azure_runner.start()
+    invalidation_bus.start()
+    autocomplete_index.ensure_built()
+    search_index.ensure_built()
+    # Writes made between the master's build and this fork
+    search_index.catch_up()
+    logger.info(f"Worker {worker.pid} ready")
+
+def worker_exit(server, worker):
+    """Release the worker's connections once in-flight requests have drained"""
+    invalidation_bus.close()
+    azure_runner.close()
+    http_client.close()
+    db_instance.close_connection()
+
+class NicheCompassServer(BaseApplication):
+    """Multi-process server: the app and its indexes load once in the master,
+    then each forked worker serves requests on SERVER_THREADS threads.
+    SIGTERM stops accepting connections and lets workers finish in-flight
+    requests for up to SERVER_GRACEFUL_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        super().__init__()
+
+    def load_config(self):
+        options = {
+            'bind': Config.SERVER_BIND,
+            'workers': worker_count(),
+            'threads': Config.SERVER_THREADS,
+            'worker_class': 'gthread',
+            'timeout': Config.SERVER_TIMEOUT_SECONDS,
+            'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+            'max_requests': Config.SERVER_MAX_REQUESTS,
+            'max_requests_jitter': Config.SERVER_MAX_REQUESTS // 10,
+            'preload_app': True,
+            'post_fork': post_fork,
+            'worker_exit': worker_exit,
+            'accesslog': '-'
+        }
+        for key, value in options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+if __name__ == '__main__':
+    initialize()
+    # Workers fork from here and reconnect in post_fork
+    db_instance.close_connection()
+    logger.info(f"Starting Niche Compass API server with {worker_count()} workers x {Config.SERVER_THREADS} threads...")
+    NicheCompassServer(app).run()
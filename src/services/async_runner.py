@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+class AsyncRunner:
+    """A private event loop on a background thread for blocking callers.
+
+    WSGI handlers call `run` with a coroutine and block on its result while
+    the loop multiplexes every in-flight coroutine from every handler, so
+    hundreds of outbound calls need one thread rather than one each.
+    `semaphore` bounds how many of those calls are in flight at once. The
+    loop starts on first use and is restarted in a forked child, whose copy
+    of the parent's loop thread does not exist. Coroutine functions
+    registered with `on_close` run on the loop before it stops, so clients
+    bound to it can close their sessions.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._close_hooks = []
+        self.semaphore = None
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def serve():
+                asyncio.set_event_loop(loop)
+                self.semaphore = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=serve, name='async-runner', daemon=True).start()
+            ready.wait()
+            self._loop, self._pid = loop, os.getpid()
+            return loop
+
+    def start(self):
+        """Start the background loop ahead of the first call"""
+        self._ensure_loop()
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the background loop and wait for its result"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def run_many(self, coros, timeout=None):
+        """Run coroutines concurrently and return their results in order"""
+        async def gather():
+            return await asyncio.gather(*coros)
+        return self.run(gather(), timeout)
+
+    def on_close(self, hook):
+        """Register a coroutine function to run on the loop before it stops"""
+        self._close_hooks.append(hook)
+        return hook
+
+    def close(self, timeout=5):
+        """Run the close hooks on the background loop, then stop it"""
+        with self._lock:
+            # A forked child's copy of the loop has no thread to run hooks on
+            loop = self._loop if self._pid == os.getpid() else None
+            self._loop = None
+        if loop is None:
+            return
+        for hook in self._close_hooks:
+            try:
+                asyncio.run_coroutine_threadsafe(hook(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Async runner close hook failed: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
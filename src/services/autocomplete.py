@@ -0,0 +1,301 @@
+import argparse
+import bisect
+from array import array
+import logging
+import random
+import threading
+import time
+import numpy as np
+from src.database import get_collection
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 10
+# Prefix ranges larger than this get their top-N cached on the prefix node
+CACHE_MIN_RANGE = 64
+# Prefix depths whose nodes are cached eagerly at build time
+PRECOMPUTE_DEPTH = 2
+# Incremental inserts are merged into the sorted arrays past this many
+DELTA_LIMIT = 20000
+
+# Sorts after every byte that can appear in UTF-8
+_PREFIX_END = b'\xff'
+
+class _Snapshot:
+    """Immutable sorted keyword array; only volumes and the node cache mutate"""
+
+    def __init__(self, keywords, volumes):
+        encoded = [keyword.encode('utf-8') for keyword in keywords]
+        lengths = np.fromiter((len(key) for key in encoded), dtype=np.int64, count=len(encoded))
+        self.blob = b''.join(encoded)
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # array('q') indexes to plain ints, keeping the binary search's slicing cheap
+        self.offsets = array('q', offsets.tobytes())
+        self.volumes = np.asarray(volumes, dtype=np.int64)
+        self.size = len(encoded)
+        self.node_cache = {}
+
+    def key(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def lower_bound(self, target, lo=0, hi=None):
+        hi = self.size if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_range(self, prefix):
+        lo = self.lower_bound(prefix)
+        return lo, self.lower_bound(prefix + _PREFIX_END, lo)
+
+    def find(self, key):
+        i = self.lower_bound(key)
+        if i < self.size and self.key(i) == key:
+            return i
+        return None
+
+    def top_for_range(self, lo, hi, n):
+        """Indices of the n highest-volume keywords in [lo, hi)"""
+        volumes = self.volumes[lo:hi]
+        if len(volumes) > n:
+            candidates = np.argpartition(volumes, len(volumes) - n)[-n:]
+        else:
+            candidates = np.arange(len(volumes))
+        order = candidates[np.argsort(-volumes[candidates], kind='stable')]
+        return (order + lo).tolist()
+
+    def top(self, prefix, n):
+        """Top-n (index, volume) pairs under prefix, using the node cache for wide ranges"""
+        lo, hi = self.prefix_range(prefix)
+        if hi - lo <= CACHE_MIN_RANGE:
+            indices = self.top_for_range(lo, hi, n)
+        else:
+            indices = self.node_cache.get(prefix)
+            if indices is None or len(indices) < n:
+                indices = self.top_for_range(lo, hi, max(n, TOP_N))
+                self.node_cache[prefix] = indices
+        return indices[:n]
+
+    def precompute(self, depth):
+        """Cache the top-N on every wide prefix node up to `depth` bytes"""
+        for d in range(1, depth + 1):
+            i = 0
+            while i < self.size:
+                prefix = self.key(i)[:d]
+                lo, hi = i, self.lower_bound(prefix + _PREFIX_END, i)
+                if len(prefix) == d and hi - lo > CACHE_MIN_RANGE:
+                    self.node_cache[prefix] = self.top_for_range(lo, hi, TOP_N)
+                i = max(hi, i + 1)
+
+    def items(self):
+        for i in range(self.size):
+            yield self.key(i).decode('utf-8'), int(self.volumes[i])
+
+    def nbytes(self):
+        return len(self.blob) + self.offsets.itemsize * len(self.offsets) + self.volumes.nbytes
+
+def _snapshot_from(pairs):
+    """Sorted snapshot of (keyword, search_volume) pairs, later pairs winning, with its top nodes cached"""
+    merged = {}
+    for keyword, volume in pairs:
+        merged[normalize_prefix(keyword)] = volume or 0
+    keywords = sorted(merged)
+    snapshot = _Snapshot(keywords, [merged[keyword] for keyword in keywords])
+    snapshot.precompute(PRECOMPUTE_DEPTH)
+    return snapshot
+
+class AutocompleteIndex:
+    """Keyword type-ahead over a sorted, memory-compact keyword array.
+
+    Keywords live in one UTF-8 blob with an offsets array, so a prefix maps
+    to a contiguous index range found by binary search. Wide prefix nodes
+    cache their top-N by search volume. New keywords go to a small sorted
+    delta. Once it grows past DELTA_LIMIT, a background thread merges it
+    into new arrays and swaps them in with the delta in one assignment;
+    writes made during the merge are replayed onto the new arrays.
+    """
+
+    def __init__(self, top_n=TOP_N):
+        self.top_n = top_n
+        self._lock = threading.RLock()
+        self._built = False
+        # (snapshot, sorted delta keywords, delta volumes), replaced as a whole
+        self._state = (_Snapshot([], []), [], {})
+        self._generation = 0
+        # Writes made while a merge runs, keyword -> volume; None when no merge is running
+        self._pending = None
+        self._merge_thread = None
+
+    def load(self, pairs):
+        """Replace the index contents with (keyword, search_volume) pairs"""
+        snapshot = _snapshot_from(pairs)
+        with self._lock:
+            self._state = (snapshot, [], {})
+            # A merge still running started from the old contents
+            self._generation += 1
+            self._built = True
+        return snapshot.size
+
+    def build(self):
+        """Rebuild the index from the keywords collection"""
+        collection = get_collection(Config.COLLECTION_KEYWORDS)
+        if collection is None:
+            return 0
+
+        started = time.perf_counter()
+        cursor = collection.find({}, {'keyword': 1, 'search_volume': 1, '_id': 0})
+        size = self.load(
+            (data['keyword'], data.get('search_volume')) for data in cursor if data.get('keyword')
+        )
+        logger.info(f"Autocomplete index built with {size} keywords in {time.perf_counter() - started:.2f}s")
+        return size
+
+    def ensure_built(self):
+        """Build the index on first use"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def insert(self, keyword, search_volume=None):
+        """Add a keyword or update its search volume"""
+        if not self._built:
+            # The first build reads the keyword from the database
+            return
+        keyword = normalize_prefix(keyword)
+        volume = search_volume or 0
+        with self._lock:
+            self._apply(keyword, volume)
+            if self._pending is not None:
+                self._pending[keyword] = volume
+            elif len(self._state[1]) > DELTA_LIMIT:
+                self._start_merge()
+
+    def _apply(self, keyword, volume):
+        snapshot, delta_keys, delta_volumes = self._state
+        key = keyword.encode('utf-8')
+        i = snapshot.find(key)
+        if i is not None:
+            snapshot.volumes[i] = volume
+            for end in range(1, len(key) + 1):
+                snapshot.node_cache.pop(key[:end], None)
+            return
+        if keyword not in delta_volumes:
+            bisect.insort(delta_keys, keyword)
+        delta_volumes[keyword] = volume
+
+    def _start_merge(self):
+        snapshot, _, delta_volumes = self._state
+        self._pending = {}
+        self._merge_thread = threading.Thread(
+            target=self._merge, args=(snapshot, list(delta_volumes.items()), self._generation),
+            name='autocomplete-merge', daemon=True
+        )
+        self._merge_thread.start()
+
+    def _merge(self, snapshot, delta, generation):
+        """Build merged arrays off the request path, then swap them in"""
+        started = time.perf_counter()
+        try:
+            merged = _snapshot_from(list(snapshot.items()) + delta)
+        except Exception as e:
+            logger.warning(f"Failed to merge autocomplete delta: {str(e)}")
+            merged = None
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if merged is None or generation != self._generation:
+                return
+            self._state = (merged, [], {})
+            for keyword, volume in pending.items():
+                self._apply(keyword, volume)
+        logger.info(f"Autocomplete delta merged into {merged.size} keywords in {time.perf_counter() - started:.2f}s")
+
+    def complete(self, prefix, limit=TOP_N):
+        """Top keywords by search volume starting with prefix"""
+        self.ensure_built()
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+
+        snapshot, delta_keys, delta_volumes = self._state
+        results = [
+            (snapshot.key(i).decode('utf-8'), int(snapshot.volumes[i]))
+            for i in snapshot.top(prefix.encode('utf-8'), limit)
+        ]
+
+        if delta_keys:
+            lo = bisect.bisect_left(delta_keys, prefix)
+            # The highest code point, so astral characters after the prefix stay in range
+            hi = bisect.bisect_left(delta_keys, prefix + '\U0010ffff', lo)
+            results.extend((keyword, delta_volumes.get(keyword, 0)) for keyword in delta_keys[lo:hi])
+            results.sort(key=lambda item: item[1], reverse=True)
+
+        return [
+            {'keyword': keyword, 'search_volume': volume}
+            for keyword, volume in results[:limit]
+        ]
+
+    def __len__(self):
+        snapshot, delta_keys, _ = self._state
+        return snapshot.size + len(delta_keys)
+
+def normalize_prefix(text):
+    """Match the keyword normalization used by the Keyword model"""
+    return text.lower().strip()
+
+# Global autocomplete index
+autocomplete_index = AutocompleteIndex()
+
+def benchmark(n_keywords=3000000, queries=20000, seed=0):
+    """Measure memory and prefix-query latency on synthetic keywords"""
+    rng = random.Random(seed)
+    heads = ['custom', 'handmade', 'vintage', 'personalized', 'minimalist', 'boho', 'wooden', 'ceramic',
+             'leather', 'gold', 'silver', 'linen', 'crochet', 'macrame', 'retro', 'floral']
+    items = ['mug', 'necklace', 'ring', 'print', 'poster', 'wall art', 'earrings', 'bag', 'candle',
+             'planter', 'blanket', 'sign', 'journal', 'sticker', 'shirt', 'tote', 'bracelet', 'vase']
+    tails = ['', ' gift', ' for her', ' for him', ' set', ' bundle', ' kit', ' ideas', ' personalized']
+
+    def synthetic(i):
+        return f"{rng.choice(heads)} {rng.choice(items)}{rng.choice(tails)} {i:x}"
+
+    pairs = [(synthetic(i), int(rng.paretovariate(1.2) * 10)) for i in range(n_keywords)]
+
+    index = AutocompleteIndex()
+    started = time.perf_counter()
+    index.load(pairs)
+    build_seconds = time.perf_counter() - started
+    snapshot = index._state[0]
+    print(f"Built {len(index):,} keywords in {build_seconds:.1f}s, "
+          f"{snapshot.nbytes() / 1e6:.1f} MB arrays, {len(snapshot.node_cache):,} cached nodes")
+
+    prefixes = []
+    for _ in range(queries):
+        keyword = pairs[rng.randrange(n_keywords)][0]
+        prefixes.append(keyword[:rng.randint(1, min(len(keyword), 12))])
+
+    timings = []
+    for prefix in prefixes:
+        t = time.perf_counter()
+        index.complete(prefix, TOP_N)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+    print(f"{queries:,} queries: p50 {timings[len(timings) // 2] * 1e6:.0f}us, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f}us")
+
+    started = time.perf_counter()
+    for i in range(1000):
+        index.insert(f"zz new keyword {i}", i)
+    print(f"1,000 incremental inserts: {(time.perf_counter() - started) * 1e3:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autocomplete index benchmark")
+    parser.add_argument('--keywords', type=int, default=3000000)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+    benchmark(args.keywords, args.queries)
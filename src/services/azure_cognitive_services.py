@@ -1,70 +1,157 @@
 import os
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
-from azure.cognitiveservices.vision.computervision.models import VisualFeatureTypes
-from msrest.authentication import CognitiveServicesCredentials
-
+import asyncio
+from concurrent.futures import TimeoutError as FutureTimeout
+import aiohttp
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.textanalytics import TextAnalyticsClient
-
-import time
+from azure.ai.textanalytics.aio import TextAnalyticsClient
+from src.services.async_runner import AsyncRunner
+from src.config import Config
 
 # Get environment variables
 COG_SERV_KEY = os.getenv("AZURE_COGNITIVE_SERVICES_KEY")
 COG_SERV_ENDPOINT = os.getenv("AZURE_COGNITIVE_SERVICES_ENDPOINT")
 
-# Initialize Computer Vision client
-computervision_client = ComputerVisionClient(
-    COG_SERV_ENDPOINT,
-    CognitiveServicesCredentials(COG_SERV_KEY)
-)
-
-# Initialize Text Analytics client
-text_analytics_client = TextAnalyticsClient(
-    endpoint=COG_SERV_ENDPOINT,
-    credential=AzureKeyCredential(COG_SERV_KEY)
-)
-
-def analyze_image_from_url(image_url):
+# Computer Vision v3.2 analyze operation; the REST call is what the SDK client wraps
+ANALYZE_IMAGE_PATH = "/vision/v3.2/analyze"
+VISUAL_FEATURES = "Tags,Description,Categories"
+
+# Text Analytics accepts at most this many documents per sentiment request
+SENTIMENT_BATCH_SIZE = 10
+
+# Every Azure call runs on this loop; the sync functions below block on it
+azure_runner = AsyncRunner(Config.AZURE_MAX_CONCURRENCY)
+
+# Async clients belong to the loop that created them
+_clients = {}
+
+def _credentials_missing():
+    return not COG_SERV_KEY or not COG_SERV_ENDPOINT
+
+def _get_clients():
+    loop = asyncio.get_running_loop()
+    if _clients.get("loop") is not loop:
+        _clients.update(
+            loop=loop,
+            http=aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=Config.AZURE_MAX_CONCURRENCY),
+                timeout=aiohttp.ClientTimeout(total=Config.AZURE_TIMEOUT_SECONDS)
+            ),
+            text=TextAnalyticsClient(endpoint=COG_SERV_ENDPOINT, credential=AzureKeyCredential(COG_SERV_KEY))
+        )
+    return _clients
+
+@azure_runner.on_close
+async def _close_clients():
+    """Close the sessions opened on the runner's loop before it stops"""
+    if _clients.get("loop") is asyncio.get_running_loop():
+        await _clients["http"].close()
+        await _clients["text"].close()
+    _clients.clear()
+
+def _timed_out(count):
+    message = f"Azure call timed out after {Config.AZURE_CALL_TIMEOUT_SECONDS:g}s"
+    print(message)
+    return [{"error": message} for _ in range(count)]
+
+def _sentiment_result(response):
+    if response.is_error:
+        return {"error": response.error.message}
+    return {
+        "sentiment": response.sentiment,
+        "positive_score": response.confidence_scores.positive,
+        "neutral_score": response.confidence_scores.neutral,
+        "negative_score": response.confidence_scores.negative
+    }
+
+async def analyze_image_from_url_async(image_url):
     """Analyzes an image from a URL using Computer Vision."""
-    if not COG_SERV_KEY or not COG_SERV_ENDPOINT:
+    if _credentials_missing():
         print("Azure Cognitive Services credentials not set. Skipping image analysis.")
         return {"error": "Cognitive Services credentials not configured"}
 
     try:
-        # Select the visual feature(s) you want to analyze
-        features = [VisualFeatureTypes.tags, VisualFeatureTypes.description, VisualFeatureTypes.categories]
-        
-        image_analysis = computervision_client.analyze_image(image_url, features)
-
+        http = _get_clients()["http"]
+        async with azure_runner.semaphore:
+            async with http.post(
+                COG_SERV_ENDPOINT.rstrip("/") + ANALYZE_IMAGE_PATH,
+                params={"visualFeatures": VISUAL_FEATURES},
+                headers={"Ocp-Apim-Subscription-Key": COG_SERV_KEY},
+                json={"url": image_url}
+            ) as response:
+                image_analysis = await response.json(content_type=None)
+                if response.status != 200:
+                    raise RuntimeError(image_analysis.get("error", {}).get("message") or f"HTTP {response.status}")
+
+        captions = image_analysis.get("description", {}).get("captions") or []
         return {
-            "description": image_analysis.description.captions[0].text if image_analysis.description.captions else None,
-            "tags": [tag.name for tag in image_analysis.tags],
-            "categories": [category.name for category in image_analysis.categories]
+            "description": captions[0]["text"] if captions else None,
+            "tags": [tag["name"] for tag in image_analysis.get("tags", [])],
+            "categories": [category["name"] for category in image_analysis.get("categories", [])]
         }
     except Exception as e:
         print(f"Error analyzing image: {e}")
         return {"error": str(e)}
 
-def analyze_sentiment(text):
+async def analyze_sentiment_async(text):
     """Analyzes the sentiment of a given text using Language Service."""
-    if not COG_SERV_KEY or not COG_SERV_ENDPOINT:
-        print("Azure Cognitive Services credentials not set. Skipping sentiment analysis.")
-        return {"error": "Cognitive Services credentials not configured"}
+    return (await analyze_sentiment_batch_async([text]))[0]
 
+async def _sentiment_chunk(documents):
     try:
-        documents = [text]
-        response = text_analytics_client.analyze_sentiment(documents=documents)[0]
-
-        return {
-            "sentiment": response.sentiment,
-            "positive_score": response.confidence_scores.positive,
-            "neutral_score": response.confidence_scores.neutral,
-            "negative_score": response.confidence_scores.negative
-        }
+        text_client = _get_clients()["text"]
+        async with azure_runner.semaphore:
+            responses = await text_client.analyze_sentiment(documents=documents)
+        return [_sentiment_result(response) for response in responses]
     except Exception as e:
         print(f"Error analyzing sentiment: {e}")
-        return {"error": str(e)}
+        return [{"error": str(e)} for _ in documents]
+
+async def analyze_sentiment_batch_async(texts):
+    """Analyzes the sentiment of many texts, sending SENTIMENT_BATCH_SIZE-document requests concurrently."""
+    if _credentials_missing():
+        print("Azure Cognitive Services credentials not set. Skipping sentiment analysis.")
+        return [{"error": "Cognitive Services credentials not configured"} for _ in texts]
+
+    chunks = await asyncio.gather(*(
+        _sentiment_chunk(texts[start:start + SENTIMENT_BATCH_SIZE])
+        for start in range(0, len(texts), SENTIMENT_BATCH_SIZE)
+    ))
+    return [result for chunk in chunks for result in chunk]
+
+# Request handlers block on these for at most AZURE_CALL_TIMEOUT_SECONDS,
+# queueing for the concurrency limit included
+
+def analyze_image_from_url(image_url):
+    """Analyzes an image from a URL using Computer Vision."""
+    try:
+        return azure_runner.run(analyze_image_from_url_async(image_url), Config.AZURE_CALL_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        return _timed_out(1)[0]
+
+def analyze_images(image_urls):
+    """Analyzes several images concurrently, results in input order."""
+    try:
+        return azure_runner.run_many(
+            [analyze_image_from_url_async(image_url) for image_url in image_urls],
+            Config.AZURE_CALL_TIMEOUT_SECONDS
+        )
+    except FutureTimeout:
+        return _timed_out(len(image_urls))
+
+def analyze_sentiment(text):
+    """Analyzes the sentiment of a given text using Language Service."""
+    try:
+        return azure_runner.run(analyze_sentiment_async(text), Config.AZURE_CALL_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        return _timed_out(1)[0]
+
+def analyze_sentiment_batch(texts):
+    """Analyzes the sentiment of many texts, SENTIMENT_BATCH_SIZE documents per request."""
+    texts = list(texts)
+    try:
+        return azure_runner.run(analyze_sentiment_batch_async(texts), Config.AZURE_CALL_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        return _timed_out(len(texts))
 
 # Example Usage (for testing purposes)
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+import logging
+from src.services.http_client import http_client, FetchError
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Active listing counts separating low/medium/high competition
+COMPETITION_THRESHOLDS = (1000, 10000)
+
+def _headers():
+    return {'x-api-key': Config.ETSY_API_KEY, 'Accept': 'application/json'}
+
+def _price(listing):
+    price = listing.get('price') or {}
+    if not price.get('divisor'):
+        return None
+    return price['amount'] / price['divisor']
+
+def search_active_listings(keyword, limit=100):
+    """Active Etsy listings matching a keyword, or None when the API is unavailable"""
+    if not Config.ETSY_API_KEY:
+        return None
+    try:
+        result = http_client.fetch(
+            f"{Config.ETSY_API_BASE_URL}/listings/active",
+            params={'keywords': keyword, 'limit': limit},
+            headers=_headers()
+        )
+        if not result.ok:
+            logger.warning(f"Etsy listing search for '{keyword}' returned HTTP {result.status_code}")
+            return None
+        return result.json()
+    except (FetchError, ValueError) as e:
+        logger.warning(f"Etsy listing search for '{keyword}' failed: {str(e)}")
+        return None
+
+def keyword_market_data(keyword):
+    """Competition level and price range for a keyword from active Etsy listings"""
+    listings = search_active_listings(keyword)
+    if listings is None:
+        return None
+
+    count = listings.get('count', 0)
+    if count < COMPETITION_THRESHOLDS[0]:
+        competition_level = 'low'
+    elif count < COMPETITION_THRESHOLDS[1]:
+        competition_level = 'medium'
+    else:
+        competition_level = 'high'
+
+    prices = [price for price in map(_price, listings.get('results', [])) if price is not None]
+    price_range = {}
+    if prices:
+        price_range = {
+            'min': round(min(prices), 2),
+            'max': round(max(prices), 2),
+            'avg': round(sum(prices) / len(prices), 2)
+        }
+
+    return {
+        'listing_count': count,
+        'competition_level': competition_level,
+        'price_range': price_range
+    }
@@ -0,0 +1,40 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+class FanOut:
+    """Run independent lookups concurrently on a bounded thread pool.
+
+    Every section shares one deadline. A section that misses it, or raises,
+    is reported by name and left out of the results, so callers can answer
+    with whatever finished in time. The pool is shared across requests, so
+    its size bounds the database work a burst of requests can start.
+    """
+
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fan-out')
+
+    def run(self, sections, timeout):
+        """Run {name: fn} and return (results, timed_out, failed)"""
+        futures = {name: self._executor.submit(fn) for name, fn in sections.items()}
+        deadline = time.monotonic() + timeout
+
+        results, timed_out, failed = {}, [], []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeout:
+                # Drops it if it hasn't started; a running lookup finishes in the background
+                future.cancel()
+                timed_out.append(name)
+            except Exception as e:
+                logger.error(f"Section {name} failed: {str(e)}")
+                failed.append(name)
+        return results, timed_out, failed
+
+# Global fan-out pool for composite endpoints
+fan_out = FanOut(Config.DASHBOARD_WORKERS)
@@ -0,0 +1,194 @@
+import json
+import random
+import threading
+import time
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Request errors worth retrying; any other requests error fails at once
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+class FetchError(Exception):
+    """Raised when a URL could not be fetched after all retries"""
+
+class FetchResult:
+    """Body and metadata of a fetched URL"""
+
+    def __init__(self, url, status_code, text, headers, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class _Host:
+    """Connection pool, concurrency cap and rate limit shared by requests to one host"""
+
+    def __init__(self, concurrency, rate, burst):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+
+class FetchClient:
+    """Shared outbound HTTP client.
+
+    Each host gets its own pooled session, a cap on in-flight requests and a
+    token-bucket rate limit. ETag/Last-Modified validators are remembered per
+    URL so repeat fetches revalidate with a conditional request and reuse the
+    cached body on 304. Connection errors, timeouts, truncated bodies, 429 and
+    5xx responses are retried with exponential backoff, honouring Retry-After
+    up to max_retry_delay. Every other requests error raises FetchError.
+    """
+
+    def __init__(self, concurrency=None, rate=None, burst=None, retries=None,
+                 backoff=None, timeout=None, cache_entries=None, max_retry_delay=None):
+        self.concurrency = concurrency or Config.HTTP_MAX_CONNECTIONS_PER_HOST
+        self.rate = rate or Config.HTTP_RATE_PER_HOST
+        self.burst = burst or Config.HTTP_BURST_PER_HOST
+        self.retries = Config.HTTP_RETRIES if retries is None else retries
+        self.backoff = Config.HTTP_BACKOFF_SECONDS if backoff is None else backoff
+        self.max_retry_delay = Config.HTTP_MAX_RETRY_DELAY_SECONDS if max_retry_delay is None else max_retry_delay
+        self.timeout = timeout or Config.HTTP_TIMEOUT_SECONDS
+        self.cache_entries = cache_entries or Config.HTTP_CACHE_ENTRIES
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self._validators = OrderedDict()  # url -> (etag, last_modified, FetchResult)
+        self._validators_lock = threading.Lock()
+
+    def _host(self, url):
+        netloc = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            host = self._hosts.get(netloc)
+            if host is None:
+                host = _Host(self.concurrency, self.rate, self.burst)
+                self._hosts[netloc] = host
+            return host
+
+    def _cached(self, key):
+        with self._validators_lock:
+            entry = self._validators.get(key)
+            if entry is not None:
+                self._validators.move_to_end(key)
+            return entry
+
+    def _remember(self, key, response, result):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._validators_lock:
+            self._validators[key] = (etag, last_modified, result)
+            self._validators.move_to_end(key)
+            while len(self._validators) > self.cache_entries:
+                self._validators.popitem(last=False)
+
+    def _retry_delay(self, attempt, response):
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        # A server's Retry-After must not hold a worker thread indefinitely
+        return min(delay, self.max_retry_delay)
+
+    def fetch(self, url, params=None, headers=None, conditional=True):
+        """GET a URL through the host's pool, limits and validator cache"""
+        key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        request_headers = dict(headers or {})
+        cached = self._cached(key) if conditional else None
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                request_headers['If-None-Match'] = etag
+            if last_modified:
+                request_headers['If-Modified-Since'] = last_modified
+
+        host = self._host(url)
+        response = None
+        error = None
+        for attempt in range(self.retries + 1):
+            host.bucket.acquire()
+            with host.slots:
+                try:
+                    response = host.session.get(url, params=params, headers=request_headers, timeout=self.timeout)
+                    error = None
+                except RETRY_ERRORS as e:
+                    response = None
+                    error = e
+                except requests.RequestException as e:
+                    # Redirect loops, undecodable bodies and invalid URLs fail the same way on retry
+                    raise FetchError(f"Failed to fetch {url}: {e}") from e
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                break
+            if attempt < self.retries:
+                delay = self._retry_delay(attempt, response)
+                logger.debug(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+
+        if response is None:
+            raise FetchError(f"Failed to fetch {url}: {error}")
+
+        if response.status_code == 304 and cached is not None:
+            previous = cached[2]
+            return FetchResult(previous.url, previous.status_code, previous.text, previous.headers, from_cache=True)
+
+        result = FetchResult(response.url, response.status_code, response.text, dict(response.headers))
+        if response.status_code == 200:
+            self._remember(key, response, result)
+        return result
+
+    def get_text(self, url, **kwargs):
+        """Fetch a URL and return its body, raising FetchError on a non-2xx status"""
+        result = self.fetch(url, **kwargs)
+        if not result.ok:
+            raise FetchError(f"Failed to fetch {url}: HTTP {result.status_code}")
+        return result.text
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._hosts_lock:
+            for host in self._hosts.values():
+                host.session.close()
+            self._hosts = {}
+
+# Global fetch client
+http_client = FetchClient()
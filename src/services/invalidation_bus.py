@@ -0,0 +1,229 @@
+import argparse
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Key meaning "every document in the collection"
+ALL_KEYS = '*'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+class InvalidationBus:
+    """Broadcasts (collection, key) invalidations to every worker on this host.
+
+    Events are appended to a shared SQLite table in WAL mode, so writers do
+    not block the readers. Each process runs one background thread that, every
+    `poll_interval` seconds, writes the events published since the last
+    tick in one transaction and reads the events other processes wrote. Keys
+    repeated within a tick are sent once, and a collection with more than
+    `max_keys` pending keys is sent as a single collection-wide invalidation.
+
+    Handlers get a set of keys, or None when the whole collection changed.
+    A handler subscribed with local=True also runs synchronously on the
+    publishing process's own events. Rows older than `retention` seconds
+    are pruned, so a worker stalled for longer can miss events. Caches
+    should keep a TTL as a backstop.
+    """
+
+    def __init__(self, path, poll_interval, max_keys, retention):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_keys = max_keys
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._handlers = {}  # collection -> [(handler, local)]
+        self._pending = {}  # collection -> set of keys, or None for all
+        self._pid = None
+        self._origin = None
+        self._stop = None
+        self._thread = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        # Short-lived processes such as CLIs send their last events on exit
+        atexit.register(self.close)
+
+    def _after_fork(self):
+        # The parent's bus thread may have held the lock when it forked
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = None
+
+    def subscribe(self, collection, handler, local=True):
+        """Call handler(keys) when documents of a collection change; remote events arrive once start() has run"""
+        self._handlers.setdefault(collection, []).append((handler, local))
+
+    def publish(self, collection, keys):
+        """Invalidate documents of a collection here and in every other worker"""
+        keys = {str(key) for key in keys}
+        if not keys:
+            return
+        self._deliver(collection, keys, remote=False)
+        self.start()
+        with self._lock:
+            pending = self._pending.get(collection, set())
+            if pending is not None:
+                pending |= keys
+                self._pending[collection] = None if len(pending) > self.max_keys else pending
+
+    def publish_all(self, collection):
+        """Invalidate every document of a collection here and in every other worker"""
+        self._deliver(collection, None, remote=False)
+        self.start()
+        with self._lock:
+            self._pending[collection] = None
+
+    def _deliver(self, collection, keys, remote):
+        for handler, local in self._handlers.get(collection, []):
+            if not remote and not local:
+                continue
+            try:
+                handler(keys)
+            except Exception as e:
+                logger.warning(f"Invalidation handler for {collection} failed: {str(e)}")
+
+    def start(self):
+        """Start this process's bus thread; a forked child starts its own"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._origin = uuid.uuid4().hex
+            self._stop = threading.Event()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop, ready), name='invalidation-bus', daemon=True)
+            self._thread.start()
+        ready.wait(5)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(_SCHEMA)
+        connection.commit()
+        return connection
+
+    def _run(self, stop, ready):
+        try:
+            connection = self._connect()
+            last_seq = connection.execute('SELECT COALESCE(MAX(seq), 0) FROM invalidations').fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Invalidation bus unavailable at {self.path}: {str(e)}")
+            ready.set()
+            return
+        ready.set()
+
+        last_prune = time.monotonic()
+        while True:
+            stopping = stop.wait(self.poll_interval)
+            try:
+                self._flush(connection)
+                if stopping:
+                    break
+                last_seq = self._poll(connection, last_seq)
+                if time.monotonic() - last_prune > self.retention:
+                    with connection:
+                        connection.execute('DELETE FROM invalidations WHERE created < ?', (time.time() - self.retention,))
+                    last_prune = time.monotonic()
+            except sqlite3.Error as e:
+                logger.warning(f"Invalidation bus error: {str(e)}")
+        connection.close()
+
+    def _flush(self, connection):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        now = time.time()
+        rows = []
+        for collection, keys in pending.items():
+            for key in (keys if keys is not None else [ALL_KEYS]):
+                rows.append((collection, key, self._origin, now))
+        with connection:
+            connection.executemany(
+                'INSERT INTO invalidations (collection, key, origin, created) VALUES (?, ?, ?, ?)', rows
+            )
+
+    def _poll(self, connection, last_seq):
+        events = {}
+        for seq, collection, key, origin in connection.execute(
+            'SELECT seq, collection, key, origin FROM invalidations WHERE seq > ? ORDER BY seq', (last_seq,)
+        ):
+            last_seq = seq
+            if origin == self._origin:
+                continue
+            keys = events.get(collection, set())
+            if keys is not None:
+                events[collection] = None if key == ALL_KEYS else keys | {key}
+        for collection, keys in events.items():
+            self._deliver(collection, keys, remote=True)
+        return last_seq
+
+    def close(self):
+        """Send pending events and stop this process's bus thread"""
+        if self._pid == os.getpid() and self._stop is not None:
+            self._stop.set()
+            self._thread.join(5)
+            self._pid = None
+
+# Global invalidation bus
+invalidation_bus = InvalidationBus(
+    Config.INVALIDATION_BUS_PATH,
+    Config.INVALIDATION_POLL_SECONDS,
+    Config.INVALIDATION_MAX_KEYS,
+    Config.INVALIDATION_RETENTION_SECONDS
+)
+
+def demo(workers=4, events=2000):
+    """Publish invalidations from several processes and report what each one received"""
+    import multiprocessing
+
+    def worker(index, barrier, results):
+        received = []
+        invalidation_bus.subscribe('demo', lambda keys: received.append(keys), local=False)
+        barrier.wait()
+        for i in range(events):
+            invalidation_bus.publish('demo', [f"{index}:{i % 100}"])
+        time.sleep(invalidation_bus.poll_interval * 10)
+        keys = set()
+        for batch in received:
+            keys |= batch if batch is not None else {ALL_KEYS}
+        results.put((index, len(received), len(keys)))
+        invalidation_bus.close()
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    started = time.perf_counter()
+    processes = [context.Process(target=worker, args=(i, barrier, results)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        index, batches, keys = results.get()
+        print(f"worker {index}: {keys} distinct remote keys in {batches} batches")
+    for process in processes:
+        process.join()
+    print(f"{workers} workers x {events} events in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process invalidation bus demo")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--events', type=int, default=2000)
+    args = parser.parse_args()
+    demo(args.workers, args.events)
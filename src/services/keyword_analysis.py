@@ -0,0 +1,17 @@
+from src.models.keyword import Keyword
+from src.services.etsy_api import keyword_market_data
+
+def analyze_new_keyword(keyword_text, market=None):
+    """Build analysis data for a keyword that isn't stored yet"""
+    # Competition and prices come from live Etsy listings when the API is
+    # configured; search volume and trend are still mock data for the MVP
+    if market is None:
+        market = keyword_market_data(keyword_text) or {}
+    return Keyword(
+        keyword=keyword_text,
+        search_volume=1000,  # Mock data
+        competition_level=market.get('competition_level', 'medium'),
+        trend_direction='stable',
+        related_keywords=[f"{keyword_text} ideas", f"best {keyword_text}", f"{keyword_text} design"],
+        price_range=market.get('price_range') or {'min': 10, 'max': 100, 'avg': 35}
+    )
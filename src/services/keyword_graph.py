@@ -0,0 +1,237 @@
+import heapq
+import math
+import threading
+import logging
+from src.database import get_collection
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+TOP_K_NEIGHBORS = 20
+SECOND_HOP_FANOUT = 10
+SECOND_HOP_DECAY = 0.5
+SUGGESTION_CACHE_SIZE = 10000
+
+class KeywordGraph:
+    """In-memory related-keyword graph with compact integer node IDs.
+
+    Edges count the stored keywords whose `related_keywords` list, with
+    the keyword itself, contains both ends. Each node keeps a precomputed
+    top-k neighbor list weighted by co-occurrence and the neighbor's search
+    volume, so a suggestion query only walks two short lists.
+    """
+
+    def __init__(self, top_k=TOP_K_NEIGHBORS):
+        self.top_k = top_k
+        self._lock = threading.RLock()
+        self._built = False
+        self._reset()
+        # Suggestions computed at the current graph version, keyed by (seed id, limit)
+        self._version = 0
+        self._cache = {}
+
+    def _reset(self):
+        self._ids = {}          # keyword -> node id
+        self._keywords = []     # node id -> keyword
+        self._volumes = []      # node id -> search volume
+        self._competition = []  # node id -> competition level
+        self._edges = []        # node id -> {neighbor id: co-occurrence count}
+        self._top = []          # node id -> [(score, neighbor id), ...] best first
+        self._lists = {}        # node id -> ids in its related list, itself included
+
+    def _node(self, keyword):
+        """Return the node ID for a keyword, allocating one if needed"""
+        node_id = self._ids.get(keyword)
+        if node_id is None:
+            node_id = len(self._keywords)
+            self._ids[keyword] = node_id
+            self._keywords.append(keyword)
+            self._volumes.append(0)
+            self._competition.append(None)
+            self._edges.append({})
+            self._top.append([])
+        return node_id
+
+    def _weight(self, node_id):
+        return 1 + math.log1p(self._volumes[node_id] or 0)
+
+    def _link(self, a, b):
+        if a == b:
+            return
+        self._edges[a][b] = self._edges[a].get(b, 0) + 1
+        self._edges[b][a] = self._edges[b].get(a, 0) + 1
+
+    def _unlink(self, a, b):
+        for x, y in ((a, b), (b, a)):
+            count = self._edges[x].get(y, 0) - 1
+            if count > 0:
+                self._edges[x][y] = count
+            else:
+                self._edges[x].pop(y, None)
+
+    def _extend_list(self, node_id, related_ids):
+        """Add keywords to a node's related list, counting each new pair; returns the nodes whose edges changed"""
+        members = self._lists.setdefault(node_id, {node_id})
+        touched = set()
+        for related_id in related_ids:
+            if related_id in members:
+                continue
+            for member in members:
+                self._link(member, related_id)
+            touched |= members
+            touched.add(related_id)
+            members.add(related_id)
+        return touched
+
+    def _recompute_top(self, node_id):
+        self._top[node_id] = heapq.nlargest(
+            self.top_k,
+            ((count * self._weight(neighbor), neighbor) for neighbor, count in self._edges[node_id].items())
+        )
+
+    def _set_attributes(self, node_id, search_volume, competition_level):
+        """Update node attributes, returning True if the volume changed"""
+        if competition_level is not None:
+            self._competition[node_id] = competition_level
+        if search_volume is not None and search_volume != self._volumes[node_id]:
+            self._volumes[node_id] = search_volume
+            return True
+        return False
+
+    def build(self):
+        """Rebuild the graph from the keywords collection"""
+        collection = get_collection(Config.COLLECTION_KEYWORDS)
+        if collection is None:
+            return 0
+
+        with self._lock:
+            self._reset()
+            projection = {'keyword': 1, 'related_keywords': 1, 'search_volume': 1, 'competition_level': 1}
+            for data in collection.find({}, projection):
+                if not data.get('keyword'):
+                    continue
+                node_id = self._node(normalize_keyword(data['keyword']))
+                self._set_attributes(node_id, data.get('search_volume'), data.get('competition_level'))
+                self._extend_list(node_id, [self._node(normalize_keyword(related)) for related in data.get('related_keywords') or []])
+
+            for node_id in range(len(self._keywords)):
+                self._recompute_top(node_id)
+            self._built = True
+            self._invalidate()
+
+        logger.info(f"Keyword graph built with {len(self._keywords)} keywords")
+        return len(self._keywords)
+
+    def ensure_built(self):
+        """Build the graph on first use"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def add_keyword(self, keyword, search_volume=None, competition_level=None, related_keywords=None):
+        """Incrementally add a keyword and its related keywords"""
+        if not self._built:
+            # The first build reads the keyword from the database
+            return
+        with self._lock:
+            node_id = self._node(normalize_keyword(keyword))
+            touched = {node_id}
+            if self._set_attributes(node_id, search_volume, competition_level):
+                # Neighbors rank this node by volume, so their lists shift too
+                touched.update(self._edges[node_id])
+            touched |= self._extend_list(node_id, [self._node(normalize_keyword(related)) for related in related_keywords or []])
+            for touched_id in touched:
+                self._recompute_top(touched_id)
+            self._invalidate()
+
+    def remove_keyword(self, keyword):
+        """Drop a deleted keyword, the pairs its related list counted and its place in other lists"""
+        if not self._built:
+            return
+        with self._lock:
+            node_id = self._ids.pop(normalize_keyword(keyword), None)
+            if node_id is None:
+                return
+            members = self._lists.pop(node_id, {node_id})
+            touched = set(members) | set(self._edges[node_id])
+            members = sorted(members - {node_id})
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    self._unlink(a, b)
+            for neighbor in self._edges[node_id]:
+                self._edges[neighbor].pop(node_id, None)
+                # Every list holding this keyword also holds its owner, a neighbor
+                self._lists.get(neighbor, set()).discard(node_id)
+            # The ID is not reused; the keyword gets a new one if it comes back
+            self._edges[node_id] = {}
+            touched.discard(node_id)
+            self._top[node_id] = []
+            for touched_id in touched:
+                self._recompute_top(touched_id)
+            self._invalidate()
+
+    def _invalidate(self):
+        self._version += 1
+        self._cache = {}
+
+    def add_related(self, keyword, related_keyword):
+        """Incrementally record a single related-keyword edge"""
+        self.add_keyword(keyword, related_keywords=[related_keyword])
+
+    def suggestions(self, seed_keyword, limit=10):
+        """Rank direct and two-hop neighbors of a seed keyword"""
+        self.ensure_built()
+        seed_id = self._ids.get(normalize_keyword(seed_keyword))
+        if seed_id is None:
+            return []
+
+        version = self._version
+        cached = self._cache.get((seed_id, limit))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        direct = self._top[seed_id]
+        if not direct:
+            return []
+
+        scores = {}
+        hops = {}
+        for score, neighbor in direct:
+            scores[neighbor] = score
+            hops[neighbor] = 1
+        for score, neighbor in direct[:SECOND_HOP_FANOUT]:
+            for second_score, second in self._top[neighbor][:SECOND_HOP_FANOUT]:
+                if second == seed_id or hops.get(second) == 1:
+                    continue
+                scores[second] = scores.get(second, 0) + SECOND_HOP_DECAY * score * second_score / direct[0][0]
+                hops[second] = 2
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        best = ranked[0][1] if ranked else 1
+        results = [
+            {
+                'keyword': self._keywords[node_id],
+                'search_volume': self._volumes[node_id] or None,
+                'competition_level': self._competition[node_id],
+                'relevance_score': round(score / best, 3),
+                'hops': hops[node_id]
+            }
+            for node_id, score in ranked
+        ]
+
+        cache = self._cache
+        if len(cache) >= SUGGESTION_CACHE_SIZE:
+            cache.clear()
+        cache[(seed_id, limit)] = (version, results)
+        return results
+
+    def __len__(self):
+        return len(self._keywords)
+
+def normalize_keyword(keyword):
+    """Keywords are stored lower-cased and stripped"""
+    return keyword.lower().strip()
+
+# Global graph instance
+keyword_graph = KeywordGraph()
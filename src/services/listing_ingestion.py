@@ -0,0 +1,226 @@
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from src.models.product import Product, url_hash
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Chunks normalized ahead of the writer; the reader blocks once this many are waiting
+QUEUE_CHUNKS = 4
+
+_END = object()
+
+def read_listings(path, offset=0, records=0):
+    """Stream (position, record) pairs from an NDJSON or CSV listing dump.
+
+    `position` is where the stream resumes after this record: a byte offset
+    for NDJSON and a record count for CSV (quoted CSV fields may span lines,
+    so CSV resumes by skipping records instead of seeking).
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = itertools.islice(csv.DictReader(f), records, None)
+            for row in reader:
+                records += 1
+                yield {'offset': 0, 'records': records}, row
+        return
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if not line.strip():
+                continue
+            records += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Still yielded so the checkpoint moves past it
+                logger.warning(f"Skipping malformed NDJSON line ending at byte {offset}")
+                record = None
+            yield {'offset': offset, 'records': records}, record
+
+def _to_float(value):
+    if value in (None, ''):
+        return None
+    try:
+        return float(str(value).replace(',', '').lstrip('$'))
+    except ValueError:
+        return None
+
+def _to_int(value):
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+def _to_list(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+def _to_datetime(value):
+    if not value or isinstance(value, datetime):
+        return value or None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def normalize_listing(record):
+    """Map a raw listing record onto a Product, or None if it has no URL or title"""
+    if not isinstance(record, dict):
+        return None
+    url = (record.get('url') or record.get('listing_url') or '').strip()
+    title = (record.get('title') or '').strip()
+    if not url or not title:
+        return None
+
+    return Product(
+        title=title,
+        url=url,
+        store_name=record.get('store_name') or record.get('shop_name'),
+        price=_to_float(record.get('price')),
+        currency=record.get('currency') or 'USD',
+        description=record.get('description'),
+        images=_to_list(record.get('images')),
+        tags=_to_list(record.get('tags')),
+        category=record.get('category'),
+        sales_estimate=_to_int(record.get('sales_estimate')),
+        reviews_count=_to_int(record.get('reviews_count')) or 0,
+        rating=_to_float(record.get('rating')),
+        listing_date=_to_datetime(record.get('listing_date')),
+        niche=record.get('niche')
+    )
+
+class ListingIngestion:
+    """Ingest a listing dump into the products collection in bounded chunks.
+
+    A reader thread parses, normalizes and de-duplicates records into chunks
+    and hands them to the writer through a bounded queue, so memory holds at
+    most QUEUE_CHUNKS chunks and the reader stalls whenever the database is
+    the bottleneck. After each chunk is written the stream position is saved
+    to a checkpoint file; re-running resumes from it. Upserts are keyed by
+    URL hash, so replaying a chunk after a crash is harmless.
+    """
+
+    def __init__(self, path, chunk_size=None, checkpoint_path=None, resume=True):
+        self.path = path
+        self.chunk_size = chunk_size or Config.INGEST_CHUNK_SIZE
+        self.checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+        self.resume = resume
+        self.stats = {
+            'records': 0,
+            'skipped': 0,
+            'duplicates': 0,
+            'upserted': 0,
+            'modified': 0,
+            'chunks': 0
+        }
+
+    def _source_signature(self):
+        stat = os.stat(self.path)
+        return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    def load_checkpoint(self):
+        """Return the saved position for this dump, or the start of the file"""
+        start = {'offset': 0, 'records': 0}
+        if not self.resume or not os.path.exists(self.checkpoint_path):
+            return start
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('source') != self._source_signature():
+            logger.info("Listing dump changed since last checkpoint; starting over")
+            return start
+        return checkpoint.get('position', start)
+
+    def save_checkpoint(self, position):
+        """Atomically record the position after the last written chunk"""
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'source': self._source_signature(), 'position': position, 'stats': self.stats}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _produce(self, chunks, start):
+        """Reader thread: build de-duplicated chunks and block while the queue is full"""
+        try:
+            chunk = {}
+            position = start
+            records = 0
+            for position, record in read_listings(self.path, start['offset'], start['records']):
+                records += 1
+                product = normalize_listing(record)
+                if product is None:
+                    self.stats['skipped'] += 1
+                    continue
+                key = url_hash(product.url)
+                if key in chunk:
+                    self.stats['duplicates'] += 1
+                chunk[key] = product
+                if len(chunk) >= self.chunk_size:
+                    chunks.put((list(chunk.values()), position, records))
+                    chunk = {}
+                    records = 0
+            if chunk or records:
+                chunks.put((list(chunk.values()), position, records))
+            chunks.put(_END)
+        except Exception as e:
+            chunks.put(e)
+
+    def run(self):
+        """Ingest the dump and return ingestion statistics"""
+        start = self.load_checkpoint()
+        if start['records']:
+            logger.info(f"Resuming {self.path} after {start['records']} records")
+
+        chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+        reader = threading.Thread(target=self._produce, args=(chunks, start), daemon=True)
+        started = time.perf_counter()
+        reader.start()
+
+        while True:
+            item = chunks.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            products, position, records = item
+            result = Product.bulk_upsert_by_url(products)
+            if result is not None:
+                self.stats['upserted'] += getattr(result, 'upserted_count', 0)
+                self.stats['modified'] += getattr(result, 'modified_count', 0)
+            self.stats['records'] += records
+            self.stats['chunks'] += 1
+            self.save_checkpoint(position)
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"Ingested {self.stats['records']} listings ({self.stats['records'] / elapsed:,.0f}/sec)")
+
+        reader.join()
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = round(elapsed, 2)
+        self.stats['records_per_sec'] = round(self.stats['records'] / elapsed, 1) if elapsed else None
+        return self.stats
+
+def ingest_listings(path, chunk_size=None, resume=True):
+    """Ingest a listing dump and return its statistics"""
+    return ListingIngestion(path, chunk_size=chunk_size, resume=resume).run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest an NDJSON or CSV listing dump into products")
+    parser.add_argument('path')
+    parser.add_argument('--chunk-size', type=int)
+    parser.add_argument('--no-resume', action='store_true', help="ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(ingest_listings(args.path, args.chunk_size, resume=not args.no_resume))
@@ -0,0 +1,247 @@
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+from src.models.product import Product
+from src.services.listing_ingestion import normalize_listing
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'listings')
+
+CURRENCY_SYMBOLS = {'$': 'USD', '£': 'GBP', '€': 'EUR', '¥': 'JPY', '₹': 'INR'}
+
+_NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_STORE_PATH = re.compile(r'/shop/([^/?#]+)')
+
+def _number(text):
+    match = _NUMBER.search(text or '')
+    return float(match.group(0).replace(',', '')) if match else None
+
+def _json_ld_nodes(data):
+    """Every object in a JSON-LD document, including those nested under @graph"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _json_ld_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        yield from _json_ld_nodes(data.get('@graph'))
+
+def _is_product(node):
+    types = node.get('@type')
+    return 'Product' in types if isinstance(types, list) else types == 'Product'
+
+def _json_ld_product(soup):
+    """Return the schema.org Product object embedded in the page, if any"""
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        for node in _json_ld_nodes(data):
+            if _is_product(node):
+                return node
+    return {}
+
+def _meta(soup, name):
+    tag = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+    return tag.get('content') if tag else None
+
+def _from_json_ld(product):
+    """Listing fields from a schema.org Product"""
+    offers = product.get('offers') or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    rating = product.get('aggregateRating') or {}
+    brand = product.get('brand') or {}
+
+    # image may be a URL, an ImageObject or a list of either
+    images = []
+    image_values = product.get('image') or []
+    if isinstance(image_values, (str, dict)):
+        image_values = [image_values]
+    for image in image_values:
+        if isinstance(image, dict):
+            image = image.get('contentURL') or image.get('contentUrl') or image.get('url')
+        if isinstance(image, str) and image:
+            images.append(image)
+
+    keywords = product.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+
+    return {
+        'url': product.get('url'),
+        'title': product.get('name'),
+        'description': product.get('description'),
+        'price': _number(str(offers.get('price') or offers.get('lowPrice') or '')),
+        'currency': offers.get('priceCurrency'),
+        'rating': _number(str(rating.get('ratingValue') or '')),
+        'reviews_count': _number(str(rating.get('reviewCount') or '')),
+        'store_name': brand.get('name') if isinstance(brand, dict) else brand,
+        'images': images,
+        'tags': [keyword.strip() for keyword in keywords if keyword.strip()]
+    }
+
+def _from_meta(soup):
+    """Listing fields from Open Graph and product meta tags"""
+    keywords = _meta(soup, 'keywords')
+    image = _meta(soup, 'og:image')
+    return {
+        'url': _meta(soup, 'og:url'),
+        'title': _meta(soup, 'og:title'),
+        'price': _number(_meta(soup, 'product:price:amount')),
+        'currency': _meta(soup, 'product:price:currency'),
+        'images': [image] if image else [],
+        'tags': [keyword.strip() for keyword in keywords.split(',') if keyword.strip()] if keywords else []
+    }
+
+def _from_dom(soup):
+    """Listing fields scraped from the listing page markup"""
+    fields = {}
+
+    canonical = soup.find('link', rel='canonical')
+    if canonical:
+        fields['url'] = canonical.get('href')
+
+    title = soup.find(attrs={'data-buy-box-listing-title': True})
+    if title:
+        fields['title'] = title.get_text(strip=True)
+
+    price = soup.select_one('[data-selector="price-only"] p')
+    if price:
+        for hidden in price.select('.wt-screen-reader-only'):
+            hidden.extract()
+        price_text = price.get_text(strip=True)
+        fields['price'] = _number(price_text)
+        symbol = next((s for s in CURRENCY_SYMBOLS if s in price_text), None)
+        if symbol:
+            fields['currency'] = CURRENCY_SYMBOLS[symbol]
+
+    rating = soup.find('input', attrs={'name': 'rating'})
+    if rating:
+        fields['rating'] = _number(rating.get('value'))
+    else:
+        stars = soup.find(string=re.compile(r'out of 5 stars'))
+        if stars:
+            fields['rating'] = _number(stars)
+
+    reviews = soup.find(string=re.compile(r'\d[\d,]*\s+reviews?'))
+    if reviews:
+        fields['reviews_count'] = _number(reviews)
+
+    shop_link = soup.find('a', href=_STORE_PATH)
+    if shop_link:
+        fields['store_name'] = _STORE_PATH.search(shop_link['href']).group(1)
+
+    description = soup.find(attrs={'data-product-details-description-text-content': True})
+    if description:
+        fields['description'] = description.get_text(' ', strip=True)
+
+    images = []
+    for image in soup.select('img.carousel-image'):
+        src = image.get('src') or image.get('data-src')
+        if src and src not in images:
+            images.append(src)
+    fields['images'] = images
+
+    fields['tags'] = [link.get_text(strip=True) for link in soup.select('a.wt-action-group__item')]
+    return fields
+
+def parse_listing_html(html, url=None):
+    """Extract Product fields from a saved Etsy listing page.
+
+    Structured data wins: JSON-LD first, then Open Graph/product meta tags,
+    then the page markup for anything still missing.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    fields = {'url': url}
+    for source in (_from_json_ld(_json_ld_product(soup)), _from_meta(soup), _from_dom(soup)):
+        for name, value in source.items():
+            if value not in (None, '', []) and fields.get(name) in (None, '', []):
+                fields[name] = value
+
+    if fields.get('reviews_count') is not None:
+        fields['reviews_count'] = int(fields['reviews_count'])
+    return fields
+
+def parse_listing_file(path):
+    """Parse a listing page from disk; runs inside pool workers"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return path, parse_listing_html(f.read())
+
+def _listing_files(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(('.html', '.htm'))
+    )
+
+def parse_directory(directory, workers=None, chunksize=8):
+    """Yield (path, fields) for every listing page in a directory, parsed across a process pool"""
+    paths = _listing_files(directory)
+    if not paths:
+        return
+    # Workers open the files themselves so only paths and small dicts cross processes
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, fields in pool.map(parse_listing_file, paths, chunksize=chunksize):
+            yield path, fields
+
+def ingest_directory(directory, workers=None, chunk_size=500):
+    """Parse a directory of listing pages and upsert the results as products"""
+    stats = {'pages': 0, 'skipped': 0, 'products': 0}
+    chunk = []
+    for path, fields in parse_directory(directory, workers):
+        stats['pages'] += 1
+        product = normalize_listing(fields)
+        if product is None:
+            logger.warning(f"Skipping {path}: no URL or title found")
+            stats['skipped'] += 1
+            continue
+        chunk.append(product)
+        if len(chunk) >= chunk_size:
+            Product.bulk_upsert_by_url(chunk)
+            stats['products'] += len(chunk)
+            chunk = []
+    if chunk:
+        Product.bulk_upsert_by_url(chunk)
+        stats['products'] += len(chunk)
+    return stats
+
+def benchmark(pages=3000, workers=None):
+    """Measure parse throughput on the fixture pages, serially and across a pool"""
+    fixtures = _listing_files(FIXTURES_DIR)
+    workers = workers or os.cpu_count() or 1
+    paths = [fixtures[i % len(fixtures)] for i in range(pages)]
+
+    serial_count = max(pages // workers, len(fixtures))
+    started = time.perf_counter()
+    for path in paths[:serial_count]:
+        parse_listing_file(path)
+    serial_rate = serial_count / (time.perf_counter() - started)
+    print(f"1 process: {serial_rate:,.0f} pages/sec")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(parse_listing_file, paths, chunksize=32):
+            pass
+    pool_rate = pages / (time.perf_counter() - started)
+    print(f"{workers} processes: {pool_rate:,.0f} pages/sec ({pool_rate / workers:,.0f} pages/sec per core)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse saved Etsy listing pages into products")
+    parser.add_argument('directory', nargs='?', help="directory of saved listing pages to ingest")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--benchmark', type=int, metavar='PAGES', help="benchmark on the fixture pages instead")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.benchmark:
+        benchmark(args.benchmark, args.workers)
+    elif args.directory:
+        print(ingest_directory(args.directory, args.workers))
+    else:
+        parser.print_help()
@@ -0,0 +1,207 @@
+import heapq
+import logging
+from pymongo import ReplaceOne
+from src.database import get_collection
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+RANKING_TRENDING = 'trending'
+RANKING_OPPORTUNITIES = 'opportunities'
+RANKINGS = (RANKING_TRENDING, RANKING_OPPORTUNITIES)
+
+# Category key for the cross-category ranking
+ALL_CATEGORIES = '_all'
+
+# Set once this process has materialized the rankings at least once
+_rankings_built = False
+
+_NICHE_PROJECTION = {
+    'name': 1,
+    'category': 1,
+    'trend_data.search_volume_trend': 1,
+    'demand_score': 1,
+    'competition_score': 1
+}
+
+def ranking_id(ranking, category=None):
+    """Document ID of a materialized ranking"""
+    return f"{ranking}:{category or ALL_CATEGORIES}"
+
+def calculate_growth_rate(search_volume_trend):
+    """Percentage change between the first and last point of a search volume trend"""
+    values = [v for v in (search_volume_trend or []) if isinstance(v, (int, float))]
+    if len(values) < 2 or not values[0]:
+        return 0.0
+    return round((values[-1] - values[0]) / values[0] * 100, 2)
+
+def calculate_opportunity_score(demand_score, competition_score):
+    """Opportunity on a 0-100 scale: high demand and low competition score highest"""
+    if demand_score is None or competition_score is None:
+        return None
+    return round((demand_score + (100 - competition_score)) / 2, 2)
+
+def _ranking_entries(niche_data):
+    """Build the per-ranking entries for a raw niche document"""
+    trend_data = niche_data.get('trend_data') or {}
+    growth_rate = calculate_growth_rate(trend_data.get('search_volume_trend'))
+    opportunity_score = calculate_opportunity_score(
+        niche_data.get('demand_score'), niche_data.get('competition_score')
+    )
+
+    base = {
+        'niche_id': str(niche_data['_id']),
+        'name': niche_data.get('name'),
+        'category': niche_data.get('category'),
+        'growth_rate': growth_rate,
+        'opportunity_score': opportunity_score,
+        'demand_score': niche_data.get('demand_score'),
+        'competition_score': niche_data.get('competition_score')
+    }
+
+    entries = {RANKING_TRENDING: dict(base, score=growth_rate)}
+    if opportunity_score is not None:
+        entries[RANKING_OPPORTUNITIES] = dict(base, score=opportunity_score)
+    return entries
+
+def _entry_categories(entry):
+    """Rankings an entry belongs to: the global one plus its own category"""
+    categories = [ALL_CATEGORIES]
+    if entry.get('category'):
+        categories.append(entry['category'])
+    return categories
+
+def _push_bounded(heap, entry, k):
+    """Keep the k highest-scoring entries in a min-heap"""
+    item = (entry['score'], entry['niche_id'], entry)
+    if len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, item)
+
+def _sorted_entries(heap):
+    return [item[2] for item in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+def rebuild_rankings(top_k=None):
+    """Recompute every materialized ranking with one pass over the niches collection"""
+    global _rankings_built
+    niches = get_collection(Config.COLLECTION_NICHES)
+    rankings = get_collection(Config.COLLECTION_NICHE_RANKINGS)
+    if niches is None or rankings is None:
+        return 0
+
+    k = top_k or Config.RANKINGS_TOP_K
+    heaps = {}
+    for niche_data in niches.find({}, _NICHE_PROJECTION):
+        for ranking, entry in _ranking_entries(niche_data).items():
+            for category in _entry_categories(entry):
+                _push_bounded(heaps.setdefault((ranking, category), []), entry, k)
+
+    operations = []
+    ranking_ids = []
+    for (ranking, category), heap in heaps.items():
+        entries = _sorted_entries(heap)
+        ranking_ids.append(ranking_id(ranking, category))
+        operations.append(ReplaceOne(
+            {'_id': ranking_ids[-1]},
+            {'ranking': ranking, 'category': category, 'entries': entries},
+            upsert=True
+        ))
+
+    if operations:
+        rankings.bulk_write(operations, ordered=False)
+    rankings.delete_many({'_id': {'$nin': ranking_ids}})
+
+    _rankings_built = True
+    logger.info(f"Rebuilt {len(operations)} niche rankings")
+    return len(operations)
+
+def _full_rankings_with(rankings, niche_id, k):
+    """IDs of the rankings holding k entries, one of them this niche"""
+    cursor = rankings.find({'entries.niche_id': niche_id}, {'entries.niche_id': 1})
+    return [doc['_id'] for doc in cursor if len(doc.get('entries') or []) >= k]
+
+def _refill_rankings(rankings, ranking_ids, niche_id, k):
+    """Recompute full rankings a niche left or fell to the bottom of.
+
+    Niches below slot k are not stored, so one of them may now outrank the
+    niche (or fill the slot it left). Those rankings are rebuilt from the
+    niches in their category.
+    """
+    niches = get_collection(Config.COLLECTION_NICHES)
+    if niches is None or not ranking_ids:
+        return
+    for doc in rankings.find({'_id': {'$in': ranking_ids}}):
+        entries = doc.get('entries') or []
+        if len(entries) >= k and entries[-1].get('niche_id') != niche_id:
+            continue
+        ranking, category = doc['ranking'], doc['category']
+        query = {} if category == ALL_CATEGORIES else {'category': category}
+        heap = []
+        for niche_data in niches.find(query, _NICHE_PROJECTION):
+            entry = _ranking_entries(niche_data).get(ranking)
+            if entry is not None:
+                _push_bounded(heap, entry, k)
+        rankings.replace_one(
+            {'_id': doc['_id']},
+            {'ranking': ranking, 'category': category, 'entries': _sorted_entries(heap)}
+        )
+
+def _pull_niche(rankings, niche_id):
+    rankings.update_many(
+        {'entries.niche_id': niche_id},
+        {'$pull': {'entries': {'niche_id': niche_id}}}
+    )
+
+def update_rankings_for_niche(niche_data, top_k=None):
+    """Refresh a single niche's position in the materialized rankings"""
+    rankings = get_collection(Config.COLLECTION_NICHE_RANKINGS)
+    if rankings is None:
+        return
+
+    k = top_k or Config.RANKINGS_TOP_K
+    niche_id = str(niche_data['_id'])
+    full = _full_rankings_with(rankings, niche_id, k)
+    _pull_niche(rankings, niche_id)
+
+    for ranking, entry in _ranking_entries(niche_data).items():
+        for category in _entry_categories(entry):
+            # $sort + $slice keeps each ranking bounded to the top k server-side
+            rankings.update_one(
+                {'_id': ranking_id(ranking, category)},
+                {
+                    '$push': {'entries': {'$each': [entry], '$sort': {'score': -1}, '$slice': k}},
+                    '$setOnInsert': {'ranking': ranking, 'category': category}
+                },
+                upsert=True
+            )
+
+    # A niche that left or sank to the bottom of a full ranking may have been overtaken
+    _refill_rankings(rankings, full, niche_id, k)
+
+def remove_niche_from_rankings(niche_id, top_k=None):
+    """Drop a niche from every ranking it appears in"""
+    rankings = get_collection(Config.COLLECTION_NICHE_RANKINGS)
+    if rankings is None:
+        return
+
+    k = top_k or Config.RANKINGS_TOP_K
+    niche_id = str(niche_id)
+    full = _full_rankings_with(rankings, niche_id, k)
+    _pull_niche(rankings, niche_id)
+    _refill_rankings(rankings, full, niche_id, k)
+
+def get_ranking(ranking, category=None, limit=10):
+    """Read a materialized ranking, building all rankings on first use"""
+    rankings = get_collection(Config.COLLECTION_NICHE_RANKINGS)
+    if rankings is None:
+        return []
+
+    doc = rankings.find_one({'_id': ranking_id(ranking, category)})
+    if doc is None and not _rankings_built and rankings.find_one({'_id': ranking_id(ranking)}) is None:
+        rebuild_rankings()
+        doc = rankings.find_one({'_id': ranking_id(ranking, category)})
+
+    if not doc:
+        return []
+    return doc.get('entries', [])[:limit]
@@ -0,0 +1,136 @@
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from flask import Response
+from src.models.timestamps import parse_datetime
+
+# Plain dicts; tz_aware=False keeps datetimes naive UTC like the models'
+_CODEC_OPTIONS = CodecOptions(document_class=dict, tz_aware=False)
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# One-shot encode() runs on the C encoder; default() only sees ObjectIds and datetimes.
+# ASCII escaping matches jsonify's output and is the encoder's faster string path.
+_encoder = json.JSONEncoder(default=_default, separators=(',', ':'))
+
+def or_default(default):
+    """The constructors' `value or default`: any falsy stored value becomes the default"""
+    return lambda value: value or default
+
+def timestamp_or_now(value):
+    """A stored timestamp the way the constructors keep it, current time when missing or invalid"""
+    return parse_datetime(value) or datetime.utcnow()
+
+def normalized_name(value):
+    """Names and niches as the constructors normalize them"""
+    return value.lower().strip() if value else value
+
+class DocumentShape:
+    """A stored document as the model's to_dict() would return it, minus the model object.
+
+    `fields` maps each to_dict() field to the default from_dict() passes for a
+    missing value; `conversions` maps a field to what the constructor then does
+    with it. Defaults are shared, so callers must not mutate them. ObjectIds and
+    datetimes are left for the encoder.
+    """
+
+    def __init__(self, fields, conversions=None):
+        self.fields = fields
+        self.conversions = list((conversions or {}).items())
+
+    def __call__(self, data):
+        document = {field: data.get(field, default) for field, default in self.fields.items()}
+        for field, convert in self.conversions:
+            document[field] = convert(document[field])
+        return document
+
+def find_documents(collection, shape, query=None, sort=None, skip=0, limit=0):
+    """Documents matching a query, read as raw BSON batches and shaped like to_dict()"""
+    projection = dict.fromkeys(shape.fields, 1)
+    find_raw_batches = getattr(collection, 'find_raw_batches', None)
+    if find_raw_batches is None:
+        # Mock collections only have find()
+        cursor = collection.find(query or {}, projection)
+        documents = cursor.sort(sort) if sort else cursor
+        documents = list(documents.skip(skip).limit(limit))
+    else:
+        cursor = find_raw_batches(query or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        documents = [
+            data for batch in cursor.skip(skip).limit(limit)
+            for data in bson.decode_all(batch, _CODEC_OPTIONS)
+        ]
+    return [shape(data) for data in documents]
+
+def encode(payload):
+    """JSON bytes for a payload holding shaped documents"""
+    return _encoder.encode(payload).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Response for a payload holding shaped documents; jsonify can't encode their ObjectIds"""
+    return Response(encode(payload), status=status, mimetype='application/json')
+
+def benchmark(documents=20000, rounds=5, seed=0):
+    """CPU time per 1,000 products: model objects and jsonify vs raw batches and the direct encoder"""
+    from flask import Flask, jsonify
+    from src.models.product import Product
+
+    rng = random.Random(seed)
+    words = ['handmade', 'ceramic', 'mug', 'vintage', 'gold', 'ring', 'boho', 'print', 'gift', 'linen']
+
+    def product():
+        now = datetime.utcnow()
+        return {
+            '_id': ObjectId(), 'title': ' '.join(rng.choices(words, k=6)), 'url': f"https://etsy.com/listing/{rng.randrange(10 ** 9)}",
+            'url_hash': '%040x' % rng.getrandbits(160), 'store_name': rng.choice(words).title() + 'Shop',
+            'price': round(rng.uniform(5, 200), 2), 'currency': 'USD', 'description': ' '.join(rng.choices(words, k=60)),
+            'images': [f"https://i.etsystatic.com/{rng.randrange(10 ** 8)}.jpg" for _ in range(5)],
+            'tags': rng.choices(words, k=8), 'category': 'home', 'sales_estimate': rng.randrange(5000),
+            'reviews_count': rng.randrange(2000), 'rating': round(rng.uniform(3, 5), 1), 'listing_date': now,
+            'niche': 'mugs', 'sentiment_analysis': {'label': 'positive', 'score': 0.8, 'reviews_analyzed': 40},
+            'created_at': now, 'updated_at': now
+        }
+
+    stored = [product() for _ in range(documents)]
+    # What the server sends: full documents for find(), projected ones for find_raw_batches()
+    full_batch = b''.join(bson.encode(data) for data in stored)
+    projected_batch = b''.join(bson.encode({field: data[field] for field in Product.JSON_SHAPE.fields if field in data}) for data in stored)
+
+    app = Flask(__name__)
+
+    def current():
+        with app.app_context():
+            products = [Product.from_dict(data) for data in bson.decode_all(full_batch, _CODEC_OPTIONS)]
+            return jsonify({'products': [product.to_dict() for product in products]}).get_data()
+
+    def fast():
+        documents = [Product.JSON_SHAPE(data) for data in bson.decode_all(projected_batch, _CODEC_OPTIONS)]
+        return json_response({'products': documents}).get_data()
+
+    assert json.loads(current()) == json.loads(fast())
+    for name, path in (('model objects + jsonify', current), ('raw batch + direct encoder', fast)):
+        timings = []
+        for _ in range(rounds):
+            started = time.process_time()
+            body = path()
+            timings.append(time.process_time() - started)
+        best = min(timings)
+        print(f"{name}: {best / documents * 1000 * 1e3:.2f}ms CPU per 1,000 documents, {len(body) / documents:.0f} B/document")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List serialization benchmark")
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    benchmark(args.documents, args.rounds)
@@ -0,0 +1,67 @@
+import argparse
+import logging
+import time
+from src.models.review import Review
+from src.models.review_stats import ReviewStats
+from src.services.sentiment import analyze_sentiment_batch, negative_terms, POLICIES
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+def score_reviews(reviews, policy=None):
+    """Score reviews, store their sentiment and fold them into the product and niche aggregates"""
+    if not reviews:
+        return []
+    sentiments = analyze_sentiment_batch([review.text for review in reviews], policy)
+    scored = []
+    for review, sentiment in zip(reviews, sentiments):
+        if 'error' in sentiment:
+            # Left unscored, so the next score_pending run retries it
+            continue
+        review.sentiment = sentiment
+        scored.append(review)
+
+    Review.set_sentiments(scored)
+    try:
+        ReviewStats.apply((review, negative_terms(review.text)) for review in scored)
+    except Exception as e:
+        logger.warning(f"Failed to update review stats: {str(e)}")
+    return scored
+
+def add_reviews(product_id, texts, niche=None, policy=None):
+    """Store a product's reviews and score only the ones not seen before"""
+    reviews = [Review(product_id, text, niche=niche) for text in texts if text and text.strip()]
+    return score_reviews(Review.add_many(reviews), policy)
+
+def score_pending(batch_size=None, policy=None):
+    """Score every stored review without a sentiment, one batch at a time"""
+    batch_size = batch_size or Config.SENTIMENT_BATCH_SIZE
+    started = time.perf_counter()
+    stats = {'reviews': 0, 'scored': 0, 'batches': 0}
+
+    batch = []
+    for review in Review.unscored(batch_size):
+        batch.append(review)
+        if len(batch) >= batch_size:
+            stats['scored'] += len(score_reviews(batch, policy))
+            stats['reviews'] += len(batch)
+            stats['batches'] += 1
+            batch = []
+    if batch:
+        stats['scored'] += len(score_reviews(batch, policy))
+        stats['reviews'] += len(batch)
+        stats['batches'] += 1
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 2)
+    stats['reviews_per_sec'] = round(stats['reviews'] / elapsed) if elapsed else 0
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score stored reviews that have no sentiment yet")
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--policy', choices=POLICIES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(score_pending(args.batch_size, args.policy))
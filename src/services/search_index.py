@@ -0,0 +1,543 @@
+import argparse
+import logging
+import math
+import random
+import re
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+import numpy as np
+from bson import ObjectId
+from src.database import get_collection
+from src.config import Config
+from src.services.invalidation_bus import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+KIND_NICHE = 'niche'
+KIND_PRODUCT = 'product'
+KINDS = (KIND_NICHE, KIND_PRODUCT)
+
+# Indexed fields per kind with their weights; a term's frequency counts once per weight unit
+FIELDS = {
+    KIND_NICHE: (('name', 3), ('category', 2), ('description', 1)),
+    KIND_PRODUCT: (('title', 3), ('tags', 2), ('description', 1))
+}
+COLLECTIONS = {KIND_NICHE: Config.COLLECTION_NICHES, KIND_PRODUCT: Config.COLLECTION_PRODUCTS}
+PROJECTIONS = {
+    KIND_NICHE: {'name': 1, 'category': 1, 'description': 1},
+    KIND_PRODUCT: {'title': 1, 'tags': 1, 'description': 1, 'niche': 1, 'category': 1, 'price': 1}
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+MAX_QUERY_TERMS = 16
+# New documents are frozen into a compressed segment past this many
+DELTA_LIMIT = 50000
+# Documents per segment during a full build
+BUILD_SEGMENT_SIZE = 500000
+# Segments are merged into one past this many
+MAX_SEGMENTS = 8
+
+_TOKEN = re.compile(r'[^\W_]+')
+STOPWORDS = frozenset('a an and are as at be by for from in is it of on or the to with'.split())
+
+def tokenize(text):
+    """Lower-cased word tokens without stopwords"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+def weighted_terms(kind, data):
+    """Weighted term frequencies and weighted length of a niche or product document"""
+    counts = {}
+    length = 0
+    for field, weight in FIELDS[kind]:
+        value = data.get(field)
+        if isinstance(value, list):
+            value = ' '.join(str(item) for item in value)
+        for token in tokenize(str(value or '')):
+            counts[token] = counts.get(token, 0) + weight
+            length += weight
+    return counts, length
+
+def encode_varints(values):
+    """Variable-byte encode non-negative integers, 7 bits per byte, low bits first"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b''
+    sizes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 5):
+        sizes += values >= np.uint64(1 << (7 * k))
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    out = np.empty(int(ends[-1]), dtype=np.uint8)
+    for k in range(5):
+        mask = sizes > k
+        if not mask.any():
+            break
+        low = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7f)
+        more = (sizes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = (low | more).astype(np.uint8)
+    return out.tobytes()
+
+def decode_varints(data):
+    """Inverse of encode_varints, vectorized"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) == len(raw):
+        return raw.astype(np.int64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)) * 7
+    return np.add.reduceat((raw & 0x7f).astype(np.int64) << shifts, starts)
+
+class _Segment:
+    """Immutable compressed postings for documents [start, end).
+
+    Each term maps to (delta-coded document numbers as varints, uint8 term
+    frequencies). Documents are looked up by ID through a sorted copy of
+    the segment's IDs.
+    """
+
+    def __init__(self, postings, start, end, ids):
+        self.postings = postings
+        self.start = start
+        self.end = end
+        order = np.argsort(ids[start:end], kind='stable')
+        self.sorted_ids = ids[start:end][order]
+        self.docnos = order + start
+
+    def lookup(self, key):
+        key = np.void(key)
+        i = int(np.searchsorted(self.sorted_ids, key))
+        while i < len(self.sorted_ids) and self.sorted_ids[i] == key:
+            yield int(self.docnos[i])
+            i += 1
+
+    def decode(self, term):
+        entry = self.postings.get(term)
+        if entry is None:
+            return None
+        docs, tfs = entry
+        return np.cumsum(decode_varints(docs)), np.frombuffer(tfs, dtype=np.uint8)
+
+    def nbytes(self):
+        return sum(len(docs) + len(tfs) for docs, tfs in self.postings.values())
+
+class _State:
+    """Document columns, frozen segments and the mutable delta of one index generation"""
+
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.live = 0
+        self.total_length = 0.0
+        self.kinds = np.zeros(capacity, dtype=np.uint8)
+        # Raw ObjectId bytes; a bytes dtype would strip trailing zero bytes
+        self.ids = np.zeros(capacity, dtype='V12')
+        self.niches = np.zeros(capacity, dtype=np.int32)
+        self.categories = np.zeros(capacity, dtype=np.int32)
+        self.prices = np.full(capacity, np.nan, dtype=np.float32)
+        self.lengths = np.zeros(capacity, dtype=np.float32)
+        self.deleted = np.zeros(capacity, dtype=bool)
+        self.labels = {None: 0}  # lower-cased niche or category -> code
+        self.segments = []
+        self.delta = {}  # term -> (array of document numbers, array of frequencies)
+        self.delta_start = 0
+        self.delta_docnos = {}  # id -> document number, for documents in the delta
+
+    def _grow(self, needed):
+        capacity = len(self.kinds)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in ('kinds', 'ids', 'niches', 'categories', 'prices', 'lengths', 'deleted'):
+            old = getattr(self, name)
+            new = np.full(capacity, np.nan, dtype=old.dtype) if name == 'prices' else np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _label(self, value):
+        if value is None:
+            return 0
+        return self.labels.setdefault(str(value).lower(), len(self.labels))
+
+    def find(self, key):
+        """Live document number of an ID, or None"""
+        docno = self.delta_docnos.get(key)
+        if docno is not None and not self.deleted[docno]:
+            return docno
+        for segment in reversed(self.segments):
+            for docno in segment.lookup(key):
+                if not self.deleted[docno]:
+                    return docno
+        return None
+
+    def remove(self, key):
+        docno = self.find(key)
+        if docno is None:
+            return False
+        self.deleted[docno] = True
+        self.live -= 1
+        self.total_length -= float(self.lengths[docno])
+        return True
+
+    def add(self, kind, data, replace=True):
+        """Index a document, replacing its previous version"""
+        key = ObjectId(str(data['_id'])).binary
+        if replace:
+            self.remove(key)
+        counts, length = weighted_terms(kind, data)
+        docno = self.count
+        self._grow(docno + 1)
+        self.count += 1
+        self.live += 1
+        self.total_length += length
+        self.kinds[docno] = KINDS.index(kind)
+        self.ids[docno] = key
+        self.niches[docno] = self._label(data.get('name') if kind == KIND_NICHE else data.get('niche'))
+        self.categories[docno] = self._label(data.get('category'))
+        price = data.get('price')
+        self.prices[docno] = price if isinstance(price, (int, float)) and not isinstance(price, bool) else np.nan
+        self.lengths[docno] = length
+        self.delta_docnos[key] = docno
+        for term, tf in counts.items():
+            entry = self.delta.get(term)
+            if entry is None:
+                entry = self.delta[term] = (array('i'), array('B'))
+            entry[0].append(docno)
+            entry[1].append(min(tf, 255))
+
+    def freeze(self):
+        """Compress the delta into a new segment"""
+        if self.count == self.delta_start:
+            return
+        postings = {}
+        for term, (docs, tfs) in self.delta.items():
+            docs = np.frombuffer(docs, dtype=np.int32).astype(np.int64)
+            live = ~self.deleted[docs]
+            if live.any():
+                docs = docs[live]
+                postings[term] = (encode_varints(np.diff(docs, prepend=0)), np.frombuffer(tfs, dtype=np.uint8)[live].tobytes())
+        self.segments = self.segments + [_Segment(postings, self.delta_start, self.count, self.ids)]
+        self.delta = {}
+        self.delta_docnos = {}
+        self.delta_start = self.count
+        if len(self.segments) > MAX_SEGMENTS:
+            self.merge()
+
+    def merge(self):
+        """Merge every segment into one, dropping deleted documents' postings"""
+        segments = self.segments
+        if len(segments) < 2:
+            return
+        postings = {}
+        for term in set().union(*(segment.postings for segment in segments)):
+            parts = [part for part in (segment.decode(term) for segment in segments) if part is not None]
+            docs = np.concatenate([docs for docs, _ in parts])
+            tfs = np.concatenate([tfs for _, tfs in parts])
+            live = ~self.deleted[docs]
+            if live.any():
+                docs = docs[live]
+                postings[term] = (encode_varints(np.diff(docs, prepend=0)), tfs[live].tobytes())
+        self.segments = [_Segment(postings, segments[0].start, segments[-1].end, self.ids)]
+
+    def postings(self, term):
+        """(document numbers, frequencies) of a term across segments and the delta"""
+        parts = [part for part in (segment.decode(term) for segment in self.segments) if part is not None]
+        entry = self.delta.get(term)
+        if entry is not None:
+            parts.append((np.array(entry[0], dtype=np.int64), np.array(entry[1], dtype=np.uint8)))
+        if not parts:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([docs for docs, _ in parts]), np.concatenate([tfs for _, tfs in parts])
+
+    def nbytes(self):
+        columns = sum(getattr(self, name)[:self.count].nbytes
+                      for name in ('kinds', 'ids', 'niches', 'categories', 'prices', 'lengths', 'deleted'))
+        return sum(segment.nbytes() for segment in self.segments), columns
+
+class SearchIndex:
+    """BM25 full-text search over niches and products.
+
+    Term frequencies are weighted per field (name and title count most), and
+    postings are delta-coded variable-byte document numbers plus one byte
+    of frequency per posting. New and changed documents go to an
+    uncompressed delta that is frozen into a compressed segment once it
+    holds DELTA_LIMIT documents; segments merge past MAX_SEGMENTS. A changed
+    document is re-added and its old version masked, and dropped from the
+    postings at the next merge.
+    Model writes update this process's index directly and other workers
+    catch up through the invalidation bus.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._state = _State()
+        self._synced_at = None
+
+    def load(self, documents):
+        """Replace the index contents with (kind, document) pairs"""
+        state = _State()
+        for kind, data in documents:
+            # Stored IDs are unique, so there is no previous version to look up
+            state.add(kind, data, replace=False)
+            if state.count - state.delta_start >= BUILD_SEGMENT_SIZE:
+                state.freeze()
+        state.freeze()
+        state.merge()
+        with self._lock:
+            self._state = state
+            self._built = True
+        return state.live
+
+    def build(self):
+        """Rebuild the index from the niches and products collections"""
+        collections = {kind: get_collection(name) for kind, name in COLLECTIONS.items()}
+        if any(collection is None for collection in collections.values()):
+            return 0
+
+        started = time.perf_counter()
+        synced_at = datetime.utcnow() - timedelta(seconds=Config.SYNC_SETTLE_SECONDS)
+        size = self.load(
+            (kind, data) for kind, collection in collections.items()
+            for data in collection.find({}, PROJECTIONS[kind]).batch_size(Config.INGEST_CHUNK_SIZE)
+        )
+        self._synced_at = synced_at
+        logger.info(f"Search index built with {size} documents in {time.perf_counter() - started:.2f}s")
+        # Writes made while the build was reading
+        self.catch_up()
+        return size
+
+    def ensure_built(self):
+        """Build the index on first use"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def index_documents(self, kind, documents):
+        """Add or replace stored niche or product documents"""
+        if not self._built:
+            # The first build reads them from the database
+            return
+        with self._lock:
+            state = self._state
+            for data in documents:
+                if data and ObjectId.is_valid(str(data.get('_id'))):
+                    state.add(kind, data)
+            if state.count - state.delta_start >= DELTA_LIMIT:
+                state.freeze()
+
+    def remove(self, ids):
+        """Drop deleted documents"""
+        if not self._built:
+            return
+        with self._lock:
+            for document_id in ids:
+                if ObjectId.is_valid(str(document_id)):
+                    self._state.remove(ObjectId(str(document_id)).binary)
+
+    def catch_up(self):
+        """Index documents changed and deleted since the last build or catch-up"""
+        if not self._built or self._synced_at is None:
+            return 0
+        synced_at = datetime.utcnow() - timedelta(seconds=Config.SYNC_SETTLE_SECONDS)
+        tombstones = get_collection(Config.COLLECTION_TOMBSTONES)
+        changed = 0
+        for kind, name in COLLECTIONS.items():
+            collection = get_collection(name)
+            if collection is None:
+                continue
+            documents = list(collection.find({'updated_at': {'$gte': self._synced_at}}, PROJECTIONS[kind]))
+            self.index_documents(kind, documents)
+            changed += len(documents)
+            if tombstones is not None:
+                deleted = [data['key'] for data in tombstones.find(
+                    {'collection': name, 'deleted_at': {'$gte': self._synced_at}}, {'key': 1}
+                )]
+                self.remove(deleted)
+                changed += len(deleted)
+        self._synced_at = synced_at
+        return changed
+
+    def _refresher(self, kind):
+        """Invalidation handler applying another worker's writes of one kind"""
+        def refresh(keys):
+            if not self._built:
+                return
+            if keys is None:
+                self.catch_up()
+                return
+            collection = get_collection(COLLECTIONS[kind])
+            if collection is None:
+                return
+            ids = [ObjectId(key) for key in keys if ObjectId.is_valid(key)]
+            documents = list(collection.find({'_id': {'$in': ids}}, PROJECTIONS[kind]))
+            self.index_documents(kind, documents)
+            found = {str(data['_id']) for data in documents}
+            self.remove([str(document_id) for document_id in ids if str(document_id) not in found])
+        return refresh
+
+    def search(self, query, kinds=None, niche=None, category=None, min_price=None, max_price=None, limit=20, offset=0):
+        """Documents ranked by BM25 against the query, with optional filters.
+
+        Returns {'total': matching documents, 'hits': [{'type', 'id', 'score'}]}.
+        """
+        self.ensure_built()
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        with self._lock:
+            state = self._state
+            count, live, total_length = state.count, state.live, state.total_length
+            postings = [state.postings(term) for term in terms]
+        postings = [part for part in postings if part is not None]
+        if not postings or not live:
+            return {'total': 0, 'hits': []}
+
+        average_length = total_length / live or 1.0
+        lengths = state.lengths
+        scored = []
+        for docs, tfs in postings:
+            # Masked old versions don't count towards document frequency
+            current = ~state.deleted[docs]
+            docs, tfs = docs[current], tfs[current]
+            if not len(docs):
+                continue
+            idf = math.log(1 + (live - len(docs) + 0.5) / (len(docs) + 0.5))
+            tfs = tfs.astype(np.float32)
+            norm = K1 * (1 - B + B * lengths[docs] / average_length)
+            scored.append((docs, idf * tfs * (K1 + 1) / (tfs + norm)))
+        if not scored:
+            return {'total': 0, 'hits': []}
+        docs, scores = self._combine(scored, count)
+
+        mask = np.ones(len(docs), dtype=bool)
+        if kinds:
+            mask &= np.isin(state.kinds[docs], [KINDS.index(kind) for kind in kinds])
+        for column, value in ((state.niches, niche), (state.categories, category)):
+            if value:
+                mask &= column[docs] == state.labels.get(value.lower(), -1)
+        if min_price is not None:
+            mask &= state.prices[docs] >= min_price
+        if max_price is not None:
+            mask &= state.prices[docs] <= max_price
+        docs, scores = docs[mask], scores[mask]
+
+        wanted = offset + limit
+        if len(docs) > wanted:
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(len(docs))
+        top = top[np.argsort(-scores[top], kind='stable')][offset:]
+        return {
+            'total': int(len(docs)),
+            'hits': [
+                {'type': KINDS[state.kinds[docs[i]]], 'id': bytes(state.ids[docs[i]]).hex(), 'score': round(float(scores[i]), 4)}
+                for i in top
+            ]
+        }
+
+    @staticmethod
+    def _combine(scored, count):
+        """Sum per-term scores by document; a term lists each document once"""
+        if len(scored) == 1:
+            return scored[0]
+        total = sum(len(docs) for docs, _ in scored)
+        if total > count // 32:
+            # Dense accumulator for common terms
+            accumulator = np.zeros(count, dtype=np.float32)
+            for docs, scores in scored:
+                accumulator[docs] += scores
+            docs = np.flatnonzero(accumulator)
+            return docs, accumulator[docs]
+        docs, inverse = np.unique(np.concatenate([docs for docs, _ in scored]), return_inverse=True)
+        return docs, np.bincount(inverse, weights=np.concatenate([scores for _, scores in scored])).astype(np.float32)
+
+    def stats(self):
+        state = self._state
+        postings, columns = state.nbytes()
+        return {
+            'documents': state.live,
+            'segments': len(state.segments),
+            'delta_documents': state.count - state.delta_start,
+            'postings_bytes': postings,
+            'column_bytes': columns
+        }
+
+    def __len__(self):
+        return self._state.live
+
+# Global search index
+search_index = SearchIndex()
+for _kind in KINDS:
+    invalidation_bus.subscribe(COLLECTIONS[_kind], search_index._refresher(_kind), local=False)
+
+def benchmark(n_products=5000000, queries=2000, seed=0):
+    """Measure build time, memory and query latency on synthetic products"""
+    rng = random.Random(seed)
+    styles = ['custom', 'handmade', 'vintage', 'personalized', 'minimalist', 'boho', 'rustic', 'modern',
+              'retro', 'floral', 'geometric', 'botanical', 'celestial', 'farmhouse', 'coastal', 'gothic']
+    materials = ['wooden', 'ceramic', 'leather', 'gold', 'silver', 'linen', 'crochet', 'macrame', 'glass',
+                 'brass', 'cotton', 'wool', 'resin', 'copper', 'clay', 'bamboo']
+    items = ['mug', 'necklace', 'ring', 'print', 'poster', 'earrings', 'bag', 'candle', 'planter', 'blanket',
+             'sign', 'journal', 'sticker', 'shirt', 'tote', 'bracelet', 'vase', 'coaster', 'lamp', 'pillow']
+    extras = ['gift', 'wedding', 'birthday', 'anniversary', 'christmas', 'nursery', 'kitchen', 'office',
+              'mom', 'dad', 'teacher', 'bridesmaid', 'pet', 'travel', 'garden', 'bohemian']
+    # Long-tail vocabulary, so rare terms exist alongside very common ones
+    rare = [f"{rng.choice(styles)[:3]}{rng.choice(items)[:3]}{i}" for i in range(50000)]
+
+    def product(i):
+        item = rng.choice(items)
+        words = [rng.choice(styles), rng.choice(materials), item, rng.choice(extras)]
+        return {
+            '_id': ObjectId(),
+            'title': ' '.join(words + [rng.choice(rare)]),
+            'tags': [rng.choice(styles), rng.choice(extras), item],
+            'description': ' '.join(rng.choice(styles + materials + extras + items) for _ in range(12)),
+            'niche': item,
+            'category': rng.choice(['home', 'jewelry', 'art', 'clothing']),
+            'price': round(rng.uniform(5, 200), 2)
+        }
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.load((KIND_PRODUCT, product(i)) for i in range(n_products))
+    build_seconds = time.perf_counter() - started
+    stats = index.stats()
+    state = index._state
+    postings_count = sum(len(tfs) for segment in state.segments for _, tfs in segment.postings.values())
+    print(f"Built {len(index):,} products in {build_seconds:.1f}s: {postings_count:,} postings in "
+          f"{stats['postings_bytes'] / 1e6:.1f} MB ({stats['postings_bytes'] / max(postings_count, 1):.2f} B/posting, "
+          f"uncompressed int32+float32 {postings_count * 8 / 1e6:.1f} MB), columns {stats['column_bytes'] / 1e6:.1f} MB")
+
+    vocabulary = styles + materials + items + extras
+    cases = {
+        'one common term': lambda: rng.choice(items),
+        'two terms': lambda: f"{rng.choice(styles)} {rng.choice(items)}",
+        'three terms': lambda: f"{rng.choice(materials)} {rng.choice(items)} {rng.choice(extras)}",
+        'rare term': lambda: rng.choice(rare),
+        'two terms, filtered': lambda: f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}"
+    }
+    for name, make_query in cases.items():
+        filters = {'category': 'home', 'max_price': 50} if 'filtered' in name else {}
+        timings = []
+        for _ in range(queries):
+            query = make_query()
+            t = time.perf_counter()
+            index.search(query, limit=20, **filters)
+            timings.append(time.perf_counter() - t)
+        timings.sort()
+        print(f"{name}: p50 {timings[len(timings) // 2] * 1e3:.1f}ms, p99 {timings[int(len(timings) * 0.99)] * 1e3:.1f}ms")
+
+    started = time.perf_counter()
+    index.index_documents(KIND_PRODUCT, [product(i) for i in range(10000)])
+    print(f"10,000 incremental adds: {(time.perf_counter() - started) * 1e3:.0f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search index benchmark")
+    parser.add_argument('--products', type=int, default=5000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    benchmark(args.products, args.queries)
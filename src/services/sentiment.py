@@ -0,0 +1,236 @@
+import argparse
+import math
+import random
+import re
+import time
+import logging
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+POLICY_LOCAL = 'local'
+POLICY_AZURE = 'azure'
+POLICY_LOCAL_FIRST = 'local_first'
+POLICIES = (POLICY_LOCAL, POLICY_AZURE, POLICY_LOCAL_FIRST)
+
+# Word valences on a -4..4 scale, tuned for product reviews
+LEXICON = {
+    # positive
+    'amazing': 3.1, 'awesome': 3.1, 'beautiful': 2.9, 'beautifully': 2.7, 'best': 3.2, 'brilliant': 2.8,
+    'charming': 2.2, 'cheerful': 2.2, 'comfortable': 2.0, 'comfy': 1.9, 'cute': 2.0, 'delighted': 2.9,
+    'delightful': 2.8, 'durable': 1.8, 'elegant': 2.1, 'excellent': 3.2, 'exceptional': 3.0,
+    'exquisite': 3.0, 'fabulous': 3.0, 'fantastic': 3.2, 'fast': 1.3, 'favorite': 2.4, 'favourite': 2.4,
+    'fine': 0.8, 'flawless': 2.9, 'friendly': 2.1, 'generous': 2.2, 'glad': 2.0, 'good': 1.9,
+    'gorgeous': 3.0, 'great': 3.1, 'happy': 2.7, 'helpful': 1.9, 'impressed': 2.4, 'incredible': 3.0,
+    'love': 3.2, 'loved': 2.9, 'lovely': 2.8, 'loves': 2.7, 'nice': 1.8, 'perfect': 3.1,
+    'perfectly': 2.7, 'pleased': 2.3, 'pretty': 1.7, 'prompt': 1.4, 'quality': 1.0, 'quick': 1.2,
+    'quickly': 1.0, 'recommend': 2.0, 'recommended': 1.9, 'reliable': 1.8, 'satisfied': 2.0,
+    'soft': 1.1, 'solid': 1.4, 'stunning': 3.0, 'sturdy': 1.8, 'super': 2.3, 'superb': 3.1,
+    'thank': 1.5, 'thanks': 1.5, 'thoughtful': 2.0, 'unique': 1.5, 'well': 1.1, 'wonderful': 3.1,
+    'worth': 1.6, 'wow': 2.8,
+    # negative
+    'annoyed': -2.1, 'annoying': -2.2, 'awful': -3.1, 'bad': -2.5, 'broke': -2.3, 'broken': -2.5,
+    'cheap': -1.6, 'cheaply': -1.8, 'chipped': -2.0, 'cracked': -2.2, 'damaged': -2.4, 'defective': -2.7,
+    'delay': -1.4, 'delayed': -1.6, 'disappointed': -2.4, 'disappointing': -2.5, 'disappointment': -2.5,
+    'dislike': -2.0, 'dull': -1.5, 'faded': -1.5, 'fake': -2.3, 'fell': -0.8, 'flimsy': -2.1,
+    'fragile': -1.1, 'garbage': -3.0, 'hate': -3.0, 'hated': -2.9, 'horrible': -3.1, 'junk': -2.8,
+    'late': -1.4, 'leaked': -2.0, 'leaks': -2.0, 'lost': -1.6, 'mediocre': -1.5, 'mess': -2.0,
+    'misleading': -2.4, 'missing': -1.8, 'overpriced': -2.1, 'poor': -2.4, 'poorly': -2.3,
+    'problem': -1.7, 'refund': -1.5, 'return': -0.8, 'returned': -1.4, 'rude': -2.5, 'scratched': -2.0,
+    'slow': -1.5, 'smaller': -0.6, 'sticky': -0.9, 'terrible': -3.1, 'ugly': -2.6, 'unhappy': -2.4,
+    'unusable': -2.8, 'useless': -2.7, 'waste': -2.6, 'worse': -2.5, 'worst': -3.1, 'wrong': -2.1,
+}
+
+# Words that flip the valence of a sentiment word within the next three words
+NEGATIONS = {
+    'not', 'no', 'never', 'none', 'nothing', 'neither', 'nor', 'nobody', 'without', 'hardly',
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "won't", "wouldn't",
+    "can't", "cannot", "couldn't", "shouldn't", "hasn't", "haven't", "hadn't", 'dont', 'doesnt',
+    'didnt', 'isnt', 'wasnt', 'wont', 'cant', 'couldnt'
+}
+NEGATION_SCALAR = -0.74
+
+# Intensifiers (positive) and diminishers (negative), applied away from zero
+BOOSTERS = {
+    'absolutely': 0.29, 'completely': 0.29, 'extremely': 0.29, 'highly': 0.29, 'incredibly': 0.29,
+    'really': 0.29, 'so': 0.29, 'super': 0.29, 'totally': 0.29, 'truly': 0.29, 'very': 0.29,
+    'especially': 0.29, 'exceptionally': 0.29, 'most': 0.29, 'too': 0.29, 'pretty': 0.29,
+    'barely': -0.29, 'slightly': -0.29, 'somewhat': -0.29, 'kinda': -0.29, 'little': -0.29,
+    'marginally': -0.29, 'partly': -0.29, 'fairly': -0.29
+}
+# A booster's effect fades with its distance from the sentiment word
+BOOSTER_DECAY = (1.0, 0.95, 0.9)
+
+# Clauses after a contrast word carry more weight than those before it
+CONTRASTS = {'but', 'however', 'although', 'though'}
+CAPS_BOOST = 0.73
+EXCLAMATION_BOOST = 0.29
+MAX_EXCLAMATIONS = 4
+# Normalizes the summed valence into a (-1, 1) compound score
+COMPOUND_ALPHA = 15
+
+# Words, plus the punctuation that ends a negation or booster's reach
+_TOKEN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?|[.,;:!?]")
+
+def _compound(total):
+    return total / math.sqrt(total * total + COMPOUND_ALPHA)
+
+def _valences(tokens):
+    """(term, valence) of each sentiment word after booster, negation, caps and contrast rules"""
+    words = [token.lower() for token in tokens]
+    alpha = [token for token in tokens if token[0].isalpha()]
+    shouting = any(token.isupper() and len(token) > 1 for token in alpha) and \
+        not all(token.isupper() for token in alpha)
+
+    valences = []
+    contrast_at = None
+    for i, word in enumerate(words):
+        if word in CONTRASTS:
+            contrast_at = i
+        valence = LEXICON.get(word)
+        if valence is None:
+            continue
+        # "super" and "pretty" are boosters before another sentiment word
+        if word in BOOSTERS and i + 1 < len(words) and words[i + 1] in LEXICON:
+            continue
+
+        term = word
+        if shouting and tokens[i].isupper():
+            valence += CAPS_BOOST if valence > 0 else -CAPS_BOOST
+        for distance in range(1, 4):
+            j = i - distance
+            if j < 0:
+                break
+            previous = words[j]
+            if previous in CONTRASTS or not previous[0].isalpha():
+                break
+            if previous in BOOSTERS:
+                scalar = BOOSTERS[previous] * BOOSTER_DECAY[distance - 1]
+                valence += scalar if valence > 0 else -scalar
+            elif previous in NEGATIONS:
+                valence *= NEGATION_SCALAR
+                term = f"not {word}"
+        valences.append((i, term, valence))
+
+    if contrast_at is not None:
+        valences = [(i, term, valence * (0.5 if i < contrast_at else 1.5)) for i, term, valence in valences]
+    return [(term, valence) for _, term, valence in valences]
+
+def _score(text):
+    """Local sentiment result plus a confidence in [0, 1]"""
+    tokens = _TOKEN.findall(text or '')
+    valences = [valence for _, valence in _valences(tokens)]
+    if not valences:
+        return {'sentiment': 'neutral', 'positive_score': 0.0, 'neutral_score': 1.0, 'negative_score': 0.0}, 0.0
+
+    total = sum(valences)
+    exclamations = min((text or '').count('!'), MAX_EXCLAMATIONS)
+    if total:
+        total += math.copysign(exclamations * EXCLAMATION_BOOST, total)
+    compound = _compound(total)
+
+    positive = sum(valence for valence in valences if valence > 0)
+    negative = -sum(valence for valence in valences if valence < 0)
+    strength = abs(compound)
+    # Polar share of the evidence, scaled by how decisive the text is overall
+    positive_score = strength * positive / (positive + negative)
+    negative_score = strength * negative / (positive + negative)
+
+    if positive_score >= 0.25 and negative_score >= 0.25:
+        label = 'mixed'
+    elif compound >= 0.05:
+        label = 'positive'
+    elif compound <= -0.05:
+        label = 'negative'
+    else:
+        label = 'neutral'
+
+    result = {
+        'sentiment': label,
+        'positive_score': round(positive_score, 2),
+        'neutral_score': round(1 - strength, 2),
+        'negative_score': round(negative_score, 2)
+    }
+    return result, strength
+
+def score_text(text):
+    """Score one text with the local lexicon engine; same shape as Azure's analyze_sentiment"""
+    return _score(text)[0]
+
+def score_batch(texts):
+    """Score many texts with the local lexicon engine"""
+    return [_score(text)[0] for text in texts]
+
+def negative_terms(text):
+    """Sentiment terms that pull a text negative, e.g. 'flimsy' or 'not worth'"""
+    return [term for term, valence in _valences(_TOKEN.findall(text or '')) if valence < 0]
+
+def _azure_batch(texts):
+    # Imported lazily so the local engine works without the Azure SDK or network
+    from src.services.azure_cognitive_services import analyze_sentiment_batch
+    return analyze_sentiment_batch(texts)
+
+def analyze_sentiment_batch(texts, policy=None, min_confidence=None):
+    """Score texts under the configured policy.
+
+    `local` and `azure` use a single engine. `local_first` scores everything
+    locally and sends only texts below `min_confidence` to Azure, keeping the
+    local result wherever Azure fails.
+    """
+    policy = policy or Config.SENTIMENT_POLICY
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown sentiment policy: {policy}")
+    texts = list(texts)
+    if policy == POLICY_AZURE:
+        return _azure_batch(texts)
+
+    scored = [_score(text) for text in texts]
+    results = [result for result, _ in scored]
+    if policy == POLICY_LOCAL:
+        return results
+
+    min_confidence = Config.SENTIMENT_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    uncertain = [i for i, (_, confidence) in enumerate(scored) if confidence < min_confidence]
+    if uncertain:
+        try:
+            azure_results = _azure_batch([texts[i] for i in uncertain])
+        except Exception as e:
+            logger.warning(f"Azure sentiment unavailable, keeping local scores: {str(e)}")
+            azure_results = []
+        for i, azure_result in zip(uncertain, azure_results):
+            if 'error' not in azure_result:
+                results[i] = azure_result
+    return results
+
+def analyze_sentiment(text, policy=None):
+    """Score one text under the configured policy"""
+    return analyze_sentiment_batch([text], policy)[0]
+
+def benchmark(reviews=50000, seed=0):
+    """Measure local scoring throughput on synthetic reviews"""
+    rng = random.Random(seed)
+    openers = ['I', 'We', 'My daughter', 'Honestly I']
+    verbs = ['love', 'really like', "don't love", 'hate', 'am not happy with', 'am so pleased with']
+    subjects = ['this mug', 'the necklace', 'the print', 'my order', 'the packaging']
+    details = ['it arrived quickly', 'the quality is excellent', 'it broke after a week',
+               'shipping was slow', 'the colors are stunning', 'it is smaller than expected',
+               'the seller was very helpful', 'it looks cheap']
+    texts = [
+        f"{rng.choice(openers)} {rng.choice(verbs)} {rng.choice(subjects)}, "
+        f"{rng.choice(details)} but {rng.choice(details)}{'!' * rng.randint(0, 2)}"
+        for _ in range(reviews)
+    ]
+
+    started = time.perf_counter()
+    results = score_batch(texts)
+    elapsed = time.perf_counter() - started
+    labels = {}
+    for result in results:
+        labels[result['sentiment']] = labels.get(result['sentiment'], 0) + 1
+    print(f"{reviews:,} reviews in {elapsed:.2f}s ({reviews / elapsed:,.0f} reviews/sec), labels: {labels}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local sentiment engine benchmark")
+    parser.add_argument('--reviews', type=int, default=50000)
+    args = parser.parse_args()
+    benchmark(args.reviews)
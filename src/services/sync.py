@@ -0,0 +1,249 @@
+import argparse
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from src.database import get_collection
+from src.config import Config
+from src.models.niche import Niche
+from src.models.niche_stats import NicheStats
+from src.models.niche_top_products import NicheTopProducts
+from src.models.product import Product, url_hash
+from src.models.keyword import Keyword
+from src.models.tombstone import Tombstone
+from src.models.timestamps import parse_datetime
+from src.services.raw_json import find_documents
+
+logger = logging.getLogger(__name__)
+
+# Collections clients can sync: stored collection, change timestamp field, model
+SYNC_COLLECTIONS = {
+    'niches': (Config.COLLECTION_NICHES, 'updated_at', Niche),
+    'products': (Config.COLLECTION_PRODUCTS, 'updated_at', Product),
+    'keywords': (Config.COLLECTION_KEYWORDS, 'last_updated', Keyword)
+}
+
+# Timestamp fields that older documents hold as ISO strings
+TIMESTAMP_FIELDS = {
+    Config.COLLECTION_USERS: ('created_at', 'updated_at'),
+    Config.COLLECTION_NICHES: ('created_at', 'updated_at'),
+    Config.COLLECTION_PRODUCTS: ('created_at', 'updated_at', 'listing_date'),
+    Config.COLLECTION_KEYWORDS: ('created_at', 'last_updated'),
+    Config.COLLECTION_REVIEWS: ('created_at',)
+}
+
+class SyncExpired(Exception):
+    """The client's last sync is older than the deletions we still remember"""
+
+def _after_cursor(field, key, since, after, until):
+    """Filter for entries after (since, after) in (timestamp, key) order and before `until`"""
+    window = {'$lt': until}
+    if since is None:
+        return {field: window}
+    if after is None:
+        return {field: dict(window, **{'$gte': since})}
+    return {'$or': [
+        {field: dict(window, **{'$gt': since})},
+        {field: since, key: {'$gt': after}}
+    ]}
+
+def _key(value):
+    return ObjectId(value) if isinstance(value, str) and ObjectId.is_valid(value) else value
+
+def changes_since(name, since=None, after=None, limit=None):
+    """One page of documents changed and deleted since a sync cursor, shaped like to_dict().
+
+    Changes are ordered by (timestamp, _id), so `next` resumes exactly where
+    this page stopped even when many documents share a timestamp. Writes
+    from the last SYNC_SETTLE_SECONDS are left for a later page, so a write
+    that commits after this read cannot land behind the cursor.
+    """
+    collection_name, field, model = SYNC_COLLECTIONS[name]
+    collection = get_collection(collection_name)
+    tombstones = get_collection(Config.COLLECTION_TOMBSTONES)
+    limit = limit or Config.SYNC_PAGE_SIZE
+    now = datetime.utcnow()
+    until = now - timedelta(seconds=Config.SYNC_SETTLE_SECONDS)
+    after = _key(after) if since is not None else None
+    # Mid-pass cursors carry a document timestamp, not when the client caught up
+    if since is not None and after is None and since < now - timedelta(days=Config.TOMBSTONE_RETENTION_DAYS):
+        raise SyncExpired(f"Deletions are kept for {Config.TOMBSTONE_RETENTION_DAYS} days; sync again without since")
+
+    entries = []
+    if collection is not None:
+        # Pages can be large, so documents are read as raw batches and shaped for JSON directly
+        for data in find_documents(collection, model.JSON_SHAPE, _after_cursor(field, '_id', since, after, until),
+                                   [(field, ASCENDING), ('_id', ASCENDING)], limit=limit + 1):
+            entries.append((data[field], str(data['_id']), data['_id'], data))
+    if tombstones is not None and since is not None:
+        query = dict(_after_cursor('deleted_at', 'key', since, after, until), collection=collection_name)
+        cursor = tombstones.find(query)
+        for data in cursor.sort([('deleted_at', ASCENDING), ('key', ASCENDING)]).limit(limit + 1):
+            entries.append((data['deleted_at'], str(data['key']), data['key'], None))
+
+    entries.sort(key=lambda entry: entry[:2])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if has_more:
+        next_cursor = {'since': entries[-1][0].isoformat(), 'after': entries[-1][1]}
+    else:
+        # Everything before `until` has been returned
+        next_cursor = {'since': max(until, since or until).isoformat(), 'after': None}
+    documents = [data for _, _, _, data in entries if data is not None]
+    return {
+        'collection': name,
+        'documents': Niche.with_stats_json(documents) if model is Niche else documents,
+        'deleted': [str(key) for _, _, key, data in entries if data is None],
+        'has_more': has_more,
+        'next': next_cursor
+    }
+
+def migrate_timestamps(batch_size=None):
+    """Rewrite timestamps stored as ISO strings as native datetimes"""
+    batch_size = batch_size or Config.REFRESH_BATCH_SIZE
+    report = {}
+    for collection_name, fields in TIMESTAMP_FIELDS.items():
+        collection = get_collection(collection_name)
+        if collection is None:
+            continue
+        migrated = 0
+        for field in fields:
+            operations = []
+            for data in collection.find({field: {'$type': 'string'}}, {field: 1}):
+                operations.append(UpdateOne({'_id': data['_id']}, {'$set': {field: parse_datetime(data[field])}}))
+                if len(operations) >= batch_size:
+                    collection.bulk_write(operations, ordered=False)
+                    migrated += len(operations)
+                    operations = []
+            if operations:
+                collection.bulk_write(operations, ordered=False)
+                migrated += len(operations)
+        report[collection_name] = migrated
+    logger.info(f"Migrated timestamps: {report}")
+    return report
+
+def _unnormalized(field):
+    """Filter for names with upper-case letters or surrounding whitespace, as stored before names were normalized"""
+    return {field: {'$regex': r'[A-Z]|^\s|\s$'}}
+
+def _normalize_field(collection, field, batch_size):
+    """Lower-case and strip a name field in place; returns how many documents changed"""
+    migrated = 0
+    operations = []
+    for data in collection.find(_unnormalized(field), {field: 1}):
+        operations.append(UpdateOne({'_id': data['_id']}, {'$set': {field: data[field].lower().strip()}}))
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+    return migrated
+
+def migrate_names(batch_size=None):
+    """Normalize niche names and the niche fields that reference them, merging niches that now collide.
+
+    Lookups match the lower-cased, stripped name exactly, so documents stored
+    before names were normalized are rewritten. Of niches whose names only
+    differ by case or whitespace, the most recently updated one is kept and
+    the rest are deleted. Running stats and top products of every renamed
+    niche are then rebuilt under the normalized name.
+    """
+    batch_size = batch_size or Config.REFRESH_BATCH_SIZE
+    report = {'products': 0, 'keywords': 0, 'niches': 0, 'merged': 0}
+    products = get_collection(Config.COLLECTION_PRODUCTS)
+    if products is not None:
+        report['products'] = _normalize_field(products, 'niche', batch_size)
+    keywords = get_collection(Config.COLLECTION_KEYWORDS)
+    if keywords is not None:
+        report['keywords'] = _normalize_field(keywords, 'niche', batch_size)
+
+    niches = get_collection(Config.COLLECTION_NICHES)
+    if niches is None:
+        return report
+    names = {data['name'].lower().strip() for data in niches.find(_unnormalized('name'), {'name': 1})}
+    old_names = set()
+    for name in names:
+        # Matches every stored spelling of the name
+        pattern = rf'^\s*{re.escape(name)}\s*$'
+        stored = sorted(niches.find({'name': {'$regex': pattern, '$options': 'i'}}),
+                        key=lambda data: parse_datetime(data.get('updated_at')) or datetime.min, reverse=True)
+        old_names.update(data['name'] for data in stored if data['name'] != name)
+        for duplicate in stored[1:]:
+            # Deleted first, so the rename cannot collide with the unique name index
+            Niche.from_dict(duplicate).delete()
+            report['merged'] += 1
+        # The constructor normalizes the name, and save() refreshes search and rankings
+        Niche.from_dict(stored[0]).save()
+        NicheStats.rebuild(name)
+        NicheTopProducts.rebuild(name)
+        report['niches'] += 1
+
+    # Stats kept under the old spellings are replaced by the rebuilt ones
+    stats = get_collection(Config.COLLECTION_NICHE_STATS)
+    if stats is not None and old_names:
+        stats.delete_many({'_id': {'$in': list(old_names)}})
+    Niche.ensure_indexes()
+    logger.info(f"Migrated names: {report}")
+    return report
+
+def migrate_url_hashes(batch_size=None):
+    """Recompute product URL hashes after a change to URL normalization, merging products that now collide.
+
+    Of products whose URLs now normalize to the same one, the most recently
+    updated is kept and the rest are deleted, which also takes them out of
+    the niche stats. Products stored before URLs were hashed get a hash too.
+    """
+    batch_size = batch_size or Config.REFRESH_BATCH_SIZE
+    report = {'rehashed': 0, 'merged': 0}
+    collection = get_collection(Config.COLLECTION_PRODUCTS)
+    if collection is None:
+        return report
+    changed = {}
+    for data in collection.find({'url': {'$type': 'string'}}, {'url': 1, 'url_hash': 1, 'updated_at': 1}):
+        key = url_hash(data['url'])
+        if key != data.get('url_hash'):
+            changed.setdefault(key, []).append(data)
+
+    operations = []
+    for key, stored in changed.items():
+        holder = collection.find_one({'url_hash': key}, {'url_hash': 1, 'updated_at': 1})
+        stored = sorted(stored + ([holder] if holder else []),
+                        key=lambda data: parse_datetime(data.get('updated_at')) or datetime.min, reverse=True)
+        for duplicate in stored[1:]:
+            # Deleted before the rehash, so it cannot collide with the unique url_hash index
+            Product.from_dict(duplicate).delete()
+            report['merged'] += 1
+        if stored[0].get('url_hash') != key:
+            operations.append(UpdateOne({'_id': stored[0]['_id']}, {'$set': {'url_hash': key}}))
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            report['rehashed'] += len(operations)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        report['rehashed'] += len(operations)
+    logger.info(f"Migrated URL hashes: {report}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental sync maintenance")
+    parser.add_argument('command', choices=['migrate', 'prune'],
+                        help="migrate: convert ISO string timestamps to datetimes, normalize niche names and "
+                             "rehash product URLs; prune: drop expired tombstones")
+    parser.add_argument('--batch-size', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'migrate':
+        report = {
+            'timestamps': migrate_timestamps(args.batch_size),
+            'names': migrate_names(args.batch_size),
+            'url_hashes': migrate_url_hashes(args.batch_size)
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(json.dumps({'pruned': Tombstone.prune()}, indent=2))
@@ -0,0 +1,139 @@
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.models.user import User
+from src.models.keyword import Keyword
+from src.models.niche_stats import NicheStats
+from src.models.niche_top_products import NicheTopProducts
+from src.services.etsy_api import keyword_market_data
+from src.services.keyword_analysis import analyze_new_keyword
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _dedup_stats(groups):
+    """How many per-user refreshes grouping by keyword or niche avoided"""
+    references = sum(group['users'] for group in groups.values())
+    return {
+        'users_following': references,
+        'distinct': len(groups),
+        'refreshes_saved': references - len(groups),
+        'dedup_ratio': round(references / len(groups), 2) if groups else 0
+    }
+
+def _variants(groups):
+    return {name: group['variants'] for name, group in groups.items()}
+
+def refresh_tracked_keywords(executor, batch_size):
+    """Refresh every distinct tracked keyword once and fan changes out to its followers"""
+    groups = User.tracked_groups('tracked_keywords')
+    stats = dict(_dedup_stats(groups), refreshed=0, created=0, changed=0, unavailable=0, users_updated=0)
+
+    for chunk in _chunks(sorted(groups), batch_size):
+        stored = dict(zip(chunk, Keyword.find_many(chunk)))
+        markets = dict(zip(chunk, executor.map(keyword_market_data, chunk)))
+        now = datetime.utcnow()
+
+        created, changes, updates = [], {}, {}
+        for name in chunk:
+            keyword, market = stored[name], markets[name]
+            if keyword is None:
+                # Tracked before anyone analyzed it
+                keyword = analyze_new_keyword(name, market or {})
+                created.append(keyword)
+                updates[name] = {
+                    'changes': {'competition_level': keyword.competition_level, 'price_range': keyword.price_range},
+                    'previous': None,
+                    'refreshed_at': now
+                }
+                continue
+            if market is None:
+                stats['unavailable'] += 1
+                continue
+
+            stats['refreshed'] += 1
+            fields = {}
+            if market['competition_level'] != keyword.competition_level:
+                fields['competition_level'] = market['competition_level']
+            if market['price_range'] and market['price_range'] != keyword.price_range:
+                fields['price_range'] = market['price_range']
+            if fields:
+                changes[keyword.keyword] = fields
+                updates[name] = {
+                    'changes': fields,
+                    'previous': {field: getattr(keyword, field) for field in fields},
+                    'refreshed_at': now
+                }
+
+        Keyword.bulk_upsert(created)
+        Keyword.bulk_set(changes)
+        stats['created'] += len(created)
+        stats['changed'] += len(changes)
+        stats['users_updated'] += User.fan_out_updates('tracked_keywords', updates, _variants(groups))
+    return stats
+
+def _rebuild_niche(name):
+    return NicheStats.rebuild(name), NicheTopProducts.rebuild(name)
+
+def refresh_favorite_niches(executor, batch_size):
+    """Recompute every distinct favorite niche once and fan changes out to its followers"""
+    groups = User.tracked_groups('favorite_niches')
+    stats = dict(_dedup_stats(groups), refreshed=0, changed=0, users_updated=0)
+
+    for chunk in _chunks(sorted(groups), batch_size):
+        before = NicheStats.get_many(chunk)
+        rebuilt = dict(zip(chunk, executor.map(_rebuild_niche, chunk)))
+        now = datetime.utcnow()
+
+        updates = {}
+        for name in chunk:
+            niche_stats, top_products = rebuilt[name]
+            stats['refreshed'] += 1
+            previous = NicheStats.analysis(before.get(name))['price_analysis']
+            current = NicheStats.analysis(niche_stats)['price_analysis']
+            summary = {field: current[field] for field in ('product_count', 'average_price')}
+            if summary == {field: previous[field] for field in summary}:
+                continue
+            updates[name] = dict(
+                summary,
+                previous={field: previous[field] for field in summary},
+                top_product=(top_products or [None])[0],
+                refreshed_at=now
+            )
+
+        stats['changed'] += len(updates)
+        stats['users_updated'] += User.fan_out_updates('favorite_niches', updates, _variants(groups))
+    return stats
+
+def refresh_tracked(batch_size=None, workers=None):
+    """Refresh everything users track or favorite, each keyword and niche once.
+
+    Run on a schedule (e.g. cron) with `python -m src.services.tracked_refresh`.
+    """
+    batch_size = batch_size or Config.REFRESH_BATCH_SIZE
+    workers = workers or Config.KEYWORD_ANALYSIS_WORKERS
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tracked-refresh') as executor:
+        report = {
+            'keywords': refresh_tracked_keywords(executor, batch_size),
+            'niches': refresh_favorite_niches(executor, batch_size)
+        }
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Tracked refresh finished: {report}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh users' tracked keywords and favorite niches")
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(refresh_tracked(args.batch_size, args.workers), indent=2))
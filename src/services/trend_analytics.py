@@ -0,0 +1,236 @@
+import argparse
+import logging
+import time
+import warnings
+import numpy as np
+from pymongo import UpdateOne
+from src.database import get_collection
+from src.config import Config
+from src.models.keyword_history import KeywordHistory
+
+logger = logging.getLogger(__name__)
+
+# Series are right-aligned into a fixed window; older points are dropped
+WINDOW = 36
+SHORT_MA = 3
+LONG_MA = 6
+SEASONAL_LAG = 12
+
+# Classification thresholds
+MIN_POINTS = 3
+STABLE_CV = 0.15
+VOLATILE_CHANGE_STD = 0.25
+SEASONAL_AUTOCORR = 0.5
+TREND_BAND = 0.05
+
+BULK_BATCH_SIZE = 1000
+
+def pack_series(series_list, window=WINDOW):
+    """Pack variable-length series into a right-aligned (n, window) float32 array.
+
+    Missing leading points are NaN. The scatter into the matrix is done with
+    flat index arithmetic rather than a per-row Python loop.
+    """
+    n = len(series_list)
+    lengths = np.fromiter((min(len(s), window) for s in series_list), dtype=np.int64, count=n)
+    total = int(lengths.sum())
+    values = np.fromiter(
+        (v for s, length in zip(series_list, lengths) for v in s[len(s) - length:]),
+        dtype=np.float32, count=total
+    )
+
+    matrix = np.full((n, window), np.nan, dtype=np.float32)
+    rows = np.repeat(np.arange(n), lengths)
+    # Column of each value: window - length + position within its series
+    starts = np.cumsum(lengths) - lengths
+    cols = np.arange(total) - np.repeat(starts, lengths) + np.repeat(window - lengths, lengths)
+    matrix[rows, cols] = values
+    return matrix, lengths
+
+def _trailing_mean(matrix, width):
+    """Mean of the last `width` non-missing points of every row"""
+    tail = matrix[:, -width:]
+    counts = np.sum(~np.isnan(tail), axis=1)
+    sums = np.nansum(tail, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def compute_trend_metrics(matrix, lengths):
+    """Compute growth, moving averages, volatility and seasonality for every row at once"""
+    n, window = matrix.shape
+    rows = np.arange(n)
+    has_data = lengths > 0
+    # Series may have gaps (NaN) between their first and last points
+    valid = ~np.isnan(matrix)
+    points = np.sum(valid, axis=1)
+
+    first = np.where(has_data, matrix[rows, np.clip(window - lengths, 0, window - 1)], np.nan)
+    last = matrix[:, -1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        growth_rate = np.where((lengths >= 2) & (first != 0), (last - first) / first * 100, 0.0)
+
+    ma_short = _trailing_mean(matrix, SHORT_MA)
+    ma_long = _trailing_mean(matrix, LONG_MA)
+
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # All-NaN rows are expected (short series); their results are masked below
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        # Volatility: std of period-over-period relative changes
+        prev = matrix[:, :-1]
+        changes = np.where(prev != 0, np.diff(matrix, axis=1) / prev, np.nan)
+        change_counts = np.sum(~np.isnan(changes), axis=1)
+        volatility = np.where(change_counts > 1, np.nanstd(changes, axis=1), 0.0)
+
+        mean = np.nanmean(matrix, axis=1)
+        std = np.nanstd(matrix, axis=1)
+        cv = np.where(has_data & (mean != 0), std / np.abs(mean), 0.0)
+
+        # Lag-12 autocorrelation of the de-meaned series, normalized per pair;
+        # gaps are zeroed so they drop out of both sums
+        centered = np.nan_to_num(matrix - mean[:, None])
+        variance = np.sum(centered * centered, axis=1) / np.maximum(points, 1)
+        pairs = np.maximum(np.sum(valid[:, SEASONAL_LAG:] & valid[:, :-SEASONAL_LAG], axis=1), 1)
+        lagged = np.sum(centered[:, SEASONAL_LAG:] * centered[:, :-SEASONAL_LAG], axis=1) / pairs
+        autocorr = np.where((variance > 0) & (lengths > SEASONAL_LAG * 1.5), lagged / variance, 0.0)
+
+    seasonality = np.full(n, 'stable', dtype=object)
+    seasonality[cv >= STABLE_CV] = 'trending'
+    seasonality[volatility >= VOLATILE_CHANGE_STD] = 'volatile'
+    seasonality[autocorr >= SEASONAL_AUTOCORR] = 'seasonal'
+    seasonality[points < MIN_POINTS] = 'insufficient_data'
+
+    trend_direction = np.full(n, 'stable', dtype=object)
+    with np.errstate(invalid='ignore'):
+        trend_direction[ma_short > ma_long * (1 + TREND_BAND)] = 'rising'
+        trend_direction[ma_short < ma_long * (1 - TREND_BAND)] = 'declining'
+
+    return {
+        'growth_rate': np.round(growth_rate, 2),
+        'moving_average_short': np.round(ma_short, 2),
+        'moving_average_long': np.round(ma_long, 2),
+        'volatility': np.round(volatility, 4),
+        'seasonality': seasonality,
+        'trend_direction': trend_direction
+    }
+
+def _metrics_row(metrics, i):
+    """Extract plain Python values for one row of the metrics arrays"""
+    row = {}
+    for name, values in metrics.items():
+        value = values[i]
+        if isinstance(value, np.floating):
+            value = None if np.isnan(value) else round(float(value), 4)
+        row[name] = value
+    return row
+
+def analyze_series(values):
+    """Trend metrics for a single series"""
+    matrix, lengths = pack_series([values])
+    return _metrics_row(compute_trend_metrics(matrix, lengths), 0)
+
+def _load_niche_series(collection):
+    """Load filters and search volume trends for every niche that has one"""
+    filters = []
+    series_list = []
+    cursor = collection.find({'trend_data.search_volume_trend.0': {'$exists': True}}, {'trend_data.search_volume_trend': 1})
+    for doc in cursor:
+        values = (doc.get('trend_data') or {}).get('search_volume_trend') or []
+        filters.append({'_id': doc['_id']})
+        series_list.append([v if isinstance(v, (int, float)) else np.nan for v in values])
+    return filters, series_list
+
+def _load_keyword_series(collection):
+    """Load filters and monthly mean search volumes from the keyword history rollups"""
+    filters = []
+    series_list = []
+    for keyword, values in KeywordHistory.monthly_series():
+        filters.append({'keyword': keyword})
+        series_list.append(values)
+    return filters, series_list
+
+def _write_back(collection, filters, metrics, build_update):
+    """Write metrics back with batched bulk updates"""
+    operations = []
+    written = 0
+    for i, doc_filter in enumerate(filters):
+        operations.append(UpdateOne(doc_filter, {'$set': build_update(_metrics_row(metrics, i))}))
+        if len(operations) >= BULK_BATCH_SIZE:
+            collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    return written
+
+def _keyword_update(row):
+    """Fields written back to a keyword document"""
+    update = {f"seasonal_data.{name}": value for name, value in row.items() if name != 'trend_direction'}
+    update['trend_direction'] = row['trend_direction']
+    return update
+
+def _niche_update(row):
+    """Fields written back to a niche document"""
+    return {f"trend_data.{name}": value for name, value in row.items()}
+
+def run_trend_analytics():
+    """Batch job: recompute trend metrics for all keywords and niches"""
+    # Raw history past retention is already captured by the rollups we read
+    KeywordHistory.downsample()
+
+    jobs = [
+        (Config.COLLECTION_KEYWORDS, _load_keyword_series, _keyword_update),
+        (Config.COLLECTION_NICHES, _load_niche_series, _niche_update)
+    ]
+    summary = {}
+    for collection_name, load_series, build_update in jobs:
+        collection = get_collection(collection_name)
+        if collection is None:
+            continue
+
+        started = time.perf_counter()
+        filters, series_list = load_series(collection)
+        if not filters:
+            summary[collection_name] = 0
+            continue
+
+        matrix, lengths = pack_series(series_list)
+        metrics = compute_trend_metrics(matrix, lengths)
+        written = _write_back(collection, filters, metrics, build_update)
+
+        summary[collection_name] = written
+        logger.info(f"Trend analytics updated {written} {collection_name} in {time.perf_counter() - started:.2f}s")
+    return summary
+
+def benchmark(n_series=1000000, length=24, seed=0):
+    """Measure metric throughput on synthetic series"""
+    rng = np.random.default_rng(seed)
+    months = np.arange(length)
+    base = rng.uniform(50, 5000, size=(n_series, 1))
+    slope = rng.normal(0, 0.02, size=(n_series, 1))
+    season = rng.uniform(0, 0.5, size=(n_series, 1)) * np.sin(2 * np.pi * months / 12)
+    noise = rng.normal(0, 0.05, size=(n_series, length))
+    matrix = np.full((n_series, WINDOW), np.nan, dtype=np.float32)
+    matrix[:, -length:] = base * (1 + slope * months + season + noise)
+    lengths = np.full(n_series, min(length, WINDOW))
+
+    started = time.perf_counter()
+    metrics = compute_trend_metrics(matrix, lengths)
+    elapsed = time.perf_counter() - started
+
+    labels, counts = np.unique(metrics['seasonality'].astype(str), return_counts=True)
+    print(f"{n_series:,} series x {length} points: {elapsed:.2f}s ({n_series / elapsed:,.0f} series/sec)")
+    print("Seasonality:", dict(zip(labels.tolist(), counts.tolist())))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch trend analytics for keywords and niches")
+    parser.add_argument('--benchmark', type=int, metavar='N', help="benchmark on N synthetic series instead of running the job")
+    parser.add_argument('--length', type=int, default=24, help="points per synthetic series")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.benchmark:
+        benchmark(args.benchmark, args.length)
+    else:
+        print(run_trend_analytics())
@@ -0,0 +1,93 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_app_context
+from src.config import Config
+from src.services.invalidation_bus import invalidation_bus
+
+# Fields a user can be looked up by; '_id' is the primary key
+LOOKUP_FIELDS = ('_id', 'email', 'username')
+
+class UserCache:
+    """Process-wide read-through cache of user documents.
+
+    Entries are keyed by user ID with email and username as secondary keys,
+    evicted least-recently-used beyond `max_entries` and expired after `ttl`
+    seconds, which bounds how long another process's write can go unseen.
+    Callers get a deep copy, so mutating a loaded user never touches the
+    cached document.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, document)
+        self._keys = {}  # (field, value) -> user_id
+
+    def _drop(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        for field in LOOKUP_FIELDS[1:]:
+            key = (field, entry[1].get(field))
+            if self._keys.get(key) == user_id:
+                del self._keys[key]
+
+    def get(self, field, value):
+        """Cached document whose `field` equals `value`, or None"""
+        with self._lock:
+            user_id = str(value) if field == '_id' else self._keys.get((field, value))
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, document = entry
+            if expires_at < time.monotonic() or (field != '_id' and document.get(field) != value):
+                self._drop(user_id)
+                return None
+            self._entries.move_to_end(user_id)
+            return copy.deepcopy(document)
+
+    def put(self, document):
+        """Cache a document read from the database"""
+        user_id = str(document['_id'])
+        document = copy.deepcopy(document)
+        with self._lock:
+            self._drop(user_id)
+            self._entries[user_id] = (time.monotonic() + self.ttl, document)
+            for field in LOOKUP_FIELDS[1:]:
+                if document.get(field) is not None:
+                    self._keys[(field, document[field])] = user_id
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_id):
+        """Forget a user after it is written or deleted"""
+        with self._lock:
+            self._drop(str(user_id))
+
+    def invalidate_many(self, user_ids):
+        """Forget several users, or every user when user_ids is None"""
+        if user_ids is None:
+            self.clear()
+            return
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+def request_identity_map():
+    """Users already loaded by the current request, keyed by (field, value); None outside a request"""
+    if not has_app_context():
+        return None
+    if 'user_identity_map' not in g:
+        g.user_identity_map = {}
+    return g.user_identity_map
+
+# Global user cache
+user_cache = UserCache(Config.USER_CACHE_ENTRIES, Config.USER_CACHE_TTL_SECONDS)
+invalidation_bus.subscribe(Config.COLLECTION_USERS, user_cache.invalidate_many)
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+# Keep the cross-worker bus of the test run away from a real deployment's
+os.environ.setdefault('INVALIDATION_BUS_PATH', os.path.join(tempfile.mkdtemp(), 'invalidations.db'))
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+import mongomock.collection
+
+from src.database import db_instance
+
+def _ignore_sort(add):
+    # pymongo 4.9+ passes a `sort` argument older mongomock releases do not take
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+mongomock.collection.BulkOperationBuilder.add_update = _ignore_sort(mongomock.collection.BulkOperationBuilder.add_update)
+mongomock.collection.BulkOperationBuilder.add_replace = _ignore_sort(mongomock.collection.BulkOperationBuilder.add_replace)
+# mongomock cannot return raw BSON, so reads take the find() path mock collections use
+mongomock.collection.Collection.find_raw_batches = None
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh in-memory database behind get_collection()"""
+    database = mongomock.MongoClient()['niche_compass_test']
+    monkeypatch.setattr(db_instance, '_db', database)
+    return database
+
+@pytest.fixture
+def client(db):
+    """Test client for the API against the in-memory database"""
+    # The product routes import the Azure clients
+    pytest.importorskip('aiohttp')
+    pytest.importorskip('azure.ai.textanalytics')
+    from src.main import app
+    app.config['TESTING'] = True
+    return app.test_client()
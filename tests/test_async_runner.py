@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+import pytest
+from src.services.async_runner import AsyncRunner
+
+@pytest.fixture
+def runner():
+    runner = AsyncRunner(max_concurrency=2)
+    yield runner
+    runner.close()
+
+def test_calls_share_one_loop_thread_bounded_by_the_semaphore(runner):
+    running = []
+    peak = []
+    threads = set()
+
+    async def call(i):
+        async with runner.semaphore:
+            threads.add(threading.get_ident())
+            running.append(i)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(i)
+        return i * 2
+
+    assert runner.run_many([call(i) for i in range(8)]) == [i * 2 for i in range(8)]
+    assert max(peak) == 2
+    assert threads != {threading.get_ident()} and len(threads) == 1
+
+def test_timed_out_calls_are_cancelled(runner):
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(FutureTimeout):
+        runner.run(hang(), timeout=0.05)
+    assert cancelled.wait(1)
+
+def test_close_runs_the_hooks_on_the_loop(runner):
+    closed = []
+
+    @runner.on_close
+    async def close_sessions():
+        closed.append(asyncio.get_running_loop())
+
+    loop = runner._ensure_loop()
+    runner.close()
+
+    assert closed == [loop]
+    # The next call starts a fresh loop
+    assert runner.run(asyncio.sleep(0, result='ok')) == 'ok'
+    assert runner._loop is not loop
+
+def test_a_forked_child_starts_its_own_loop(runner, monkeypatch):
+    loop = runner._ensure_loop()
+    monkeypatch.setattr(runner, '_pid', -1)
+
+    assert runner.run(asyncio.sleep(0, result='child')) == 'child'
+    assert runner._loop is not loop
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,65 @@
+import threading
+import src.services.autocomplete as autocomplete
+from src.services.autocomplete import AutocompleteIndex
+
+def _keywords(index, prefix):
+    return {item['keyword']: item['search_volume'] for item in index.complete(prefix, 50)}
+
+def test_delta_keywords_with_astral_characters_match_their_prefix():
+    index = AutocompleteIndex()
+    index.load([('cup', 10)])
+    index.insert('mug \U0001f600 gift', 5)
+    index.insert('mug 中', 3)
+
+    assert _keywords(index, 'mug') == {'mug \U0001f600 gift': 5, 'mug 中': 3}
+
+def test_delta_merges_in_the_background_and_keeps_writes_made_meanwhile(monkeypatch):
+    monkeypatch.setattr(autocomplete, 'DELTA_LIMIT', 3)
+    started, release = threading.Event(), threading.Event()
+    snapshot_from = autocomplete._snapshot_from
+
+    def slow_snapshot_from(pairs):
+        started.set()
+        release.wait(5)
+        return snapshot_from(pairs)
+
+    index = AutocompleteIndex()
+    index.load([('mug', 10), ('ring', 20)])
+    monkeypatch.setattr(autocomplete, '_snapshot_from', slow_snapshot_from)
+    for i in range(4):
+        index.insert(f'mug {i}', i)
+
+    # The insert that crossed the limit returned while the merge is still running
+    assert started.wait(5)
+    index.insert('mug 0', 100)
+    index.insert('mug new', 7)
+    index.insert('ring', 1)
+    expected = {'mug': 10, 'mug 0': 100, 'mug 1': 1, 'mug 2': 2, 'mug 3': 3, 'mug new': 7}
+    assert _keywords(index, 'mug') == expected
+
+    release.set()
+    index._merge_thread.join(5)
+
+    snapshot, delta_keys, _ = index._state
+    assert snapshot.size == 6
+    assert delta_keys == ['mug new']
+    assert _keywords(index, 'mug') == expected
+    assert _keywords(index, 'ring') == {'ring': 1}
+
+def test_rebuild_during_a_merge_wins(monkeypatch):
+    monkeypatch.setattr(autocomplete, 'DELTA_LIMIT', 1)
+    release = threading.Event()
+    snapshot_from = autocomplete._snapshot_from
+    index = AutocompleteIndex()
+    index.load([])
+    monkeypatch.setattr(autocomplete, '_snapshot_from', lambda pairs: release.wait(5) and snapshot_from(pairs))
+    index.insert('mug', 1)
+    index.insert('cup', 2)
+    monkeypatch.setattr(autocomplete, '_snapshot_from', snapshot_from)
+    index.load([('vase', 3)])
+
+    release.set()
+    index._merge_thread.join(5)
+
+    assert len(index) == 1
+    assert _keywords(index, 'vase') == {'vase': 3}
@@ -0,0 +1,57 @@
+from bson import ObjectId
+from src.config import Config
+from src.models.keyword import Keyword
+from src.models.niche import Niche
+from src.models.niche_stats import NicheStats
+from src.models.product import Product
+from src.models.user import User
+
+def test_products_batch_keeps_request_order_and_reports_missing(client):
+    first = Product(title='Linen Tote', url='https://etsy.com/listing/1', store_name='LinenShop')
+    second = Product(title='Boho Mug', url='https://etsy.com/listing/2', store_name='MugShop')
+    first.save()
+    second.save()
+    missing = str(ObjectId())
+
+    response = client.get(f'/api/products/batch?ids={second._id},bad-id&ids={first._id},{missing},{second._id}')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert [product['title'] for product in body['products']] == ['Boho Mug', 'Linen Tote']
+    assert body['missing'] == ['bad-id', missing]
+    assert body['count'] == 2
+
+def test_niches_batch_includes_their_stats(client):
+    niche = Niche(name='totes').upsert()
+    Product(title='Linen Tote', url='https://etsy.com/listing/1', store_name='LinenShop', price=20.0, niche='totes').save()
+
+    body = client.get(f'/api/niches?ids={niche._id}').get_json()
+
+    assert body['count'] == 1
+    assert body['niches'][0]['price_analysis']['average_price'] == 20.0 == \
+        NicheStats.analysis(NicheStats.get('totes'))['price_analysis']['average_price']
+
+def test_keywords_batch_matches_normalized_keywords(client):
+    Keyword(keyword='boho mug', search_volume=100).upsert()
+
+    body = client.get('/api/keywords/batch?k=Boho Mug&k=linen tote').get_json()
+
+    assert [keyword['keyword'] for keyword in body['keywords']] == ['boho mug']
+    assert body['missing'] == ['linen tote']
+
+def test_users_batch(client):
+    user = User(username='maya', email='maya@example.com')
+    user.save()
+
+    body = client.get(f'/api/users/batch?ids={user._id},{ObjectId()}').get_json()
+
+    assert [found['username'] for found in body['users']] == ['maya']
+    assert len(body['missing']) == 1
+
+def test_batches_are_capped(client, monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_MAX_IDS', 2)
+
+    for url in ('/api/products/batch?ids=a,b,c', '/api/niches?ids=a,b,c', '/api/keywords/batch?k=a,b,c',
+                '/api/users/batch?ids=a,b,c'):
+        assert client.get(url).status_code == 400
+    assert client.get('/api/products/batch?ids=a,b,a').status_code == 200
@@ -0,0 +1,55 @@
+import threading
+import pytest
+from bson import ObjectId
+from src.config import Config
+from src.models.keyword import Keyword
+from src.models.niche import Niche
+from src.models.product import Product
+from src.services.fan_out import FanOut
+
+def test_fan_out_reports_slow_and_failing_sections():
+    release = threading.Event()
+    def fail():
+        raise RuntimeError('down')
+
+    results, timed_out, failed = FanOut(4).run({
+        'fast': lambda: 1,
+        'slow': lambda: release.wait(5),
+        'broken': fail
+    }, timeout=0.2)
+    release.set()
+
+    assert (results, timed_out, failed) == ({'fast': 1}, ['slow'], ['broken'])
+
+@pytest.fixture
+def niche(client):
+    niche = Niche(name='totes').upsert()
+    Product(title='Linen Tote', url='https://etsy.com/listing/1', store_name='LinenShop', niche='totes').save()
+    Keyword(keyword='linen tote', search_volume=100, niche='totes').upsert()
+    return niche
+
+def test_dashboard_serves_every_section(client, niche):
+    body = client.get(f'/api/niches/{niche._id}/dashboard').get_json()
+
+    assert body['niche']['name'] == 'totes'
+    assert [product['title'] for product in body['products']] == ['Linen Tote']
+    assert [keyword['keyword'] for keyword in body['keywords']] == ['linen tote']
+    assert body['sentiment_analysis']['review_count'] == 0
+    assert (body['partial'], body['timed_out'], body['failed']) == (False, [], [])
+
+def test_dashboard_answers_with_the_sections_that_finished(client, niche, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(Config, 'DASHBOARD_SECTION_TIMEOUT_SECONDS', 0.2)
+    monkeypatch.setattr(Keyword, 'get_by_niche', classmethod(lambda cls, *args: release.wait(5)))
+    monkeypatch.setattr(Product, 'find_by_niche', classmethod(lambda cls, *args: 1 / 0))
+
+    body = client.get(f'/api/niches/{niche._id}/dashboard').get_json()
+    release.set()
+
+    assert body['partial'] is True
+    assert (body['timed_out'], body['failed']) == (['keywords'], ['products'])
+    assert body['products'] is None and body['sentiment_analysis'] is not None
+
+@pytest.mark.parametrize('niche_id', ['not-an-id', str(ObjectId())])
+def test_dashboard_of_an_unknown_niche(client, niche_id):
+    assert client.get(f'/api/niches/{niche_id}/dashboard').status_code == 404
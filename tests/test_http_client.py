@@ -0,0 +1,132 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.config import Config
+from src.services import etsy_api
+from src.services.http_client import FetchClient, FetchError
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so pooled connections can be reused
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.client_address[1], dict(self.headers)))
+            attempt = sum(1 for path, _, _ in server.requests if path == self.path)
+        if self.path == '/etag':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self._send(304, headers={'ETag': '"v1"'})
+            else:
+                self._send(200, b'listing page', {'ETag': '"v1"'})
+        elif self.path == '/flaky':
+            self._send(503 if attempt == 1 else 200, b'ok')
+        elif self.path == '/loop':
+            self._send(302, headers={'Location': '/loop'})
+        elif self.path.startswith('/listings/active'):
+            body = json.dumps({'count': 2500, 'results': [
+                {'price': {'amount': 1000, 'divisor': 100}}, {'price': {'amount': 3000, 'divisor': 100}}
+            ]}).encode()
+            self._send(200, body, {'Content-Type': 'application/json'})
+        else:
+            self._send(200, b'ok')
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def _client(**kwargs):
+    options = dict(concurrency=2, rate=1000, burst=1000, retries=2, backoff=0, timeout=5)
+    options.update(kwargs)
+    return FetchClient(**options)
+
+def test_sequential_fetches_reuse_one_pooled_connection(stub_server):
+    server, base_url = stub_server
+    client = _client()
+    for i in range(5):
+        assert client.get_text(f"{base_url}/page/{i}") == 'ok'
+    client.close()
+
+    assert len({port for _, port, _ in server.requests}) == 1
+
+def test_token_bucket_limits_the_request_rate(stub_server):
+    _, base_url = stub_server
+    client = _client(rate=20, burst=1)
+    started = time.monotonic()
+    for i in range(5):
+        client.fetch(f"{base_url}/page/{i}")
+    client.close()
+
+    # The first request spends the burst; four more wait 1/20 s each
+    assert time.monotonic() - started >= 0.18
+
+def test_unchanged_pages_are_reused_on_304(stub_server):
+    server, base_url = stub_server
+    client = _client()
+    first = client.fetch(f"{base_url}/etag")
+    second = client.fetch(f"{base_url}/etag")
+    client.close()
+
+    assert not first.from_cache and second.from_cache
+    assert second.status_code == 200 and second.text == 'listing page'
+    assert server.requests[1][2].get('If-None-Match') == '"v1"'
+
+def test_server_errors_are_retried(stub_server):
+    server, base_url = stub_server
+    client = _client()
+
+    assert client.get_text(f"{base_url}/flaky") == 'ok'
+    assert [path for path, _, _ in server.requests] == ['/flaky', '/flaky']
+
+def test_refused_connections_raise_fetch_error():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    client = _client(retries=1)
+
+    with pytest.raises(FetchError):
+        client.fetch(f"http://127.0.0.1:{port}/")
+
+def test_other_request_errors_raise_fetch_error_without_retrying(stub_server):
+    server, base_url = stub_server
+    client = _client()
+
+    with pytest.raises(FetchError):
+        client.fetch(f"{base_url}/loop")
+    # One redirect chain, not one per retry
+    assert len(server.requests) == 31
+    with pytest.raises(FetchError):
+        client.fetch('http://')
+
+def test_keyword_market_data_reads_the_stub_etsy_api(stub_server, monkeypatch):
+    server, base_url = stub_server
+    monkeypatch.setattr(Config, 'ETSY_API_KEY', 'test-key')
+    monkeypatch.setattr(Config, 'ETSY_API_BASE_URL', base_url)
+    monkeypatch.setattr(etsy_api, 'http_client', _client())
+
+    market = etsy_api.keyword_market_data('linen tote')
+
+    assert market['competition_level'] == 'medium'
+    assert market['price_range'] == {'min': 10.0, 'max': 30.0, 'avg': 20.0}
+    assert server.requests[0][2].get('x-api-key') == 'test-key'
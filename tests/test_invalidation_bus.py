@@ -0,0 +1,74 @@
+import multiprocessing
+import sys
+import time
+import pytest
+from src.services.invalidation_bus import InvalidationBus
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="workers are forked like gunicorn's")
+
+WORKERS = 3
+
+def _worker(path, poll_interval, max_keys, index, keys, expected, ready, results):
+    bus = InvalidationBus(path, poll_interval, max_keys, retention=300)
+    received = set()
+    collapsed = []
+
+    def handler(batch):
+        if batch is None:
+            collapsed.append(True)
+        else:
+            received.update(batch)
+
+    bus.subscribe('products', handler, local=False)
+    bus.start()
+    ready.wait()
+    for key in keys:
+        bus.publish('products', [key])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and not (collapsed if expected is None else expected <= received):
+        time.sleep(poll_interval)
+    bus.close()
+    results.put((index, received, bool(collapsed)))
+
+def _run(path, poll_interval, max_keys, published, collapsed=False):
+    """Run one forked worker per key list and collect what each received from the others"""
+    context = multiprocessing.get_context('fork')
+    ready = context.Barrier(len(published))
+    results = context.Queue()
+    processes = []
+    for index, keys in enumerate(published):
+        others = {key for i, other in enumerate(published) if i != index for key in other}
+        # Wait for a collection-wide invalidation instead of keys when one is due
+        expected = None if collapsed and others else others
+        processes.append(context.Process(
+            target=_worker, args=(path, poll_interval, max_keys, index, keys, expected, ready, results)
+        ))
+    for process in processes:
+        process.start()
+    received = {index: (keys, collapsed) for index, keys, collapsed in (results.get(timeout=30) for _ in processes)}
+    for process in processes:
+        process.join(10)
+    return received
+
+def test_every_worker_receives_every_remote_key(tmp_path):
+    published = [[f"{index}:{i % 50}" for i in range(200)] for index in range(WORKERS)]
+
+    received = _run(str(tmp_path / 'bus.db'), 0.02, 1000, published)
+
+    for index, (keys, collapsed) in received.items():
+        others = {key for i, other in enumerate(published) if i != index for key in other}
+        # Only other workers' events arrive remotely; repeats within a tick arrive once
+        assert keys == others
+        assert not collapsed
+
+def test_a_burst_past_max_keys_arrives_as_a_collection_wide_invalidation(tmp_path):
+    # A slow tick, so the burst is sent in one flush
+    published = [[f"burst:{i}" for i in range(50)], [], []]
+
+    received = _run(str(tmp_path / 'bus.db'), 0.5, 10, published, collapsed=True)
+
+    assert received[0] == (set(), False)
+    for index in (1, 2):
+        keys, collapsed = received[index]
+        assert collapsed
+        assert keys == set()
@@ -0,0 +1,60 @@
+import json
+import pytest
+from src.config import Config
+from src.models.keyword import Keyword
+from src.services.keyword_analysis import analyze_new_keyword
+
+@pytest.fixture
+def routes(client, monkeypatch):
+    from src.routes import keywords
+    # No live market lookups
+    monkeypatch.setattr(keywords, 'analyze_new_keyword', lambda text: analyze_new_keyword(text, market={}))
+    return keywords
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_batch_streams_one_line_per_keyword_then_a_summary(client, routes, db):
+    Keyword(keyword='boho mug', search_volume=50).upsert()
+
+    response = client.post('/api/keywords/analyze/batch', json={'keywords': ['linen tote', 'Boho Mug', 'gold ring', 'boho mug ']},
+                           buffered=False)
+    assert response.is_streamed and response.mimetype == 'application/x-ndjson'
+    lines = _lines(response)
+
+    assert lines[0]['keyword_analysis']['keyword'] == 'boho mug'
+    assert lines[0]['keyword_analysis']['source'] == 'database'
+    assert {line['keyword_analysis']['keyword'] for line in lines[1:3]} == {'linen tote', 'gold ring'}
+    assert {line['keyword_analysis']['source'] for line in lines[1:3]} == {'analysis'}
+    assert lines[3] == {'summary': {'requested': 3, 'from_database': 1, 'analyzed': 2, 'stored': 2, 'failed': 0}}
+    assert db[Config.COLLECTION_KEYWORDS].count_documents({}) == 3
+
+def test_failed_analyses_and_stores_are_reported_in_the_stream(client, routes, monkeypatch):
+    def analyze(text):
+        if text == 'gold ring':
+            raise RuntimeError('Etsy unavailable')
+        return analyze_new_keyword(text, market={})
+    monkeypatch.setattr(routes, 'analyze_new_keyword', analyze)
+    monkeypatch.setattr(Keyword, 'bulk_upsert', classmethod(lambda cls, keywords: 1 / 0))
+
+    lines = _lines(client.post('/api/keywords/analyze/batch', json={'keywords': ['linen tote', 'gold ring']}))
+
+    assert {'keyword': 'gold ring', 'error': 'Analysis failed'} in lines
+    assert lines[-1]['summary']['failed'] == 1
+    assert lines[-1]['summary']['stored'] == 0
+    assert lines[-1]['summary']['error'] == 'Failed to store analyzed keywords'
+
+@pytest.mark.parametrize('body', [{}, {'keywords': 'boho mug'}, {'keywords': [' ', '']}, {'keywords': ['a', 'b', 'c']}])
+def test_invalid_batches_are_rejected_before_streaming(client, monkeypatch, body):
+    monkeypatch.setattr(Config, 'KEYWORD_BATCH_MAX', 2)
+
+    assert client.post('/api/keywords/analyze/batch', json=body).status_code == 400
+
+def test_a_disconnected_client_still_stores_what_was_analyzed(routes, db):
+    stream = routes._stream_batch_analysis(['linen tote'])
+    first = json.loads(next(stream))
+    # What the server does when the client goes away mid-stream
+    stream.close()
+
+    assert first['keyword_analysis']['keyword'] == 'linen tote'
+    assert db[Config.COLLECTION_KEYWORDS].count_documents({'keyword': 'linen tote'}) == 1
@@ -0,0 +1,44 @@
+from src.models.keyword import Keyword
+from src.services.keyword_graph import KeywordGraph, keyword_graph
+
+def _scores(graph, seed):
+    return {suggestion['keyword']: suggestion['relevance_score'] for suggestion in graph.suggestions(seed)}
+
+def test_edges_count_co_occurrence_within_related_lists(db):
+    Keyword(keyword='mug', related_keywords=['coffee mug', 'tea cup']).upsert()
+    Keyword(keyword='gift', related_keywords=['coffee mug', 'tea cup']).upsert()
+    Keyword(keyword='cup', related_keywords=['tea cup']).upsert()
+    graph = KeywordGraph()
+    graph.build()
+
+    # 'tea cup' shares two lists with 'coffee mug' but only one with 'cup'
+    edges = graph._edges[graph._ids['tea cup']]
+    assert edges[graph._ids['coffee mug']] == 2
+    assert edges[graph._ids['cup']] == 1
+    assert list(_scores(graph, 'tea cup'))[0] == 'coffee mug'
+
+def test_incremental_updates_match_a_rebuild(db):
+    keyword_graph.build()
+    mug = Keyword(keyword='mug', related_keywords=['coffee mug'])
+    mug = mug.upsert()
+    mug.add_related_keyword('tea cup')
+    Keyword(keyword='gift', related_keywords=['coffee mug', 'tea cup']).upsert()
+
+    rebuilt = KeywordGraph()
+    rebuilt.build()
+    for keyword in ('mug', 'gift', 'coffee mug', 'tea cup'):
+        assert _scores(keyword_graph, keyword) == _scores(rebuilt, keyword)
+
+def test_deleted_keywords_leave_suggestions(db):
+    keyword_graph.build()
+    mug = Keyword(keyword='mug', related_keywords=['coffee mug', 'tea cup'])
+    mug = mug.upsert()
+    Keyword(keyword='gift', related_keywords=['mug']).upsert()
+    assert 'mug' in _scores(keyword_graph, 'gift')
+
+    mug.delete()
+
+    assert keyword_graph.suggestions('mug') == []
+    assert 'mug' not in _scores(keyword_graph, 'gift')
+    # Only the deleted list paired these two
+    assert _scores(keyword_graph, 'coffee mug') == {}
@@ -0,0 +1,56 @@
+import calendar
+import math
+from datetime import datetime, timedelta
+from src.config import Config
+from src.models.keyword_history import RESOLUTION_RAW, KeywordHistory
+
+def test_samples_fill_buckets_of_a_fixed_size(db, monkeypatch):
+    monkeypatch.setattr(Config, 'HISTORY_BUCKET_SIZE', 2)
+    for day in range(1, 6):
+        KeywordHistory.record('Boho Mug', day * 10, datetime(2024, 3, day))
+
+    buckets = list(db[Config.COLLECTION_KEYWORD_HISTORY].find({'resolution': RESOLUTION_RAW}))
+    assert sorted(bucket['count'] for bucket in buckets) == [1, 2, 2]
+
+    history = KeywordHistory.get_range('boho mug', datetime(2024, 3, 2), datetime(2024, 3, 4))
+    assert history['resolution'] == RESOLUTION_RAW
+    assert history['volumes'] == [20, 30, 40]
+
+def test_long_ranges_read_daily_and_monthly_means_from_rollups(db):
+    KeywordHistory.record_many([('boho mug', 100), ('linen tote', 5)], datetime(2024, 1, 10))
+    KeywordHistory.record('boho mug', 200, datetime(2024, 1, 10, 12))
+    KeywordHistory.record('boho mug', 400, datetime(2024, 2, 3))
+
+    daily = KeywordHistory.get_range('boho mug', datetime(2024, 1, 1), datetime(2024, 3, 1))
+    monthly = KeywordHistory.get_range('boho mug', datetime(2023, 1, 1), datetime(2024, 12, 31))
+
+    assert daily['resolution'] == 'daily' and daily['volumes'] == [150.0, 400.0]
+    assert monthly['resolution'] == 'monthly' and monthly['volumes'] == [150.0, 400.0]
+    assert monthly['timestamps'][0] == calendar.timegm((2024, 1, 1, 0, 0, 0))
+
+def test_monthly_series_leaves_gaps_for_months_without_samples(db):
+    KeywordHistory.record('boho mug', 100, datetime(2023, 11, 5))
+    KeywordHistory.record('boho mug', 300, datetime(2024, 2, 5))
+
+    [(keyword, values)] = KeywordHistory.monthly_series()
+
+    assert keyword == 'boho mug'
+    assert values[0] == 100 and values[3] == 300
+    assert len(values) == 4 and all(math.isnan(value) for value in values[1:3])
+
+def test_downsample_drops_old_raw_buckets_only(db):
+    KeywordHistory.record('boho mug', 100, datetime.utcnow() - timedelta(days=400))
+    KeywordHistory.record('boho mug', 200)
+
+    assert KeywordHistory.downsample(retention_days=90) == 1
+    history = KeywordHistory.get_range('boho mug', datetime.utcnow() - timedelta(days=500), datetime.utcnow())
+    assert history['volumes'] == [100.0, 200.0]
+
+def test_history_endpoint_validates_its_range(client):
+    KeywordHistory.record('boho mug', 100, datetime(2024, 3, 1))
+
+    response = client.get('/api/keywords/Boho Mug/history?start=2024-02-25&end=2024-03-05')
+    assert response.get_json()['history']['volumes'] == [100]
+    assert client.get('/api/keywords/boho mug/history?start=yesterday').status_code == 400
+    assert client.get('/api/keywords/boho mug/history?start=2024-03-05&end=2024-02-25').status_code == 400
+    assert client.get('/api/keywords/boho mug/history?resolution=hourly').status_code == 400
@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
+from src.models.keyword import Keyword
+
+def test_upsert_keeps_one_document_per_keyword(db):
+    Keyword.ensure_indexes()
+    first = Keyword(keyword='Boho Mug', search_volume=100).upsert()
+    second = Keyword(keyword=' boho mug ', search_volume=200).upsert()
+
+    assert second._id == first._id
+    assert second.search_volume == 100
+    assert db[Config.COLLECTION_KEYWORDS].count_documents({}) == 1
+
+def test_bulk_upsert_returns_keywords_another_worker_stored_first(db):
+    Keyword.ensure_indexes()
+    theirs = Keyword(keyword='gold ring', search_volume=50).upsert()
+
+    stored = Keyword.bulk_upsert([Keyword(keyword='silver ring'), Keyword(keyword='gold ring', search_volume=1)])
+
+    assert stored[0].keyword == 'silver ring'
+    assert stored[1]._id == theirs._id
+    assert stored[1].search_volume == 50
+    assert db[Config.COLLECTION_KEYWORDS].count_documents({}) == 2
+
+def test_concurrent_analyses_of_one_keyword_store_it_once(client, db):
+    Keyword.ensure_indexes()
+    barrier = threading.Barrier(6)
+
+    def analyze():
+        barrier.wait()
+        return client.post('/api/keywords/analyze', json={'keyword': 'Linen Tote'})
+
+    with ThreadPoolExecutor(6) as pool:
+        responses = list(pool.map(lambda _: analyze(), range(6)))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.get_json()['keyword_analysis']['_id'] for response in responses}) == 1
+    assert db[Config.COLLECTION_KEYWORDS].count_documents({'keyword': 'linen tote'}) == 1
@@ -0,0 +1,56 @@
+import csv
+import json
+from src.config import Config
+from src.services.listing_ingestion import ListingIngestion, ingest_listings, normalize_listing
+
+LISTINGS = [
+    {'url': 'https://www.etsy.com/listing/1/linen-tote', 'title': 'Linen Tote', 'price': '$1,200.50', 'tags': 'tote, linen'},
+    {'url': 'https://etsy.com/uk/listing/1', 'title': 'Linen Tote Bag', 'price': '24'},
+    {'title': 'No URL'},
+    {'url': 'https://www.etsy.com/listing/2', 'title': 'Boho Mug', 'reviews_count': 'n/a'},
+    {'url': 'https://www.etsy.com/listing/3', 'title': 'Gold Ring', 'listing_date': '2024-03-01T10:00:00Z'}
+]
+
+def _ndjson(tmp_path, records):
+    path = tmp_path / 'listings.ndjson'
+    lines = [json.dumps(record) for record in records]
+    path.write_text('\n'.join(lines[:2] + ['{not json'] + lines[2:]) + '\n')
+    return str(path)
+
+def test_normalize_listing():
+    product = normalize_listing(LISTINGS[0])
+
+    assert product.price == 1200.5 and product.tags == ['tote', 'linen']
+    assert normalize_listing(LISTINGS[2]) is None
+    assert normalize_listing(LISTINGS[3]).reviews_count == 0
+    assert normalize_listing(LISTINGS[4]).listing_date.isoformat() == '2024-03-01T10:00:00'
+
+def test_ndjson_dump_is_upserted_once_per_listing(db, tmp_path):
+    stats = ingest_listings(_ndjson(tmp_path, LISTINGS), chunk_size=2)
+
+    assert stats['records'] == 6
+    assert (stats['skipped'], stats['duplicates'], stats['upserted']) == (2, 1, 3)
+    products = db[Config.COLLECTION_PRODUCTS]
+    assert products.count_documents({}) == 3
+    assert products.find_one({'url': 'https://etsy.com/listing/1'})['title'] == 'Linen Tote Bag'
+
+def test_rerun_resumes_after_the_checkpoint(db, tmp_path):
+    path = _ndjson(tmp_path, LISTINGS)
+    ingest_listings(path, chunk_size=2)
+
+    assert ingest_listings(path, chunk_size=2)['records'] == 0
+    assert ListingIngestion(path, resume=False).run()['records'] == 6
+    assert db[Config.COLLECTION_PRODUCTS].count_documents({}) == 3
+
+def test_csv_dump_resumes_by_record_count(db, tmp_path):
+    path = tmp_path / 'listings.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['url', 'title', 'description'])
+        writer.writeheader()
+        writer.writerow({'url': 'https://www.etsy.com/listing/1', 'title': 'Linen Tote', 'description': 'Two\nlines'})
+        writer.writerow({'url': 'https://www.etsy.com/listing/2', 'title': 'Boho Mug'})
+    ingestion = ListingIngestion(str(path), chunk_size=1)
+    ingestion.save_checkpoint({'offset': 0, 'records': 1})
+
+    assert ingestion.run()['records'] == 1
+    assert db[Config.COLLECTION_PRODUCTS].distinct('title') == ['Boho Mug']
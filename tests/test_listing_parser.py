@@ -0,0 +1,51 @@
+import os
+import shutil
+import pytest
+from src.config import Config
+from src.services.listing_parser import FIXTURES_DIR, ingest_directory, parse_listing_file, parse_listing_html
+
+@pytest.mark.parametrize('name, expected', [
+    ('ceramic_mug.html', {'title': 'Handmade Ceramic Mug - Coffee Lover Gift', 'price': 28.5, 'currency': 'USD',
+                          'rating': 4.8, 'reviews_count': 45, 'store_name': 'ArtisanCeramics'}),
+    ('gold_ring.html', {'title': 'Dainty Gold Stacking Ring', 'price': 1049.99, 'currency': 'USD',
+                        'rating': 5.0, 'reviews_count': 87, 'store_name': 'TinyGoldStudio'}),
+    ('linen_tote.html', {'title': 'Personalised Linen Tote Bag, Embroidered Initial Tote', 'price': 24.0,
+                         'currency': 'GBP', 'rating': 4.9, 'reviews_count': 1203, 'store_name': 'StitchAndLinen'})
+])
+def test_fixture_pages_parse(name, expected):
+    path, fields = parse_listing_file(os.path.join(FIXTURES_DIR, name))
+
+    assert path.endswith(name)
+    assert {key: fields.get(key) for key in expected} == expected
+    assert fields['url'].startswith('https://www.etsy.com/')
+    assert fields['images'] and fields['tags']
+
+def test_markup_fills_what_structured_data_lacks():
+    html = """
+    <html><head>
+      <meta property="og:title" content="Boho Mug">
+      <link rel="canonical" href="https://www.etsy.com/listing/42/boho-mug">
+    </head><body>
+      <h1 data-buy-box-listing-title="true">Ignored, og:title wins</h1>
+      <div data-selector="price-only"><p><span class="wt-screen-reader-only">Price:</span>€12.50</p></div>
+      <span>4.5 out of 5 stars</span> <span>12 reviews</span>
+      <a href="https://www.etsy.com/shop/MugShop?ref=x">MugShop</a>
+    </body></html>
+    """
+    fields = parse_listing_html(html)
+
+    assert fields['title'] == 'Boho Mug'
+    assert fields['url'] == 'https://www.etsy.com/listing/42/boho-mug'
+    assert (fields['price'], fields['currency']) == (12.5, 'EUR')
+    assert (fields['rating'], fields['reviews_count'], fields['store_name']) == (4.5, 12, 'MugShop')
+
+def test_directory_is_parsed_across_processes_and_upserted(db, tmp_path):
+    for name in os.listdir(FIXTURES_DIR):
+        shutil.copy(os.path.join(FIXTURES_DIR, name), tmp_path / name)
+    (tmp_path / 'empty.html').write_text('<html></html>')
+    (tmp_path / 'notes.txt').write_text('not a listing')
+
+    stats = ingest_directory(str(tmp_path), workers=2)
+
+    assert stats == {'pages': 4, 'skipped': 1, 'products': 3}
+    assert db[Config.COLLECTION_PRODUCTS].find_one({'url': 'https://etsy.com/listing/987654321'})['currency'] == 'GBP'
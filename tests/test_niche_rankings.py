@@ -0,0 +1,56 @@
+from src.config import Config
+from src.services.niche_rankings import (
+    RANKING_OPPORTUNITIES, RANKING_TRENDING, calculate_growth_rate, calculate_opportunity_score,
+    get_ranking, rebuild_rankings, remove_niche_from_rankings, update_rankings_for_niche
+)
+
+def _niche(db, name, first, last, category='home'):
+    data = {'name': name, 'category': category, 'trend_data': {'search_volume_trend': [first, last]},
+            'demand_score': 60, 'competition_score': 40}
+    data['_id'] = db[Config.COLLECTION_NICHES].insert_one(data).inserted_id
+    return data
+
+def _names(ranking, category=None):
+    return [entry['name'] for entry in get_ranking(ranking, category)]
+
+def test_scores():
+    assert calculate_growth_rate([100, 'n/a', 150]) == 50.0
+    assert calculate_growth_rate([0, 10]) == 0.0
+    assert calculate_opportunity_score(80, 20) == 80.0
+    assert calculate_opportunity_score(80, None) is None
+
+def test_rebuild_ranks_the_top_k_per_category(db):
+    _niche(db, 'candles', 100, 300)
+    _niche(db, 'mugs', 100, 200)
+    _niche(db, 'rings', 100, 400, category='jewelry')
+    _niche(db, 'lamps', 100, 90)
+
+    rebuild_rankings(top_k=2)
+
+    assert _names(RANKING_TRENDING) == ['rings', 'candles']
+    assert _names(RANKING_TRENDING, 'home') == ['candles', 'mugs']
+    assert _names(RANKING_TRENDING, 'jewelry') == ['rings']
+    assert get_ranking(RANKING_OPPORTUNITIES, 'home')[0]['score'] == 60.0
+
+def test_niche_that_sinks_is_replaced_by_the_next_best(db):
+    candles = _niche(db, 'candles', 100, 300)
+    _niche(db, 'mugs', 100, 200)
+    _niche(db, 'lamps', 100, 150)
+    rebuild_rankings(top_k=2)
+
+    candles['trend_data']['search_volume_trend'] = [100, 50]
+    db[Config.COLLECTION_NICHES].replace_one({'_id': candles['_id']}, candles)
+    update_rankings_for_niche(candles, top_k=2)
+
+    assert _names(RANKING_TRENDING, 'home') == ['mugs', 'lamps']
+
+def test_removed_niche_frees_its_slot(db):
+    candles = _niche(db, 'candles', 100, 300)
+    _niche(db, 'mugs', 100, 200)
+    _niche(db, 'lamps', 100, 150)
+    rebuild_rankings(top_k=2)
+
+    db[Config.COLLECTION_NICHES].delete_one({'_id': candles['_id']})
+    remove_niche_from_rankings(candles['_id'], top_k=2)
+
+    assert _names(RANKING_TRENDING) == ['mugs', 'lamps']
@@ -0,0 +1,75 @@
+import statistics
+from src.config import Config
+from src.models.niche_stats import NicheStats, price_bucket
+from src.models.product import Product
+
+PRODUCTS = [
+    ('https://etsy.com/listing/1', 12.0, 40, 4.5),
+    ('https://etsy.com/listing/2', 30.0, 10, 5.0),
+    ('https://etsy.com/listing/3', 75.0, None, 4.0),
+    ('https://etsy.com/listing/4', 150.0, 2, None)
+]
+
+def _product(url, price, sales, rating, niche='totes'):
+    return Product(title='Tote', url=url, store_name='LinenShop', price=price, sales_estimate=sales, rating=rating, niche=niche)
+
+def _seed(niche='totes'):
+    products = [_product(*row, niche=niche) for row in PRODUCTS]
+    Product.bulk_upsert_by_url(products)
+    return products
+
+def test_price_buckets_match_the_pipeline_boundaries():
+    assert [price_bucket(price) for price in (0, 24.99, 25, 99.99, 100, 1000)] == [
+        'under_25', 'under_25', '25_50', '50_100', 'over_100', 'over_100'
+    ]
+
+def test_market_analysis_is_aggregated_in_the_database(db):
+    _seed()
+    _product('https://etsy.com/listing/5', 500.0, 1, 1.0, niche='mugs').save()
+
+    market = Product.aggregate_market('totes', top_limit=2)
+    price, sales = market['price_analysis'], market['sales_analysis']
+    prices = [row[1] for row in PRODUCTS]
+
+    assert price['product_count'] == 4
+    assert price['average_price'] == round(statistics.mean(prices), 2)
+    assert price['price_stddev'] == round(statistics.pstdev(prices), 2)
+    assert price['price_range'] == {'min': 12.0, 'max': 150.0}
+    assert price['price_distribution'] == {'under_25': 25.0, '25_50': 25.0, '50_100': 25.0, 'over_100': 25.0}
+    assert sales['total_sales_estimate'] == 52
+    assert sales['estimated_revenue'] == 12.0 * 40 + 30.0 * 10 + 150.0 * 2
+    assert sales['average_rating'] == 4.5
+    assert [product.price for product in market['top_selling']] == [12.0, 30.0]
+
+def _comparable(stats):
+    # The price range only widens on writes; rebuild narrows it again
+    stats = {key: value for key, value in stats.items() if key not in ('_id', 'updated_at')}
+    stats['price'] = {key: value for key, value in stats['price'].items() if key not in ('min', 'max')}
+    stats['price_histogram'] = {label: count for label, count in stats['price_histogram'].items() if count}
+    return stats
+
+def test_running_stats_match_a_rebuild_after_writes(db):
+    products = _seed()
+    products[0].price = 60.0
+    products[0].save()
+    products[1].niche = 'bags'
+    products[1].save()
+    products[2].delete()
+    Product.bulk_upsert_by_url([_product('https://www.etsy.com/uk/listing/4/tote', 20.0, 8, 3.5)])
+
+    for niche in ('totes', 'bags'):
+        running = NicheStats.get(niche)
+        assert _comparable(running) == _comparable(NicheStats.rebuild(niche))
+    assert NicheStats.get('totes')['product_count'] == 2
+
+def test_stats_writes_bump_the_niche_for_sync(db):
+    niches = db[Config.COLLECTION_NICHES]
+    niches.insert_one({'name': 'totes', 'updated_at': None})
+    _seed()
+
+    assert niches.find_one({'name': 'totes'})['updated_at'] is not None
+
+def test_rewriting_unchanged_figures_updates_nothing():
+    product = {'niche': 'totes', 'price': 5.0, 'sales_estimate': 3}
+
+    assert NicheStats.updates([(product, dict(product))]) == {}
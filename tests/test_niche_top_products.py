@@ -0,0 +1,47 @@
+from src.config import Config
+from src.models.niche_top_products import NicheTopProducts
+from src.models.product import Product
+
+def _product(n, sales):
+    return Product(title=f'Tote {n}', url=f'https://etsy.com/listing/{n}', store_name='LinenShop',
+                   price=20.0, sales_estimate=sales, niche='totes')
+
+def _listed(db):
+    return [entry['title'] for entry in db[Config.COLLECTION_NICHES].find_one({'name': 'totes'})['top_products']]
+
+def _computed():
+    return [entry['title'] for entry in NicheTopProducts.compute('totes')]
+
+def test_list_tracks_the_top_sellers_through_writes(db, monkeypatch):
+    monkeypatch.setattr(Config, 'NICHE_TOP_PRODUCTS', 3)
+    db[Config.COLLECTION_NICHES].insert_one({'name': 'totes', 'top_products': []})
+    products = [_product(n, sales) for n, sales in enumerate([50, 40, 30, 20, 10])]
+    Product.bulk_upsert_by_url(products)
+    assert _listed(db) == ['Tote 0', 'Tote 1', 'Tote 2'] == _computed()
+
+    # Pushed in; the old floor falls off without a rebuild
+    Product.bulk_upsert_by_url([_product(5, 45)])
+    assert _listed(db) == ['Tote 0', 'Tote 5', 'Tote 1'] == _computed()
+
+    # A listed product sinks below the floor: Tote 2 takes its slot
+    Product.bulk_upsert_by_url([_product(0, 1)])
+    assert _listed(db) == ['Tote 5', 'Tote 1', 'Tote 2'] == _computed()
+
+    # A listed product leaves the niche
+    stored = Product.find_by_id(str(products[1]._id))
+    stored.niche = 'bags'
+    stored.save()
+    assert _listed(db) == ['Tote 5', 'Tote 2', 'Tote 3'] == _computed()
+
+    stored = Product.find_by_id(str(products[2]._id))
+    stored.delete()
+    assert _listed(db) == ['Tote 5', 'Tote 3', 'Tote 4'] == _computed()
+
+def test_unlisted_writes_leave_the_niche_untouched(db, monkeypatch):
+    monkeypatch.setattr(Config, 'NICHE_TOP_PRODUCTS', 2)
+    db[Config.COLLECTION_NICHES].insert_one({'name': 'totes', 'top_products': []})
+    Product.bulk_upsert_by_url([_product(n, sales) for n, sales in enumerate([50, 40, 30])])
+    before = db[Config.COLLECTION_NICHES].find_one({'name': 'totes'})
+
+    assert NicheTopProducts.apply([({'_id': 'other', 'niche': 'totes'}, None)]) == []
+    assert db[Config.COLLECTION_NICHES].find_one({'name': 'totes'}) == before
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from src.config import Config
+from src.models.niche import Niche
+from src.models.product import Product
+from src.models.review_stats import ReviewStats, SCOPE_NICHE
+from src.services.sync import migrate_names
+
+def test_upsert_returns_the_stored_niche_for_a_repeated_name(db):
+    Niche.ensure_indexes()
+    first = Niche(name='Boho Mugs').upsert()
+    second = Niche(name=' boho mugs ').upsert()
+
+    assert second._id == first._id
+    assert db[Config.COLLECTION_NICHES].count_documents({}) == 1
+
+def test_find_by_name_matches_the_exact_normalized_name(db):
+    Niche(name='wall art').upsert()
+
+    assert Niche.find_by_name('art') is None
+    assert Niche.find_by_name(' Wall Art ').name == 'wall art'
+    assert Niche.find_by_name('c++ mug') is None
+
+def test_search_by_name_escapes_the_query(db):
+    Niche(name='c++ mug').upsert()
+    Niche(name='wall art').upsert()
+
+    assert [data['name'] for data in Niche.search_by_name('C++', as_json=True)] == ['c++ mug']
+    assert [niche.name for niche in Niche.search_by_name('art')] == ['wall art']
+    assert Niche.search_by_name('(') == []
+
+def test_migrate_names_merges_niches_that_differ_by_case(db):
+    niches = db[Config.COLLECTION_NICHES]
+    now = datetime.utcnow()
+    niches.insert_many([
+        {'name': 'Boho Mugs', 'description': 'old', 'updated_at': now - timedelta(days=2)},
+        {'name': 'boho mugs ', 'description': 'new', 'updated_at': now - timedelta(days=1)},
+        {'name': 'rings', 'description': 'untouched', 'updated_at': now}
+    ])
+    db[Config.COLLECTION_PRODUCTS].insert_many([
+        {'title': 'Mug', 'url': 'https://example.com/mug', 'niche': 'Boho Mugs', 'price': 20.0, 'sales_estimate': 5},
+        {'title': 'Cup', 'url': 'https://example.com/cup', 'niche': 'boho mugs', 'price': 30.0, 'sales_estimate': 9}
+    ])
+    db[Config.COLLECTION_KEYWORDS].insert_one({'keyword': 'boho mug', 'niche': ' Boho Mugs'})
+
+    report = migrate_names()
+
+    assert report == {'products': 1, 'keywords': 1, 'niches': 1, 'merged': 1}
+    assert sorted(niches.distinct('name')) == ['boho mugs', 'rings']
+    assert Niche.find_by_name('boho mugs').description == 'new'
+    assert db[Config.COLLECTION_KEYWORDS].find_one()['niche'] == 'boho mugs'
+    assert [product.title for product in Product.find_by_niche('Boho Mugs')] == ['Cup', 'Mug']
+    stats = db[Config.COLLECTION_NICHE_STATS]
+    assert stats.distinct('_id') == ['boho mugs']
+    assert stats.find_one()['product_count'] == 2
+
+def test_find_detail_reads_stats_and_sentiment_with_the_niche(db):
+    niche = Niche(name='boho mugs').upsert()
+    Product(title='Mug', url='https://etsy.com/listing/1', store_name='Shop', price=20.0,
+            sales_estimate=5, niche='boho mugs').save()
+    db[Config.COLLECTION_REVIEW_STATS].insert_one(
+        {'_id': 'niche:boho mugs', 'review_count': 2, 'labels': {'positive': 1, 'negative': 1}}
+    )
+
+    detail, sentiment = Niche.find_detail(str(niche._id))
+
+    assert detail.to_dict() == Niche.find_by_id(str(niche._id)).to_dict()
+    assert detail.price_analysis['average_price'] == 20.0
+    assert sentiment == ReviewStats.get(SCOPE_NICHE, 'boho mugs')
+    assert sentiment['distribution']['positive'] == 50.0
+
+def test_niche_detail_route(client):
+    niche = Niche(name='rings').upsert()
+
+    response = client.get(f'/api/niches/{niche._id}')
+    assert response.status_code == 200
+    assert response.get_json()['niche']['name'] == 'rings'
+    assert response.get_json()['sentiment_analysis']['review_count'] == 0
+    assert client.get('/api/niches/0123456789abcdef01234567').status_code == 404
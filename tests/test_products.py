@@ -0,0 +1,101 @@
+import pytest
+from datetime import datetime
+from mongomock.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from src.config import Config
+from src.models.niche_stats import NicheStats
+from src.models.product import Product, listing_url, normalize_url, url_hash
+from src.services.sync import migrate_url_hashes
+
+@pytest.mark.parametrize('url', [
+    'https://www.etsy.com/listing/987654321/personalised-linen-tote-bag',
+    'https://www.etsy.com/uk/listing/987654321/personalised-linen-tote-bag?ga_search_query=tote',
+    'http://etsy.com/en-gb/listing/987654321#reviews',
+    'etsy.com/listing/987654321/'
+])
+def test_etsy_listing_urls_share_one_canonical_url(url):
+    assert normalize_url(url) == 'https://etsy.com/listing/987654321'
+    assert listing_url(url) == 'https://etsy.com/listing/987654321'
+
+def test_other_hosts_keep_their_query():
+    assert normalize_url('https://www.example.com/p?id=1#top') == 'https://example.com/p?id=1'
+    assert url_hash('https://example.com/p?id=1') != url_hash('https://example.com/p?id=2')
+    assert listing_url('https://example.com/listing/987654321') is None
+
+def _product(url, price=20.0, title='Linen tote'):
+    return Product(title=title, url=url, store_name='LinenShop', price=price, sales_estimate=10, niche='totes')
+
+def test_bulk_upsert_by_url_deduplicates_url_variants(db):
+    Product.ensure_indexes()
+    Product.bulk_upsert_by_url([
+        _product('https://www.etsy.com/uk/listing/987654321/tote', 10.0),
+        _product('https://etsy.com/listing/987654321?ref=shop', 30.0)
+    ])
+    Product.bulk_upsert_by_url([_product('https://www.etsy.com/listing/987654321/linen-tote', 40.0)])
+
+    stored = list(db[Config.COLLECTION_PRODUCTS].find())
+    assert len(stored) == 1
+    assert stored[0]['price'] == 40.0
+    stats = NicheStats.get('totes')
+    assert stats['product_count'] == 1
+    assert stats['price']['sum'] == 40.0
+
+def test_conflict_redo_survives_another_concurrent_insert(db, monkeypatch):
+    Product.ensure_indexes()
+    url = 'https://etsy.com/listing/123'
+    bulk_write = Collection.bulk_write
+    find_one_and_update = Collection.find_one_and_update
+    redo_calls = []
+
+    def racing_bulk_write(self, operations, **kwargs):
+        if self.name == Config.COLLECTION_PRODUCTS:
+            # Another worker inserts the URL after this batch read it as new
+            monkeypatch.setattr(Collection, 'bulk_write', bulk_write)
+            _product(url, 10.0, 'Theirs').save()
+        return bulk_write(self, operations, **kwargs)
+
+    def racing_find_one_and_update(self, *args, **kwargs):
+        if self.name == Config.COLLECTION_PRODUCTS:
+            redo_calls.append(args)
+            if len(redo_calls) == 1:
+                # And yet another one inserts it again before the redo
+                raise DuplicateKeyError('E11000 duplicate key error')
+        return find_one_and_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, 'bulk_write', racing_bulk_write)
+    monkeypatch.setattr(Collection, 'find_one_and_update', racing_find_one_and_update)
+    Product.bulk_upsert_by_url([_product(url, 30.0, 'Ours')])
+
+    stored = list(db[Config.COLLECTION_PRODUCTS].find())
+    assert [data['title'] for data in stored] == ['Ours']
+    assert len(redo_calls) == 2
+    stats = NicheStats.get('totes')
+    assert stats['product_count'] == 1
+    assert stats['price']['sum'] == 30.0
+
+def test_save_and_delete_return_pymongo_results(db):
+    product = _product('https://etsy.com/listing/123')
+    assert product.save().upserted_id == product._id
+    result, previous = product.save_with_previous()
+    assert result.matched_count == 1
+    assert previous['niche'] == 'totes'
+
+    assert product.delete().deleted_count == 1
+    result, previous = product.delete_with_previous()
+    assert result.deleted_count == 0
+    assert previous is None
+
+def test_migrate_url_hashes_merges_products_that_now_collide(db):
+    products = db[Config.COLLECTION_PRODUCTS]
+    older = _product('https://www.etsy.com/uk/listing/987654321/tote', 10.0, 'Older')
+    older.save()
+    newer = _product('https://www.etsy.com/listing/987654321', 30.0, 'Newer')
+    newer.save()
+    # Hashes as stored before locale prefixes and other hosts' queries were handled
+    products.update_one({'_id': older._id}, {'$set': {'url_hash': 'legacy', 'updated_at': datetime(2024, 1, 1)}})
+    products.insert_one({'title': 'Unhashed', 'url': 'https://example.com/p?id=1'})
+
+    assert migrate_url_hashes() == {'rehashed': 1, 'merged': 1}
+    assert sorted(products.distinct('title')) == ['Newer', 'Unhashed']
+    assert products.find_one({'title': 'Unhashed'})['url_hash'] == url_hash('https://example.com/p?id=1')
+    assert NicheStats.get('totes')['product_count'] == 1
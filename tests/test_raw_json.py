@@ -0,0 +1,75 @@
+import json
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from src.config import Config
+from src.models.keyword import Keyword
+from src.models.niche import Niche
+from src.models.product import Product
+from src.services.raw_json import encode, find_documents, json_response
+
+STORED = datetime(2024, 3, 1, 12, 30)
+
+FULL = [
+    (Product, {'_id': ObjectId(), 'title': 'Boho mug', 'url': 'https://etsy.com/listing/1', 'store_name': 'MugShop',
+               'price': 24.0, 'currency': 'EUR', 'images': ['a.jpg'], 'tags': ['mug'], 'reviews_count': 3,
+               'listing_date': STORED, 'niche': ' Mugs ', 'sentiment_analysis': {'label': 'positive'},
+               'url_hash': 'not in to_dict', 'created_at': STORED, 'updated_at': STORED}),
+    (Niche, {'_id': ObjectId(), 'name': ' Boho Mugs', 'category': 'home', 'trend_data': {'direction': 'rising'},
+             'top_products': [{'title': 'Boho mug'}], 'created_at': STORED, 'updated_at': STORED}),
+    (Keyword, {'_id': ObjectId(), 'keyword': 'boho mug', 'search_volume': 50, 'related_keywords': ['mug'],
+               'niche': 'Mugs', 'price_range': {'min': 5}, 'last_updated': STORED, 'created_at': STORED})
+]
+
+# Missing, null and empty fields, with timestamps left over from when they were stored as ISO strings
+SPARSE = [
+    (Product, {'_id': ObjectId(), 'title': 'Boho mug', 'url': 'https://etsy.com/listing/1', 'store_name': 'MugShop',
+               'images': None, 'reviews_count': None, 'listing_date': '2024-03-01T12:30:00',
+               'created_at': '2024-03-01T12:30:00+00:00', 'updated_at': STORED}),
+    (Niche, {'_id': ObjectId(), 'name': 'mugs', 'visual_analysis': None, 'created_at': '2024-03-01T12:30:00',
+             'updated_at': STORED}),
+    (Keyword, {'_id': ObjectId(), 'keyword': 'Linen Tote ', 'related_keywords': None, 'seasonal_data': {},
+               'last_updated': '2024-03-01T12:30:00Z', 'created_at': STORED})
+]
+
+def _model_json(model, data):
+    return json.loads(json.dumps(model.from_dict(data).to_dict()))
+
+@pytest.mark.parametrize('model, data', FULL + SPARSE)
+def test_shapes_encode_like_the_models(model, data):
+    assert json.loads(encode(model.JSON_SHAPE(data))) == _model_json(model, data)
+
+def test_missing_timestamps_become_the_current_time():
+    before = datetime.utcnow()
+    shaped = Keyword.JSON_SHAPE({'_id': ObjectId(), 'keyword': 'boho mug', 'last_updated': 'not a date'})
+
+    assert before <= shaped['last_updated'] <= datetime.utcnow()
+    assert before <= shaped['created_at'] <= datetime.utcnow()
+
+def test_json_response_encodes_ids_and_datetimes():
+    key = ObjectId()
+    response = json_response({'_id': key, 'at': STORED, 'name': 'café'}, 201)
+
+    assert response.status_code == 201 and response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == {'_id': str(key), 'at': STORED.isoformat(), 'name': 'café'}
+    with pytest.raises(TypeError):
+        encode({'tags': {'mug'}})
+
+def test_find_documents_sorts_skips_and_limits(db):
+    keywords = db[Config.COLLECTION_KEYWORDS]
+    keywords.insert_many([{'keyword': f'mug {volume}', 'search_volume': volume, 'created_at': STORED} for volume in range(5)])
+
+    found = find_documents(keywords, Keyword.JSON_SHAPE, {'search_volume': {'$gte': 1}}, [('search_volume', -1)], 1, 2)
+
+    assert [data['search_volume'] for data in found] == [3, 2]
+    assert set(found[0]) == set(Keyword.JSON_SHAPE.fields)
+    assert find_documents(keywords, Keyword.JSON_SHAPE, {'keyword': 'boho mug'}) == []
+
+def test_keyword_search_route_returns_model_json(client):
+    keyword = Keyword(keyword='boho mug', search_volume=50, niche='mugs')
+    keyword.upsert()
+
+    body = client.get('/api/keywords/search?q=boho').get_json()
+
+    assert body['count'] == 1
+    assert body['results'][0] == _model_json(Keyword, Keyword.find_by_keyword('boho mug').to_document())
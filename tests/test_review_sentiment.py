@@ -0,0 +1,66 @@
+import pytest
+from bson import ObjectId
+from src.config import Config
+from src.models.product import Product
+from src.models.review import Review
+from src.models.review_stats import SCOPE_NICHE, SCOPE_PRODUCT, ReviewStats
+from src.services import review_sentiment, sentiment
+from src.services.review_sentiment import add_reviews, score_pending
+
+REVIEWS = [
+    'Love it, gorgeous and perfect!',
+    'Flimsy handle, not worth the price.',
+    'Terrible, arrived broken. Flimsy box.'
+]
+
+@pytest.fixture(autouse=True)
+def local_sentiment(monkeypatch):
+    monkeypatch.setattr(Config, 'SENTIMENT_POLICY', sentiment.POLICY_LOCAL)
+
+def test_reviews_are_stored_and_scored_once(db):
+    product_id = str(ObjectId())
+
+    assert len(add_reviews(product_id, REVIEWS + ['  '], niche='totes')) == 3
+    assert add_reviews(product_id, [' Love it, gorgeous and perfect! '], niche='totes') == []
+
+    summary = ReviewStats.get(SCOPE_PRODUCT, product_id)
+    assert summary['review_count'] == 3
+    assert summary['distribution']['negative'] == 66.7
+    assert summary['top_negative_terms'][0] == {'term': 'flimsy', 'count': 2}
+    assert {'term': 'not worth', 'count': 1} in summary['top_negative_terms']
+    assert ReviewStats.get(SCOPE_NICHE, 'totes') == summary
+    assert ReviewStats.get_many(SCOPE_PRODUCT, [product_id, 'missing']) == {product_id: summary}
+
+def test_failed_scores_are_retried_by_score_pending(db, monkeypatch):
+    monkeypatch.setattr(review_sentiment, 'analyze_sentiment_batch',
+                        lambda texts, policy=None: [{'error': 'throttled'} for _ in texts])
+    add_reviews('p1', REVIEWS)
+    assert ReviewStats.get(SCOPE_PRODUCT, 'p1')['review_count'] == 0
+
+    monkeypatch.setattr(review_sentiment, 'analyze_sentiment_batch', sentiment.analyze_sentiment_batch)
+    stats = score_pending(batch_size=2)
+
+    assert (stats['reviews'], stats['scored'], stats['batches']) == (3, 3, 2)
+    assert list(Review.unscored()) == []
+    assert ReviewStats.get(SCOPE_PRODUCT, 'p1')['review_count'] == 3
+
+def test_product_route_serves_the_stored_sentiment(client):
+    product = Product(title='Linen Tote', url='https://etsy.com/listing/1', store_name='LinenShop', niche='totes')
+    product.save()
+    product_id = str(product._id)
+
+    response = client.post(f'/api/{product_id}/reviews', json={'reviews': REVIEWS})
+    assert response.get_json()['scored'] == 3
+
+    response = client.get(f'/api/{product_id}')
+    assert response.status_code == 200
+    assert response.get_json()['sentiment_analysis']['review_count'] == 3
+    assert ReviewStats.get(SCOPE_NICHE, 'totes')['review_count'] == 3
+
+@pytest.mark.parametrize('product_id', ['not-an-id', str(ObjectId())])
+def test_unknown_products_are_not_found(client, product_id):
+    assert client.get(f'/api/{product_id}').status_code == 404
+    assert client.post(f'/api/{product_id}/reviews', json={'reviews': ['Nice']}).status_code == 404
+
+def test_reviews_must_be_strings(client):
+    assert client.post(f'/api/{ObjectId()}/reviews', json={'reviews': 'Nice'}).status_code == 400
@@ -0,0 +1,112 @@
+import math
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from src.config import Config
+from src.services.search_index import (
+    B, K1, KIND_NICHE, KIND_PRODUCT, SearchIndex, decode_varints, encode_varints, tokenize, weighted_terms
+)
+
+PRODUCTS = [
+    {'title': 'Boho ceramic mug', 'tags': ['mug', 'boho'], 'description': 'Handmade mug for coffee', 'niche': 'mugs', 'category': 'home', 'price': 24.0},
+    {'title': 'Linen tote bag', 'tags': ['tote', 'linen'], 'description': 'A boho tote', 'niche': 'totes', 'category': 'bags', 'price': 40.0},
+    {'title': 'Gold stacking ring', 'tags': ['ring'], 'description': 'Dainty and minimal', 'niche': 'rings', 'category': 'jewelry', 'price': 120.0},
+    {'title': 'Speckled mug', 'tags': ['mug'], 'description': 'Stoneware mug, dishwasher safe', 'niche': 'mugs', 'category': 'home', 'price': 18.0}
+]
+NICHES = [{'name': 'boho mugs', 'category': 'home', 'description': 'Mugs with a boho look'}]
+
+def _documents():
+    return [(KIND_PRODUCT, dict(data, _id=ObjectId())) for data in PRODUCTS] + \
+        [(KIND_NICHE, dict(data, _id=ObjectId())) for data in NICHES]
+
+def _reference(documents, query):
+    """BM25 scores computed the slow way"""
+    weighted = {str(data['_id']): weighted_terms(kind, data) for kind, data in documents}
+    average = sum(length for _, length in weighted.values()) / len(weighted)
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        matching = {key: counts[term] for key, (counts, _) in weighted.items() if term in counts}
+        idf = math.log(1 + (len(weighted) - len(matching) + 0.5) / (len(matching) + 0.5))
+        for key, tf in matching.items():
+            norm = K1 * (1 - B + B * weighted[key][1] / average)
+            scores[key] = scores.get(key, 0) + idf * tf * (K1 + 1) / (tf + norm)
+    return scores
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.documents = _documents()
+    index.load(index.documents)
+    return index
+
+def test_varints_round_trip():
+    values = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 31, 2 ** 34 - 1]
+    assert decode_varints(encode_varints(values)).tolist() == values
+
+def test_scores_match_bm25(index):
+    found = index.search('boho mug')
+    reference = _reference(index.documents, 'boho mug')
+
+    assert found['total'] == len(reference) == 4
+    assert {hit['id']: hit['score'] for hit in found['hits']} == pytest.approx(reference, rel=1e-4)
+    assert [hit['score'] for hit in found['hits']] == sorted((hit['score'] for hit in found['hits']), reverse=True)
+
+def test_filters_and_paging(index):
+    assert {hit['type'] for hit in index.search('boho', kinds=[KIND_NICHE])['hits']} == {KIND_NICHE}
+    assert index.search('mug', niche='Mugs')['total'] == 2
+    assert index.search('mug', category='home', max_price=20)['total'] == 1
+    assert index.search('boho tote', min_price=30)['total'] == 1
+    assert index.search('the and of')['total'] == 0
+
+    everything = index.search('mug boho tote')['hits']
+    assert index.search('mug boho tote', limit=2, offset=2)['hits'] == everything[2:4]
+
+def test_updates_and_deletes_survive_freezing_and_merging(index):
+    kind, mug = index.documents[0]
+    index.index_documents(kind, [dict(mug, title='Ceramic cup')])
+    index.remove([str(index.documents[2][1]['_id'])])
+    before = index.search('mug ring cup')
+
+    state = index._state
+    state.freeze()
+    state.merge()
+
+    assert index.search('mug ring cup') == before
+    assert index.search('ring')['total'] == 0
+    assert [hit['id'] for hit in index.search('cup')['hits']] == [str(mug['_id'])]
+    assert index.stats()['documents'] == 4 and index.stats()['segments'] == 1
+
+def test_build_and_catch_up_from_the_database(db):
+    products = db[Config.COLLECTION_PRODUCTS]
+    products.insert_many([dict(data, updated_at=datetime.utcnow() - timedelta(hours=1)) for data in PRODUCTS])
+    index = SearchIndex()
+    index.build()
+    assert index.search('mug')['total'] == 2
+
+    index._synced_at = datetime.utcnow() - timedelta(minutes=1)
+    products.insert_one({'title': 'Enamel camping mug', 'updated_at': datetime.utcnow()})
+    ring = products.find_one({'title': 'Gold stacking ring'})
+    products.delete_one({'_id': ring['_id']})
+    db[Config.COLLECTION_TOMBSTONES].insert_one({'collection': Config.COLLECTION_PRODUCTS, 'key': ring['_id'],
+                                                 'deleted_at': datetime.utcnow()})
+
+    assert index.catch_up() == 2
+    assert index.search('mug')['total'] == 3
+    assert index.search('ring')['total'] == 0
+
+def test_search_route(client, monkeypatch):
+    from src.models.product import Product
+    from src.routes import search as routes
+    index = SearchIndex()
+    monkeypatch.setattr(routes, 'search_index', index)
+    product = Product(title='Boho ceramic mug', url='https://etsy.com/listing/1', store_name='MugShop', price=24.0)
+    product.save()
+    index.load([(KIND_PRODUCT, product.to_document())])
+
+    body = client.get('/api/search?q=mug&type=products&max_price=30').get_json()
+
+    assert body['total'] == 1
+    assert body['results'][0]['product']['title'] == 'Boho ceramic mug'
+    assert client.get('/api/search').status_code == 400
+    assert client.get('/api/search?q=mug&type=users').status_code == 400
+    assert client.get('/api/search?q=mug&page=first').status_code == 400
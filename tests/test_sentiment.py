@@ -0,0 +1,58 @@
+import pytest
+from src.services import sentiment
+from src.services.sentiment import POLICY_AZURE, POLICY_LOCAL, POLICY_LOCAL_FIRST, negative_terms, score_batch, score_text
+
+@pytest.mark.parametrize('text, label', [
+    ('Absolutely love this mug, the glaze is gorgeous!', 'positive'),
+    ('Arrived broken and the seller was rude.', 'negative'),
+    ('It is not good.', 'negative'),
+    ('The mug holds coffee.', 'neutral'),
+    ('Gorgeous, stunning, beautiful, perfect, amazing print. Awful, flimsy, cracked, damaged frame.', 'mixed')
+])
+def test_labels(text, label):
+    assert score_text(text)['sentiment'] == label
+
+def test_scores_have_the_azure_shape():
+    result = score_text('Lovely and well made')
+
+    assert set(result) == {'sentiment', 'positive_score', 'neutral_score', 'negative_score'}
+    assert result['positive_score'] + result['neutral_score'] + result['negative_score'] == pytest.approx(1, abs=0.02)
+    assert score_batch(['good', 'bad']) == [score_text('good'), score_text('bad')]
+
+def test_boosters_caps_and_contrast_shift_the_score():
+    plain = score_text('The mug is good')['positive_score']
+
+    assert score_text('The mug is very good')['positive_score'] > plain
+    assert score_text('The mug is GOOD')['positive_score'] > plain
+    assert score_text('The mug is good!!')['positive_score'] > plain
+    assert score_text('The box was bad but the mug is great')['sentiment'] == 'positive'
+
+def test_negative_terms():
+    assert negative_terms('Flimsy clasp, not worth the price. Good packaging.') == ['flimsy', 'not worth']
+
+def test_local_first_sends_only_uncertain_texts_to_azure(monkeypatch):
+    sent = []
+    def azure(texts):
+        sent.extend(texts)
+        return [{'sentiment': 'negative', 'positive_score': 0.1, 'neutral_score': 0.1, 'negative_score': 0.8}
+                if text != 'fine' else {'error': 'throttled'} for text in texts]
+    monkeypatch.setattr(sentiment, '_azure_batch', azure)
+    texts = ['Absolutely love it, stunning and perfect!', 'meh', 'fine']
+
+    results = sentiment.analyze_sentiment_batch(texts, POLICY_LOCAL_FIRST, min_confidence=0.5)
+
+    assert sent == ['meh', 'fine']
+    assert results[0]['sentiment'] == 'positive'
+    assert results[1]['sentiment'] == 'negative'
+    assert results[2] == score_text('fine')
+    assert sentiment.analyze_sentiment_batch(['meh'], POLICY_LOCAL) == [score_text('meh')]
+    assert sentiment.analyze_sentiment_batch(['x'], POLICY_AZURE)[0]['sentiment'] == 'negative'
+
+def test_local_first_keeps_local_scores_when_azure_fails(monkeypatch):
+    def unavailable(texts):
+        raise RuntimeError('no credentials')
+    monkeypatch.setattr(sentiment, '_azure_batch', unavailable)
+
+    assert sentiment.analyze_sentiment_batch(['meh'], POLICY_LOCAL_FIRST) == [score_text('meh')]
+    with pytest.raises(ValueError):
+        sentiment.analyze_sentiment_batch(['meh'], 'remote')
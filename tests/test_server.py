@@ -0,0 +1,39 @@
+import pytest
+from src.config import Config
+
+pytest.importorskip('gunicorn')
+pytest.importorskip('aiohttp')
+pytest.importorskip('azure.ai.textanalytics')
+
+from src import server
+
+def test_worker_count_defaults_to_twice_the_cpus_plus_one(monkeypatch):
+    monkeypatch.setattr(Config, 'SERVER_WORKERS', 0)
+    monkeypatch.setattr(server.os, 'cpu_count', lambda: 4)
+    assert server.worker_count() == 9
+
+    monkeypatch.setattr(Config, 'SERVER_WORKERS', 3)
+    assert server.worker_count() == 3
+
+def test_server_preloads_the_app_and_installs_the_fork_hooks():
+    options = server.NicheCompassServer(server.app).cfg
+
+    assert options.preload_app is True
+    assert options.worker_class_str == 'gthread'
+    assert options.post_fork is server.post_fork
+    assert options.worker_exit is server.worker_exit
+
+def test_post_fork_reconnects_and_warms_the_worker(monkeypatch):
+    calls = []
+    for name, target in [('db', server.db_instance), ('http', server.http_client), ('azure', server.azure_runner),
+                         ('bus', server.invalidation_bus), ('autocomplete', server.autocomplete_index),
+                         ('search', server.search_index)]:
+        for method in ('connect', 'close', 'start', 'ensure_built', 'catch_up'):
+            if hasattr(target, method):
+                monkeypatch.setattr(target, method, lambda name=name, method=method: calls.append(f'{name}.{method}'))
+
+    server.post_fork(None, type('Worker', (), {'pid': 1})())
+
+    assert calls[0] == 'db.connect'
+    assert calls.index('azure.close') < calls.index('azure.start')
+    assert {'bus.start', 'autocomplete.ensure_built', 'search.ensure_built', 'search.catch_up'} <= set(calls)
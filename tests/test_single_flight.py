@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.services.single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def analyze(name):
+        calls.append(name)
+        release.wait(5)
+        return {'name': name}
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flight.do, 'mug', analyze, 'mug') for _ in range(8)]
+        while flight.in_flight() == 0:
+            pass
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert calls == ['mug']
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+def test_waiters_get_the_leaders_error_and_later_calls_run_again():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError('lookup failed')
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, 'mug', failing)
+        started.wait(5)
+        waiter = pool.submit(flight.do, 'mug', lambda: 'not run')
+        while flight._calls['mug'].waiters == 0:
+            pass
+        release.set()
+        for future in (leader, waiter):
+            with pytest.raises(ValueError):
+                future.result(5)
+
+    assert flight.do('mug', lambda: 'fresh') == 'fresh'
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+import pytest
+from src.config import Config
+from src.models.keyword import Keyword
+from src.models.timestamps import parse_datetime
+from src.services.sync import SyncExpired, changes_since, migrate_timestamps
+
+@pytest.fixture
+def settled(monkeypatch):
+    # Stored times are truncated to milliseconds, so a write from the same
+    # millisecond as the read would still wait for the next page
+    monkeypatch.setattr(Config, 'SYNC_SETTLE_SECONDS', -1)
+
+def _keywords(db, names, last_updated):
+    documents = []
+    for name in names:
+        data = Keyword(keyword=name, search_volume=10).to_document()
+        data['last_updated'] = last_updated
+        documents.append(data)
+    db[Config.COLLECTION_KEYWORDS].insert_many(documents)
+    return documents
+
+def _sync(since=None, limit=2):
+    """Follow next cursors until has_more is false; returns the pages"""
+    pages = [changes_since('keywords', parse_datetime(since), None, limit)]
+    while pages[-1]['has_more']:
+        cursor = pages[-1]['next']
+        pages.append(changes_since('keywords', parse_datetime(cursor['since']), cursor['after'], limit))
+    return pages
+
+def test_parse_datetime_reads_offsets_as_naive_utc():
+    assert parse_datetime('2024-03-01T12:00:00+02:00') == datetime(2024, 3, 1, 10)
+    assert parse_datetime('2024-03-01T12:00:00Z') == datetime(2024, 3, 1, 12)
+    assert parse_datetime('yesterday') is None
+
+def test_pages_resume_exactly_after_documents_sharing_a_timestamp(db, settled):
+    hour_ago = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    _keywords(db, ['a', 'b', 'c', 'd', 'e'], hour_ago)
+    _keywords(db, ['f'], hour_ago + timedelta(minutes=1))
+
+    pages = _sync()
+    synced = [document['keyword'] for page in pages for document in page['documents']]
+
+    assert len(pages) == 3 and [len(page['documents']) for page in pages] == [2, 2, 2]
+    assert sorted(synced[:5]) == ['a', 'b', 'c', 'd', 'e'] and synced[5] == 'f'
+    assert pages[-1]['next']['after'] is None
+    assert _sync(pages[-1]['next']['since'])[0]['documents'] == []
+
+def test_deletions_after_since_are_reported(db, settled):
+    since = datetime.utcnow() - timedelta(seconds=1)
+    kept = Keyword(keyword='boho mug').upsert()
+    deleted = Keyword(keyword='linen tote').upsert()
+    deleted.delete()
+
+    page = _sync(since.isoformat(), limit=10)[0]
+
+    assert [document['keyword'] for document in page['documents']] == ['boho mug']
+    assert page['documents'][0]['_id'] == kept._id
+    assert page['deleted'] == [str(deleted._id)]
+
+def test_writes_inside_the_settle_window_wait_for_a_later_sync(db):
+    Keyword(keyword='boho mug').upsert()
+
+    page = changes_since('keywords')
+
+    assert page['documents'] == []
+    assert parse_datetime(page['next']['since']) <= datetime.utcnow() - timedelta(seconds=Config.SYNC_SETTLE_SECONDS)
+
+def test_a_since_older_than_the_tombstones_must_resync(db):
+    expired = datetime.utcnow() - timedelta(days=Config.TOMBSTONE_RETENTION_DAYS + 1)
+
+    with pytest.raises(SyncExpired):
+        changes_since('keywords', expired)
+    # Mid-pass cursors carry a document's timestamp, which may be that old
+    assert changes_since('keywords', expired, 'linen tote')['documents'] == []
+
+def test_sync_route(client):
+    assert client.get('/api/sync/users').status_code == 404
+    assert client.get('/api/sync/keywords?since=yesterday').status_code == 400
+    assert client.get('/api/sync/keywords?limit=many').status_code == 400
+
+    expired = (datetime.utcnow() - timedelta(days=Config.TOMBSTONE_RETENTION_DAYS + 1)).isoformat()
+    response = client.get(f'/api/sync/keywords?since={expired}')
+    assert response.status_code == 410 and response.get_json()['resync'] is True
+
+    body = client.get('/api/sync/products').get_json()
+    assert (body['collection'], body['count'], body['has_more']) == ('products', 0, False)
+
+def test_migrate_timestamps_converts_iso_strings(db):
+    db[Config.COLLECTION_KEYWORDS].insert_one({'keyword': 'boho mug', 'last_updated': '2024-03-01T12:00:00+00:00',
+                                               'created_at': datetime(2024, 1, 1)})
+
+    assert migrate_timestamps()[Config.COLLECTION_KEYWORDS] == 1
+    assert db[Config.COLLECTION_KEYWORDS].find_one()['last_updated'] == datetime(2024, 3, 1, 12)
@@ -0,0 +1,69 @@
+import pytest
+from src.config import Config
+from src.models.keyword import Keyword
+from src.models.product import Product
+from src.models.user import User, update_key
+from src.services import tracked_refresh
+from src.services.tracked_refresh import refresh_tracked
+from src.services.user_cache import user_cache
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+def _user(name, keywords=(), niches=()):
+    user = User(username=name, email=f'{name}@example.com', tracked_keywords=list(keywords), favorite_niches=list(niches))
+    user.save()
+    return user
+
+def test_update_keys_keep_distinct_names_apart():
+    names = ['gold.ring', 'gold%2Ering', '$ring', 'ring']
+
+    assert len({update_key(name) for name in names}) == 4
+    assert not any('.' in update_key(name) or update_key(name).startswith('$') for name in names)
+
+def test_each_tracked_keyword_is_refreshed_once_for_all_its_followers(db, monkeypatch):
+    looked_up = []
+    def market(keyword):
+        looked_up.append(keyword)
+        if keyword == 'linen tote':
+            return None
+        return {'competition_level': 'high', 'price_range': {'min': 5, 'max': 50, 'avg': 20}}
+    monkeypatch.setattr(tracked_refresh, 'keyword_market_data', market)
+    Keyword(keyword='boho mug', competition_level='low', price_range={'min': 5, 'max': 50, 'avg': 20}).upsert()
+    Keyword(keyword='linen tote', competition_level='low').upsert()
+    maya = _user('maya', ['Boho Mug', 'gold.ring'])
+    sam = _user('sam', ['boho mug ', 'linen tote'])
+
+    report = refresh_tracked(batch_size=2, workers=2)['keywords']
+
+    assert sorted(looked_up) == ['boho mug', 'gold.ring', 'linen tote']
+    assert (report['users_following'], report['distinct'], report['refreshes_saved']) == (4, 3, 1)
+    assert (report['refreshed'], report['created'], report['changed'], report['unavailable']) == (1, 1, 1, 1)
+    assert Keyword.find_by_keyword('boho mug').competition_level == 'high'
+    assert Keyword.find_by_keyword('gold.ring') is not None
+
+    maya, sam = User.find_by_id(maya._id), User.find_by_id(sam._id)
+    assert maya.tracked_keyword_updates['Boho Mug']['changes'] == {'competition_level': 'high'}
+    assert maya.tracked_keyword_updates['Boho Mug']['previous'] == {'competition_level': 'low'}
+    assert maya.tracked_keyword_updates[update_key('gold.ring')]['previous'] is None
+    assert sam.tracked_keyword_updates[update_key('boho mug ')]['changes'] == {'competition_level': 'high'}
+    assert update_key('linen tote') not in sam.tracked_keyword_updates
+
+def test_favorite_niches_report_changed_stats(db):
+    Product(title='Linen Tote', url='https://etsy.com/listing/1', store_name='LinenShop',
+            price=20.0, sales_estimate=5, niche='totes').save()
+    db[Config.COLLECTION_NICHES].insert_one({'name': 'totes'})
+    db[Config.COLLECTION_NICHE_STATS].delete_many({})
+    maya = _user('maya', niches=['Totes', 'mugs'])
+
+    report = refresh_tracked()['niches']
+
+    assert (report['distinct'], report['refreshed'], report['changed']) == (2, 2, 1)
+    update = User.find_by_id(maya._id).favorite_niche_updates['Totes']
+    assert (update['product_count'], update['average_price']) == (1, 20.0)
+    assert update['previous'] == {'product_count': 0, 'average_price': None}
+    assert update['top_product']['title'] == 'Linen Tote'
+    assert refresh_tracked()['niches']['changed'] == 0
@@ -0,0 +1,57 @@
+import math
+import numpy as np
+from src.config import Config
+from src.services.trend_analytics import analyze_series, compute_trend_metrics, pack_series, run_trend_analytics
+
+SERIES = [
+    [100, 110, 120, 130, 140, 150, 160],
+    [500, 480, 470, 450, 420, 400],
+    [100 + 50 * math.sin(2 * math.pi * month / 12) for month in range(36)],
+    [10, float('nan'), 30, 40],
+    [7, 7],
+    []
+]
+
+def test_pack_series_right_aligns_into_the_window():
+    matrix, lengths = pack_series([[1, 2, 3], list(range(50)), []], window=4)
+
+    assert lengths.tolist() == [3, 4, 0]
+    assert np.isnan(matrix[0, 0]) and matrix[0, 1:].tolist() == [1, 2, 3]
+    assert matrix[1].tolist() == [46, 47, 48, 49]
+    assert np.isnan(matrix[2]).all()
+
+def test_batch_metrics_match_each_series_alone():
+    matrix, lengths = pack_series(SERIES)
+    metrics = compute_trend_metrics(matrix, lengths)
+
+    for i, values in enumerate(SERIES):
+        single = analyze_series(values)
+        for name, batch_values in metrics.items():
+            batch = batch_values[i]
+            if isinstance(batch, np.floating) and np.isnan(batch):
+                assert single[name] is None
+            else:
+                assert single[name] == (round(float(batch), 4) if isinstance(batch, np.floating) else batch)
+
+def test_series_are_classified():
+    rising, declining, seasonal, gappy, short, empty = (analyze_series(values) for values in SERIES)
+
+    assert rising['growth_rate'] == 60.0 and rising['trend_direction'] == 'rising'
+    assert declining['trend_direction'] == 'declining'
+    assert seasonal['seasonality'] == 'seasonal'
+    assert gappy['growth_rate'] == 300.0
+    assert short['seasonality'] == 'insufficient_data'
+    assert empty['growth_rate'] == 0.0 and empty['moving_average_short'] is None
+
+def test_job_writes_metrics_back_to_niches(db):
+    niches = db[Config.COLLECTION_NICHES]
+    niches.insert_many([
+        {'name': 'candles', 'trend_data': {'search_volume_trend': [100, 110, 120, 130, 140, 150, 160]}},
+        {'name': 'mugs'}
+    ])
+
+    summary = run_trend_analytics()
+
+    assert summary[Config.COLLECTION_NICHES] == 1
+    assert niches.find_one({'name': 'candles'})['trend_data']['trend_direction'] == 'rising'
+    assert 'trend_data' not in niches.find_one({'name': 'mugs'})
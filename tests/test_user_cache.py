@@ -0,0 +1,72 @@
+import pytest
+from flask import Flask
+from bson import ObjectId
+from src.config import Config
+from src.models.user import User
+from src.services.user_cache import UserCache, user_cache
+
+def _document(name):
+    return {'_id': ObjectId(), 'username': name, 'email': f'{name}@example.com', 'tracked_keywords': []}
+
+def test_lookups_by_any_key_return_copies():
+    cache = UserCache(max_entries=10, ttl=60)
+    document = _document('maya')
+    cache.put(document)
+
+    found = cache.get('email', 'maya@example.com')
+    found['tracked_keywords'].append('boho mug')
+
+    assert cache.get('_id', document['_id']) == document
+    assert cache.get('username', 'maya')['tracked_keywords'] == []
+
+def test_entries_expire_and_are_evicted_least_recently_used():
+    cache = UserCache(max_entries=2, ttl=60)
+    first, second, third = _document('a'), _document('b'), _document('c')
+    cache.put(first)
+    cache.put(second)
+    cache.get('_id', first['_id'])
+    cache.put(third)
+
+    assert cache.get('username', 'b') is None
+    assert cache.get('username', 'a') and cache.get('username', 'c')
+
+    expired = UserCache(max_entries=2, ttl=-1)
+    expired.put(first)
+    assert expired.get('_id', first['_id']) is None
+
+def test_a_changed_email_no_longer_finds_the_old_entry():
+    cache = UserCache(max_entries=10, ttl=60)
+    document = _document('maya')
+    cache.put(document)
+    cache.put(dict(document, email='maya@new.example.com'))
+
+    assert cache.get('email', 'maya@example.com') is None
+    assert cache.get('email', 'maya@new.example.com')['username'] == 'maya'
+
+@pytest.fixture
+def cache():
+    user_cache.clear()
+    yield user_cache
+    user_cache.clear()
+
+def test_user_reads_are_served_from_the_cache_until_a_write(db, cache):
+    user = User(username='maya', email='maya@example.com')
+    user.save()
+    users = db[Config.COLLECTION_USERS]
+
+    assert User.find_by_id(user._id).username == 'maya'
+    users.update_one({'_id': user._id}, {'$set': {'username': 'changed elsewhere'}})
+    assert User.find_by_email('Maya@example.com').username == 'maya'
+
+    user.subscription_tier = 'premium'
+    user.save()
+    assert User.find_by_id(str(user._id)).subscription_tier == 'premium'
+
+def test_a_request_loads_each_user_once(db, cache):
+    user = User(username='maya', email='maya@example.com')
+    user.save()
+
+    with Flask(__name__).app_context():
+        first = User.find_by_id(user._id)
+        assert User.find_by_email('maya@example.com') is first
+        assert User.find_many([str(user._id)]) == [first]